@@ -0,0 +1,74 @@
+"""
+Families of patterns that get harder as a parameter grows, along with texts to
+search with them.
+"""
+
+import random
+import typing as t
+
+
+class Family(t.NamedTuple):
+    name: str
+    # values of the parameter that are benchmarked by default
+    params: t.Sequence[int]
+    pattern: t.Callable[[int], str]
+    # makes a text of the given size for a given parameter
+    text: t.Callable[[int, int], str]
+
+
+def _repeat(unit: str, size: int) -> str:
+    return (unit * (size // len(unit) + 1))[:size]
+
+
+def _random_text(alphabet: str, size: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    return "".join(rng.choices(alphabet, k=size))
+
+
+def _words(n: int) -> t.List[str]:
+    rng = random.Random(n)
+    return [
+        "".join(rng.choices("abcdefghijklmnopqrstuvwxyz", k=rng.randint(4, 10)))
+        for _ in range(n)
+    ]
+
+
+def _word_text(n: int, size: int) -> str:
+    # mostly words that aren't in the pattern, with one that is at the end
+    words = _words(n)
+    text = _repeat(" ".join(_words(n + 1)[::-1]) + " ", max(size - 12, 0))
+    return text + " " + words[0]
+
+
+FAMILIES: t.Dict[str, Family] = {
+    family.name: family for family in [
+        # ambiguous nesting, exponential for backtracking matchers
+        Family(
+            "alt_star",
+            [1],
+            lambda n: "(" + "|".join("a" * (i + 1) for i in range(n + 1)) + ")*",
+            lambda n, size: _repeat("a", size - 1) + "b"
+        ),
+        # a?^n a^n on a^n
+        Family(
+            "optional_n",
+            [4, 8, 16],
+            lambda n: "a?" * n + "a" * n,
+            lambda n, size: _repeat("a", size)
+        ),
+        # (a|b)*a(a|b){k}, whose DFA has 2^(k+1) states
+        Family(
+            "suffix_k",
+            [2, 4, 8],
+            lambda k: "(a|b)*a" + "(a|b)" * k,
+            lambda k, size: _random_text("ab", size)
+        ),
+        # long alternations of literal words
+        Family(
+            "literals",
+            [10, 100],
+            lambda n: "(" + "|".join(_words(n)) + ")",
+            _word_text
+        ),
+    ]
+}
@@ -0,0 +1,225 @@
+"""
+Time each stage of compiling and searching with the pattern families in
+`benchmarks.families`, and report the results as JSON.
+
+    python -m benchmarks.run --sizes 1K,1M --output results.json
+    python -m benchmarks.run --compare results.json
+
+With `--compare`, the results are checked against a saved run and the exit
+status is 1 if any stage got slower or used more memory than the threshold
+allows.
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+import typing as t
+
+from redfa import __version__
+from redfa.dfa import Dfa
+from redfa.nfa import Nfa, match
+from redfa.nfa2dfa import nfa2dfa
+from redfa.regex import Regex, RegexFlag, compile, purge
+from redfa.thompson import thompson
+from redfa.token import tokenize
+
+from benchmarks.families import FAMILIES, Family
+
+
+DEFAULT_SIZES = [1000, 100_000]
+# nfa.match restarts the simulation at every index, so it only gets small texts
+DEFAULT_MATCH_LIMIT = 10_000
+DEFAULT_REPEAT = 3
+DEFAULT_THRESHOLD = 1.25
+SUFFIXES = {"K": 1000, "M": 1000 ** 2, "G": 1000 ** 3}
+
+
+def parse_size(size: str) -> int:
+    size = size.strip().upper()
+    if size and size[-1] in SUFFIXES:
+        return int(float(size[:-1]) * SUFFIXES[size[-1]])
+    return int(size)
+
+
+def measure(function: t.Callable[[], t.Any], repeat: int) -> t.Tuple[t.Any, float, int]:
+    """
+    Call `function` `repeat` times and once more under `tracemalloc`, which
+    slows it down too much to be timed. Returns what it returned, the fastest
+    time in seconds and the peak memory in bytes.
+    """
+    seconds = float("inf")
+    result = None
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        result = function()
+        seconds = min(seconds, time.perf_counter() - begin)
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, seconds, peak
+
+
+def count_transitions(automaton: Nfa | Dfa) -> int:
+    if isinstance(automaton, Dfa):
+        return sum(len(edges) for edges in automaton.transitions_.values())
+    return sum(
+        len(dests)
+        for edges in automaton.transitions_.values()
+        for dests in edges.values()
+    )
+
+
+def bench_family(
+    family: Family,
+    param: int,
+    sizes: t.Sequence[int],
+    repeat: int,
+    match_limit: int
+) -> t.List[t.Dict[str, t.Any]]:
+    pattern = family.pattern(param)
+    results: t.List[t.Dict[str, t.Any]] = []
+
+    def record(stage: str, seconds: float, peak: int, **extra: t.Any) -> None:
+        results.append({
+            "family": family.name,
+            "param": param,
+            "stage": stage,
+            "size": None,
+            "seconds": seconds,
+            "peak_bytes": peak,
+            **extra
+        })
+        print(f"{family.name}({param}) {stage} {extra.get('size') or ''}: {seconds:.6f}s", file=sys.stderr)
+
+    _, seconds, peak = measure(lambda: list(tokenize(pattern)), repeat)
+    record("tokenize", seconds, peak)
+    nfa, seconds, peak = measure(lambda: thompson(pattern), repeat)
+    assert nfa is not None
+    record(
+        "thompson", seconds, peak,
+        states=len(nfa.states_), transitions=count_transitions(nfa)
+    )
+    dfa, seconds, peak = measure(lambda: nfa2dfa(nfa), repeat)
+    record(
+        "nfa2dfa", seconds, peak,
+        states=len(dfa.states_), transitions=count_transitions(dfa)
+    )
+
+    def compile_fresh() -> Regex:
+        purge()
+        return compile(pattern, RegexFlag.NOFLAG)
+
+    regex, seconds, peak = measure(compile_fresh, repeat)
+    assert regex.automaton is not None
+    record(
+        "compile", seconds, peak,
+        states=len(regex.automaton.states_),
+        transitions=count_transitions(regex.automaton)
+    )
+    for size in sizes:
+        text = family.text(param, size)
+        _, seconds, peak = measure(lambda: regex.find(text), repeat)
+        record("find", seconds, peak, size=size)
+        if size <= match_limit:
+            _, seconds, peak = measure(lambda: match(nfa, text), repeat)
+            record("match", seconds, peak, size=size)
+    return results
+
+
+def key_of(result: t.Dict[str, t.Any]) -> t.Tuple[t.Any, ...]:
+    return result["family"], result["param"], result["stage"], result["size"]
+
+
+def compare(
+    results: t.List[t.Dict[str, t.Any]],
+    baseline: t.List[t.Dict[str, t.Any]],
+    threshold: float
+) -> bool:
+    """
+    Print how each result compares to the same one in `baseline`. Returns
+    False if any of them regressed by more than `threshold` times.
+    """
+    previous = {key_of(result): result for result in baseline}
+    ok = True
+    for result in results:
+        old = previous.get(key_of(result))
+        if old is None:
+            continue
+        ratios = {
+            "time": result["seconds"] / old["seconds"] if old["seconds"] else 1.0,
+            "memory": result["peak_bytes"] / old["peak_bytes"] if old["peak_bytes"] else 1.0
+        }
+        worse = [name for name, ratio in ratios.items() if ratio > threshold]
+        ok = ok and not worse
+        family, param, stage, size = key_of(result)
+        print(
+            f"{family}({param}) {stage} {size or '':>10} " +
+            f"time x{ratios['time']:.2f} memory x{ratios['memory']:.2f}" +
+            ("  REGRESSED: " + ", ".join(worse) if worse else "")
+        )
+    return ok
+
+
+def main(argv: t.Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--families",
+        default=",".join(FAMILIES),
+        help="comma separated names of the families to run"
+    )
+    parser.add_argument(
+        "--params",
+        help="comma separated parameters to run every family with, instead of their defaults"
+    )
+    parser.add_argument(
+        "--sizes",
+        default=",".join(map(str, DEFAULT_SIZES)),
+        help="comma separated text sizes to search, like 1K,1M,100M"
+    )
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument(
+        "--match-limit",
+        type=parse_size,
+        default=DEFAULT_MATCH_LIMIT,
+        help="largest text to run nfa.match on"
+    )
+    parser.add_argument("--output", help="write the results to this file instead of stdout")
+    parser.add_argument("--compare", help="a saved run to compare the results against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    sizes = [parse_size(size) for size in args.sizes.split(",")]
+    results: t.List[t.Dict[str, t.Any]] = []
+    for name in args.families.split(","):
+        family = FAMILIES[name]
+        params = [int(p) for p in args.params.split(",")] if args.params else family.params
+        for param in params:
+            results.extend(bench_family(family, param, sizes, args.repeat, args.match_limit))
+
+    report = {
+        "version": __version__,
+        "python": platform.python_version(),
+        "results": results
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    elif not args.compare:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if not compare(results, baseline["results"], args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,221 @@
+"""
+Bit-parallel NFA simulation.
+
+`NfaTraveller` keeps its active states in a `set` and rebuilds sets for every
+transition and epsilon closure. `BitNfa` numbers the states of an NFA densely
+and represents a set of active states as the bits of a single `int`. The
+successors of every state, epsilon closures included, are precomputed as
+masks, and grouped 8 states at a time into lookup tables, so one step is a few
+table lookups and ORs per 8 states. Those tables take space quadratic in the
+number of states, so NFAs with more than `DEFAULT_MAX_TABLE_STATES` states
+skip them and OR together the masks of their active states instead.
+
+A `BitNfa` can be used anywhere a `DfaTable` can. It never determinizes, so it
+works for patterns whose DFA is too large to build.
+"""
+
+import typing as t
+
+from redfa.nfa import Nfa
+from redfa.table import LeftmostScan, SymbolClasses, nfa_symbol_classes
+
+
+__all__ = ["DEFAULT_MAX_TABLE_STATES", "BitNfa", "find"]
+
+
+# the most states for which byte tables are built, each class then needs up to
+# 64 * 256 masks of 512 bits
+DEFAULT_MAX_TABLE_STATES = 512
+# the positions of the bits set in each byte
+_BITS = [tuple(i for i in range(8) if byte >> i & 1) for byte in range(256)]
+
+
+class BitNfa(object):
+    def __init__(
+        self,
+        nfa: Nfa,
+        *,
+        unanchored: bool = False,
+        max_table_states: int = DEFAULT_MAX_TABLE_STATES
+    ) -> None:
+        nfa = nfa.without_deadends()
+        classes, representatives = nfa_symbol_classes(nfa)
+        self.classes_: SymbolClasses = classes
+        self.nclasses_ = len(representatives) + 1
+        
+        order = sorted(nfa.states_)
+        bits = {s: 1 << i for i, s in enumerate(order)}
+        self.nstates_ = len(order)
+        self.nbytes_ = (len(order) + 7) // 8 or 1
+        
+        def mask_of(states: t.Iterable[int]) -> int:
+            mask = 0
+            for s in states:
+                mask |= bits[s]
+            return mask
+        
+        self.accepts_ = mask_of(nfa.accepts_)
+        self.start_ = mask_of(nfa.epsilon_closure(nfa.starting_states()))
+        self.restart_ = self.start_ if unanchored else 0
+        # successors[cls][i] is the closure of the states reachable from the
+        # i-th state on a symbol of class cls
+        self.successors_: t.List[t.List[int]] = [[0] * len(order)]
+        for symbol in representatives:
+            self.successors_.append([
+                mask_of(nfa.epsilon_closure(nfa.transition(s, symbol)))
+                for s in order
+            ])
+        # byte tables are built the first time a class is stepped on, if the
+        # nfa is small enough for them
+        self.tabled_ = self.nstates_ <= max_table_states
+        self.tables_: t.List[t.List[t.List[int]] | None] = [None] * self.nclasses_
+    
+    def __repr__(self) -> str:
+        return (
+            "BitNfa(" +
+            f"states={self.nstates_}, " +
+            f"classes={self.nclasses_}" +
+            ")"
+        )
+    
+    def start(self) -> int:
+        return self.start_
+    
+    def step(self, state: int, symbol: t.Any) -> int:
+        return self.step_class_(state, self.classes_[symbol])
+    
+    def accepts(self, state: int) -> bool:
+        return bool(state & self.accepts_)
+    
+    def longest(self, text: t.Sequence, pos: int = 0, endpos: int | None = None) -> int | None:
+        """
+        See `DfaTable.longest`.
+        """
+        if endpos is None:
+            endpos = len(text)
+        classes = self.classes_
+        accepts = self.accepts_
+        step = self.step_class_
+        state = self.start_
+        last = pos if state & accepts else None
+        for i in range(pos, endpos):
+            state = step(state, classes[text[i]])
+            if not state:
+                break
+            if state & accepts:
+                last = i + 1
+        return last
+    
+    def earliest(self, text: t.Sequence, pos: int = 0, endpos: int | None = None) -> int | None:
+        """
+        See `DfaTable.earliest`.
+        """
+        if endpos is None:
+            endpos = len(text)
+        classes = self.classes_
+        accepts = self.accepts_
+        step = self.step_class_
+        state = self.start_
+        if state & accepts:
+            return pos
+        for i in range(pos, endpos):
+            state = step(state, classes[text[i]])
+            if not state:
+                return None
+            if state & accepts:
+                return i + 1
+        return None
+    
+    def leftmost(
+        self,
+        text: t.Sequence,
+        pos: int = 0,
+        endpos: int | None = None
+    ) -> t.Tuple[int, int] | None:
+        """
+        See `DfaTable.leftmost`.
+        """
+        if endpos is None:
+            endpos = len(text)
+        classes = self.classes_
+        if self.start_ & self.accepts_:
+            end = self.longest(text, pos, endpos)
+            assert end is not None
+            return pos, end
+        scan = _BitScan(self.start_, self.step_class_, self.accepts)
+        for i in range(pos, endpos):
+            scan.add(i)
+            scan.advance(classes[text[i]], i + 1)
+            if scan.done():
+                break
+        return scan.span()
+    
+    def step_class_(self, state: int, cls: int) -> int:
+        if not self.tabled_:
+            return self.step_sparse_(state, cls)
+        tables = self.tables_[cls]
+        if tables is None:
+            tables = self.build_tables_(cls)
+        dests = self.restart_
+        for table, byte in zip(tables, state.to_bytes(self.nbytes_, "little")):
+            if byte:
+                dests |= table[byte]
+        return dests
+    
+    def step_sparse_(self, state: int, cls: int) -> int:
+        """
+        Step without byte tables, by ORing the successors of each active
+        state one at a time.
+        """
+        successors = self.successors_[cls]
+        dests = self.restart_
+        for offset, byte in enumerate(state.to_bytes(self.nbytes_, "little")):
+            if byte:
+                for bit in _BITS[byte]:
+                    dests |= successors[8 * offset + bit]
+        return dests
+    
+    def build_tables_(self, cls: int) -> t.List[t.List[int]]:
+        """
+        For every group of 8 states, build a table that maps each subset of the
+        group (as a byte) to the union of their successors on class `cls`.
+        """
+        successors = self.successors_[cls]
+        tables: t.List[t.List[int]] = []
+        for offset in range(0, self.nbytes_ * 8, 8):
+            table = [0] * 256
+            for byte in range(1, 256):
+                # reuse the entry without the lowest bit set
+                low = (byte & -byte).bit_length() - 1
+                state = offset + low
+                own = successors[state] if state < len(successors) else 0
+                table[byte] = table[byte & (byte - 1)] | own
+            tables.append(table)
+        self.tables_[cls] = tables
+        return tables
+
+
+class _BitScan(LeftmostScan):
+    """
+    An nfa state that an older run is already in can only lead to matches
+    that start there first, so each run only keeps the states that no older
+    run has.
+    """
+    def advance(self, symbol: t.Any, pos: int) -> None:
+        self.covered_ = 0
+        super().advance(symbol, pos)
+    
+    def keep_(self, stepped: t.Dict[t.Any, int], dest: t.Any, origin: int) -> None:
+        dest &= ~self.covered_
+        if dest:
+            stepped[dest] = origin
+            self.covered_ |= dest
+
+
+def find(nfa: Nfa | BitNfa, text: str) -> t.Tuple[int, int] | None:
+    bitnfa = nfa if isinstance(nfa, BitNfa) else BitNfa(nfa)
+    for start_index in range(len(text) + 1):
+        end = bitnfa.longest(text, start_index)
+        if end is not None:
+            return start_index, end
+    return None
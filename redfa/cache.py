@@ -0,0 +1,83 @@
+from collections import OrderedDict
+from threading import Lock
+import typing as t
+
+
+__all__ = ["LruCache"]
+
+
+K = t.TypeVar("K")
+V = t.TypeVar("V")
+
+
+class LruCache(t.Generic[K, V]):
+    """
+    A thread-safe, bounded mapping that evicts the least recently used item
+    once it holds more than `maxsize` items. A `maxsize` of 0 disables caching.
+    """
+    def __init__(self, maxsize: int) -> None:
+        if maxsize < 0:
+            raise ValueError("maxsize must not be negative")
+        self.maxsize_ = maxsize
+        self.items_: OrderedDict[K, V] = OrderedDict()
+        self.lock_ = Lock()
+        self.hits_ = 0
+        self.misses_ = 0
+        self.evictions_ = 0
+    
+    def __repr__(self) -> str:
+        return (
+            "LruCache(" +
+            f"maxsize={self.maxsize_}, " +
+            f"size={len(self.items_)}" +
+            ")"
+        )
+    
+    def __len__(self) -> int:
+        return len(self.items_)
+    
+    def get(self, key: K) -> V | None:
+        with self.lock_:
+            value = self.items_.get(key)
+            if value is None:
+                self.misses_ += 1
+                return None
+            self.hits_ += 1
+            self.items_.move_to_end(key)
+            return value
+    
+    def put(self, key: K, value: V) -> None:
+        with self.lock_:
+            self.items_[key] = value
+            self.items_.move_to_end(key)
+            self.evict_()
+    
+    def resize(self, maxsize: int) -> None:
+        if maxsize < 0:
+            raise ValueError("maxsize must not be negative")
+        with self.lock_:
+            self.maxsize_ = maxsize
+            self.evict_()
+    
+    def purge(self) -> None:
+        """
+        Remove every item. The counters are left alone.
+        """
+        with self.lock_:
+            self.items_.clear()
+    
+    def stats(self) -> t.Dict[str, int]:
+        with self.lock_:
+            return {
+                "hits": self.hits_,
+                "misses": self.misses_,
+                "evictions": self.evictions_,
+                "size": len(self.items_),
+                "maxsize": self.maxsize_
+            }
+    
+    def evict_(self) -> None:
+        # caller must hold the lock
+        while len(self.items_) > self.maxsize_:
+            self.items_.popitem(last=False)
+            self.evictions_ += 1
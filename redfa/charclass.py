@@ -0,0 +1,170 @@
+"""
+Character classes.
+
+`[a-z0-9]`, `[^,]`, `.`, `\\d`, `\\w` and `\\s` each match one character out of
+a set. A `CharClass` stores that set as sorted, disjoint intervals of code
+points, so that it takes a single transition instead of one per character.
+Bytes are matched as the code points from 0 to 255.
+
+The transitions out of a state can be on characters and on classes that
+overlap. `split_intervals` cuts the code points they are on into pieces that
+each transition either covers completely or not at all, so that automata can be
+determinized and split into symbol classes one piece at a time.
+"""
+
+from bisect import bisect_right
+import typing as t
+
+from redfa.transition import Transition
+
+
+__all__ = [
+    "MAX_CODEPOINT",
+    "MAX_BYTE",
+    "CharClass",
+    "Piece",
+    "codepoint",
+    "split_intervals",
+    "join_intervals"
+]
+
+
+MAX_CODEPOINT = 0x10FFFF
+MAX_BYTE = 0xFF
+
+Interval = t.Tuple[int, int]
+# the first and last code point of a piece, the character or byte if the piece
+# is one that a transition is on by itself, and the indices of the transitions
+# that cover it
+Piece = t.Tuple[int, int, Transition | None, t.List[int]]
+
+D = t.TypeVar("D")
+
+
+def codepoint(symbol: t.Any) -> int | None:
+    """
+    Get the code point of a character, or the value of a byte. Returns None
+    for anything else.
+    """
+    if type(symbol) == str and len(symbol) == 1:
+        return ord(symbol)
+    if type(symbol) == int:
+        return symbol
+    return None
+
+
+def _normalize(ranges: t.Iterable[Interval]) -> t.Tuple[Interval, ...]:
+    merged: t.List[Interval] = []
+    for lo, hi in sorted(ranges):
+        if merged and lo <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], hi))
+        else:
+            merged.append((lo, hi))
+    return tuple(merged)
+
+
+class CharClass(object):
+    """
+    A set of characters, as inclusive intervals of code points. Finding out
+    whether a character is in it takes a binary search over the intervals.
+    """
+    __slots__ = ("ranges", "starts_")
+
+    def __init__(self, ranges: t.Iterable[Interval]) -> None:
+        self.ranges = _normalize(ranges)
+        self.starts_ = [lo for lo, _ in self.ranges]
+
+    def __repr__(self) -> str:
+        def show(cp: int) -> str:
+            return repr(chr(cp))[1:-1]
+
+        return "CharClass(" + repr("".join(
+            show(lo) if lo == hi else f"{show(lo)}-{show(hi)}"
+            for lo, hi in self.ranges
+        )) + ")"
+
+    def __eq__(self, other: t.Any) -> bool:
+        return type(other) == CharClass and self.ranges == other.ranges
+
+    def __hash__(self) -> int:
+        return hash(self.ranges)
+
+    def __contains__(self, symbol: t.Any) -> bool:
+        cp = codepoint(symbol)
+        if cp is None:
+            return False
+        i = bisect_right(self.starts_, cp) - 1
+        return i >= 0 and cp <= self.ranges[i][1]
+
+    def size(self) -> int:
+        return sum(hi - lo + 1 for lo, hi in self.ranges)
+
+    def negated(self, maximum: int = MAX_CODEPOINT) -> "CharClass":
+        """
+        Get the characters up to `maximum` that aren't in this class.
+        """
+        ranges: t.List[Interval] = []
+        lo = 0
+        for start, end in self.ranges:
+            if start > lo:
+                ranges.append((lo, min(start - 1, maximum)))
+            lo = end + 1
+        if lo <= maximum:
+            ranges.append((lo, maximum))
+        return CharClass(r for r in ranges if r[0] <= r[1])
+
+
+def _intervals_of(transition: Transition) -> t.Sequence[Interval]:
+    if type(transition) == CharClass:
+        return transition.ranges  # type: ignore
+    cp = codepoint(transition)
+    return () if cp is None else ((cp, cp),)
+
+
+def split_intervals(transitions: t.Sequence[Transition]) -> t.List[Piece]:
+    """
+    Cut the code points that `transitions` are on into pieces, in order. Each
+    piece is either inside or outside of every transition. Transitions that
+    aren't on characters or bytes are ignored.
+    """
+    starting: t.Dict[int, t.List[int]] = {}
+    ending: t.Dict[int, t.List[int]] = {}
+    for i, transition in enumerate(transitions):
+        for lo, hi in _intervals_of(transition):
+            starting.setdefault(lo, []).append(i)
+            ending.setdefault(hi + 1, []).append(i)
+    bounds = sorted(starting.keys() | ending.keys())
+    pieces: t.List[Piece] = []
+    active: t.Set[int] = set()
+    for lo, after in zip(bounds, bounds[1:]):
+        active.difference_update(ending.get(lo, ()))
+        active.update(starting.get(lo, ()))
+        if not active:
+            continue
+        covering = sorted(active)
+        literal = None
+        if lo == after - 1:
+            literal = next(
+                (transitions[i] for i in covering if type(transitions[i]) != CharClass),
+                None
+            )
+        pieces.append((lo, after - 1, literal, covering))
+    return pieces
+
+
+def join_intervals(pieces: t.Iterable[t.Tuple[int, int, Transition | None, D]]) -> t.Dict[Transition, D]:
+    """
+    Turn pieces and where each of them leads into transitions. Pieces that are
+    a single character stay as they are, and the rest are put together into
+    one class for each place they lead to.
+    """
+    edges: t.Dict[Transition, D] = {}
+    ranges: t.Dict[D, t.List[Interval]] = {}
+    for lo, hi, literal, dest in pieces:
+        if literal is not None:
+            edges[literal] = dest
+        else:
+            ranges.setdefault(dest, []).append((lo, hi))
+    for dest, intervals in ranges.items():
+        edges[CharClass(intervals)] = dest
+    return edges
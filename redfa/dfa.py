@@ -1,10 +1,18 @@
+from array import array
 from copy import deepcopy
 from pprint import pformat
+import struct
 import typing as t
 
+from redfa.charclass import CharClass, join_intervals, split_intervals
+from redfa.serial import Reader, decode_transition, encode_transition, flatten_classes, pack_array, unflatten_classes
 from redfa.transition import NonCharTransition, Transition, text_to_transition
 
 
+DFA_MAGIC = b"RDFA"
+DFA_FORMAT = 2
+
+
 class Dfa(object):
     def __init__(
         self,
@@ -17,6 +25,8 @@ class Dfa(object):
         self.transitions_ = transitions
         self.accepts_ = accepts
         self.start_ = start
+        # this dfa without its dead states, see `Dfa.live`
+        self.live_: Dfa | None = None
     
     def __repr__(self) -> str:
         return (
@@ -44,6 +54,57 @@ class Dfa(object):
             start=self.start_
         )
     
+    def to_bytes(self) -> bytes:
+        """
+        Serialize this DFA into a compact binary format that can be read back
+        with `Dfa.from_bytes`. States must be non-negative ints below 2**32.
+        """
+        states = array("I", sorted(self.states_))
+        accepts = array("I", sorted(self.accepts_))
+        edges = array("I")
+        classes: t.List[CharClass] = []
+        for s in sorted(self.transitions_.keys()):
+            for transition, d in self.transitions_[s].items():
+                kind, value = encode_transition(transition, classes)
+                edges.extend((s, kind, value, d))
+        class_items = flatten_classes(classes)
+        header = struct.pack(
+            "<4sBIIIII",
+            DFA_MAGIC,
+            DFA_FORMAT,
+            len(states),
+            len(accepts),
+            len(edges) // 4,
+            len(class_items),
+            self.start_
+        )
+        return (
+            header +
+            pack_array(states) +
+            pack_array(accepts) +
+            pack_array(edges) +
+            pack_array(class_items)
+        )
+    
+    @staticmethod
+    def from_bytes(data: bytes) -> "Dfa":
+        """
+        Load a DFA serialized with `Dfa.to_bytes`.
+        """
+        reader = Reader(data)
+        reader.header(DFA_MAGIC, DFA_FORMAT)
+        nstates, naccepts, nedges, nclass_items, start = reader.unpack("<IIIII")
+        states = reader.array("I", nstates)
+        accepts = reader.array("I", naccepts)
+        edges = reader.array("I", nedges * 4)
+        classes = unflatten_classes(reader.array("I", nclass_items))
+        reader.done()
+        transitions: t.Dict[int, t.Dict[Transition, int]] = {}
+        for i in range(0, len(edges), 4):
+            s, kind, value, d = edges[i:i + 4]
+            transitions.setdefault(s, {})[decode_transition(kind, value, classes)] = d
+        return Dfa(set(states), transitions, set(accepts), start)
+    
     def start(self) -> int:
         return self.start_
     
@@ -53,14 +114,28 @@ class Dfa(object):
         edges = self.transitions_.get(state, dict())
         default_out = state if type(transition) == NonCharTransition else None
         dest = edges.get(transition, default_out)
+        if dest is None:
+            # the classes out of a state don't overlap
+            for key, class_dest in edges.items():
+                if type(key) == CharClass and transition in key:
+                    return class_dest
         return dest
     
     def accepts(self, state: int) -> bool:
         return state in self.accepts_
     
+    def invalidate_caches(self) -> "Dfa":
+        """
+        Forget the cached copy without dead states. This must be called after
+        modifying `states_`, `transitions_` or `accepts_` directly.
+        """
+        self.live_ = None
+        return self
+    
     def remove_unregistered_states(self) -> "Dfa":
         if self.start_ not in self.states_:
             raise ValueError("start not in states")
+        self.invalidate_caches()
         self.accepts_ &= self.states_
         self.transitions_ = {
             s: {t: d for t, d in transitions.items() if d in self.states_}
@@ -71,53 +146,255 @@ class Dfa(object):
     def remove_unreachable_states(self) -> "Dfa":
         visited: t.Set[int] = set()
         queue: t.List[int] = [self.start_]
-        while len(visited) >= 1:
-            state = queue.pop(0)
+        while len(queue) >= 1:
+            state = queue.pop()
+            if state in visited:
+                continue
             visited.add(state)
             for d in self.transitions_.get(state, dict()).values():
                 if d not in visited:
                     queue.append(d)
-        self.states_ = visited
+        self.states_ &= visited
         return self.remove_unregistered_states()
-
+    
+    def remove_dead_states(self) -> "Dfa":
+        """
+        Remove states from which no accept state can be reached. The starting
+        state is always kept.
+        """
+        sources: t.Dict[int, t.Set[int]] = {}
+        for s, transitions in self.transitions_.items():
+            for d in transitions.values():
+                sources.setdefault(d, set()).add(s)
+        alive: t.Set[int] = set()
+        queue: t.List[int] = list(self.accepts_ & self.states_)
+        while len(queue) >= 1:
+            state = queue.pop()
+            if state in alive:
+                continue
+            alive.add(state)
+            queue.extend(sources.get(state, set()) - alive)
+        self.states_ &= alive | {self.start_}
+        return self.remove_unregistered_states()
+    
+    def minimize(self) -> "Dfa":
+        """
+        Merge equivalent states using Hopcroft's partition refinement, after
+        removing unreachable and dead states. This mutates and returns the
+        current object. The states of the result are renumbered from 0, with
+        0 being the start.
+        """
+        self.remove_unreachable_states().remove_dead_states()
+        keys: t.Set[Transition] = {
+            c for transitions in self.transitions_.values() for c in transitions.keys()
+        }
+        keys.discard(NonCharTransition.EPSILON)
+        # classes out of different states can overlap, so the alphabet is made
+        # of the pieces they split each other into, stepped on with their
+        # character or their first code point
+        pieces = split_intervals([c for c in keys if type(c) != NonCharTransition])
+        symbols: t.List[Transition] = [
+            lo if literal is None else literal for lo, _, literal, _ in pieces
+        ]
+        alphabet: t.List[Transition] = [
+            c for c in keys if type(c) == NonCharTransition
+        ] + symbols
+        
+        # complete the transition function with a sink state, which also
+        # absorbs every dead state
+        sink = max(self.states_) + 1
+        states = list(self.states_) + [sink]
+        sources: t.Dict[Transition, t.Dict[int, t.List[int]]] = {c: {} for c in alphabet}
+        for s in states:
+            for c in alphabet:
+                d = self.transition(s, c) if s != sink else None
+                if d is None:
+                    d = sink
+                sources[c].setdefault(d, []).append(s)
+        
+        accepting = [s for s in states if self.accepts(s)]
+        rejecting = [s for s in states if not self.accepts(s)]
+        blocks: t.List[t.Set[int]] = [set(b) for b in (accepting, rejecting) if b]
+        block_of: t.Dict[int, int] = {s: i for i, b in enumerate(blocks) for s in b}
+        worklist: t.Set[int] = set(range(len(blocks)))
+        
+        while len(worklist) >= 1:
+            splitter = blocks[worklist.pop()].copy()
+            for c in alphabet:
+                # states that go into the splitter on c, grouped by block
+                touched: t.Dict[int, t.Set[int]] = {}
+                for d in splitter:
+                    for s in sources[c].get(d, ()):
+                        touched.setdefault(block_of[s], set()).add(s)
+                for b, inside in touched.items():
+                    if len(inside) == len(blocks[b]):
+                        continue
+                    blocks[b] -= inside
+                    blocks.append(inside)
+                    new = len(blocks) - 1
+                    for s in inside:
+                        block_of[s] = new
+                    if b in worklist or len(inside) <= len(blocks[b]):
+                        worklist.add(new)
+                    else:
+                        worklist.add(b)
+        
+        # renumber blocks so that the start is 0 and the sink disappears
+        dead = block_of[sink]
+        ids: t.Dict[int, int] = {}
+        for s in [self.start_] + sorted(self.states_):
+            b = block_of[s]
+            if b != dead and b not in ids:
+                ids[b] = len(ids)
+        transitions: t.Dict[int, t.Dict[Transition, int]] = {}
+        for b, i in ids.items():
+            representative = next(iter(blocks[b]))
+            edges: t.Dict[Transition, int] = {}
+            for c in alphabet:
+                if type(c) != NonCharTransition:
+                    continue
+                d = self.transition(representative, c)
+                if d is None or block_of[d] == dead:
+                    continue
+                # non-character transitions loop back by default
+                if block_of[d] == b:
+                    continue
+                edges[c] = ids[block_of[d]]
+            targets: t.List[t.Tuple[int, int, Transition | None, int]] = []
+            for (lo, hi, literal, _), c in zip(pieces, symbols):
+                d = self.transition(representative, c)
+                if d is not None and block_of[d] != dead:
+                    targets.append((lo, hi, literal, ids[block_of[d]]))
+            edges.update(join_intervals(targets))
+            if edges:
+                transitions[i] = edges
+        
+        self.states_ = set(ids.values()) or {0}
+        self.transitions_ = transitions
+        self.accepts_ = {i for b, i in ids.items() if self.accepts(next(iter(blocks[b])))}
+        self.start_ = 0
+        return self
+    
     def without_unregistered_states(self) -> "Dfa":
         return self.copy().remove_unregistered_states()
     
     def without_unreachable_states(self) -> "Dfa":
         return self.copy().remove_unreachable_states()
+    
+    def without_dead_states(self) -> "Dfa":
+        return self.copy().remove_dead_states()
+    
+    def live(self) -> "Dfa":
+        """
+        Get a copy of this DFA without its dead states. The copy is made once
+        and then reused until this DFA is modified, so it mustn't be modified
+        itself.
+        """
+        if self.live_ is None:
+            self.live_ = self.without_dead_states()
+        return self.live_
+    
+    def minimized(self) -> "Dfa":
+        return self.copy().minimize()
+    
+    def max_length(self) -> int | None:
+        """
+        Get the length of the longest string this DFA accepts, or None if
+        there is no limit because a loop can be taken on the way to an accept
+        state. Returns -1 if it accepts nothing at all.
+        """
+        dfa = self.live()
+        if not dfa.accepts_:
+            return -1
+        # longest[s] is the longest way from s to an accept state
+        longest: t.Dict[int, int] = {}
+        on_path: t.Set[int] = set()
+        stack: t.List[t.Tuple[int, bool]] = [(dfa.start_, False)]
+        while stack:
+            state, done = stack.pop()
+            if done:
+                on_path.discard(state)
+                best = 0 if state in dfa.accepts_ else -1
+                for c, d in dfa.transitions_.get(state, dict()).items():
+                    if longest[d] >= 0:
+                        step = 0 if type(c) == NonCharTransition else 1
+                        best = max(best, longest[d] + step)
+                longest[state] = best
+                continue
+            if state in longest:
+                continue
+            on_path.add(state)
+            stack.append((state, True))
+            for d in dfa.transitions_.get(state, dict()).values():
+                if d in on_path:
+                    return None
+                if d not in longest:
+                    stack.append((d, False))
+        return longest[dfa.start_]
 
 
 class DfaTraveller(object):
+    """
+    Runs a DFA over some text, keeping only the current state and how long
+    the longest accepted prefix so far is, so it takes the same memory however
+    long the text is. Use `HistoryDfaTraveller` to see every state visited.
+    """
     def __init__(self, dfa: Dfa) -> None:
         self.dfa_ = dfa
-        # first item in tuple is last state, second item is length of substring
-        self.states_: t.List[t.Tuple[int, int]] = [(dfa.start(), 0)]
+        self.state_ = dfa.start()
+        # number of characters consumed
+        self.substr_len_ = 0
+        # substr_len_ the last time the dfa was in an accept state
+        self.last_accept_: int | None = 0 if dfa.accepts(self.state_) else None
     
     def consume(self, transition: Transition) -> bool:
-        src, substr_len = self.states_[-1]
-        dest = self.dfa_.transition(src, transition)
+        dest = self.dfa_.transition(self.state_, transition)
         if dest is None:
             return False
-        if type(transition) == str:
-            substr_len += 1
-        self.states_.append((dest, substr_len))
+        if type(transition) != NonCharTransition:
+            self.substr_len_ += 1
+        self.state_ = dest
+        if self.dfa_.accepts(dest):
+            self.last_accept_ = self.substr_len_
         return True
     
-    def travel(self, text: str, *, start: bool = True):
-        for transition in text_to_transition(text, start=start):
+    def travel(self, text: str, *, start: bool = True, end: bool = True):
+        for transition in text_to_transition(text, start=start, end=end):
             if not self.consume(transition):
                 break
     
     def length(self) -> int | None:
-        for state, substr_len in self.states_[::-1]:
-            if self.dfa_.accepts(state):
-                return substr_len
-        return None
+        return self.last_accept_
+
+
+class HistoryDfaTraveller(DfaTraveller):
+    """
+    A `DfaTraveller` that also records every state it visits, for debugging.
+    This takes memory in the length of the text.
+    """
+    def __init__(self, dfa: Dfa) -> None:
+        super().__init__(dfa)
+        # first item in tuple is last state, second item is length of substring
+        self.states_: t.List[t.Tuple[int, int]] = [(self.state_, 0)]
+    
+    def consume(self, transition: Transition) -> bool:
+        consumed = super().consume(transition)
+        if consumed:
+            self.states_.append((self.state_, self.substr_len_))
+        return consumed
 
 
-def find(dfa: Dfa, text: str) -> t.Tuple[int, int] | None:
+def find(
+    dfa: Dfa,
+    text: str,
+    *,
+    traveller_type: t.Callable[[Dfa], DfaTraveller] = DfaTraveller
+) -> t.Tuple[int, int] | None:
+    # travellers stop at missing transitions, which is where they end up as
+    # soon as they can't reach an accept state anymore
+    dfa = dfa.live()
     for start_index in range(len(text) + 1):
-        traveller = DfaTraveller(dfa)
+        traveller = traveller_type(dfa)
         traveller.travel(text[start_index:], start=(start_index == 0))
         length = traveller.length()
         if length is not None:
@@ -3,4 +3,8 @@ class RegexError(Exception):
 
 
 class MalformedRegexError(RegexError):
-    pass
\ No newline at end of file
+    pass
+
+
+class RegexTooLargeError(RegexError):
+    pass
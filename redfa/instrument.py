@@ -0,0 +1,313 @@
+"""
+Opt-in counters for finding out where a search spends its time.
+
+Nothing here is used unless asked for. The travellers and engines that
+searches normally run are left untouched, and instrumented versions count what
+they do on top of them, so turning instrumentation off costs nothing.
+
+    regex = compile("(a|b)*abb").instrumented(hook=print)
+    regex.find("abababb")
+    regex.stats.asdict()
+"""
+
+from contextlib import contextmanager
+from functools import partial
+import typing as t
+
+from redfa.bitnfa import BitNfa
+from redfa.dfa import Dfa, DfaTraveller, find as dfa_find
+from redfa.nfa import Nfa, NfaTraveller, find as nfa_find
+from redfa.regex import Regex, RegexMatch
+from redfa.table import LeftmostScan
+from redfa.transition import NonCharTransition, Transition
+
+
+__all__ = [
+    "Stats",
+    "InstrumentedDfaTraveller",
+    "InstrumentedNfaTraveller",
+    "InstrumentedEngine",
+    "InstrumentedRegex",
+    "find_dfa",
+    "find_nfa"
+]
+
+
+class Stats(object):
+    """
+    Counters shared by everything that is instrumented with them. `hook` is
+    called with `asdict()` whenever an instrumented search reports back.
+    """
+    FIELDS = (
+        # scans started from a new position in the text
+        "restarts",
+        # characters consumed, not counting ones that lead nowhere
+        "symbols",
+        # transitions followed, an NFA can follow many per character
+        "transitions",
+        # the most NFA states active at once
+        "peak_nfa_states",
+        # DFA states created while determinizing
+        "dfa_states",
+        # epsilon closures computed
+        "closures"
+    )
+
+    def __init__(self, hook: t.Callable[[t.Dict[str, int]], t.Any] | None = None) -> None:
+        self.hook = hook
+        self.restarts = 0
+        self.symbols = 0
+        self.transitions = 0
+        self.peak_nfa_states = 0
+        self.dfa_states = 0
+        self.closures = 0
+
+    def __repr__(self) -> str:
+        return "Stats(" + ", ".join(f"{k}={v}" for k, v in self.asdict().items()) + ")"
+
+    def asdict(self) -> t.Dict[str, int]:
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def reset(self) -> None:
+        for field in self.FIELDS:
+            setattr(self, field, 0)
+
+    def report(self) -> None:
+        if self.hook is not None:
+            self.hook(self.asdict())
+
+
+class InstrumentedDfaTraveller(DfaTraveller):
+    def __init__(self, dfa: Dfa, *, stats: Stats) -> None:
+        super().__init__(dfa)
+        self.stats_ = stats
+        stats.restarts += 1
+
+    def consume(self, transition: Transition) -> bool:
+        consumed = super().consume(transition)
+        if consumed:
+            self.stats_.transitions += 1
+            if type(transition) != NonCharTransition:
+                self.stats_.symbols += 1
+        return consumed
+
+
+class InstrumentedNfaTraveller(NfaTraveller):
+    def __init__(self, nfa: Nfa, *, stats: Stats) -> None:
+        super().__init__(nfa)
+        self.stats_ = stats
+        stats.restarts += 1
+
+    def consume_epsilon(self):
+        super().consume_epsilon()
+        states = self.history_[-1][0]
+        self.stats_.closures += 1
+        self.stats_.peak_nfa_states = max(self.stats_.peak_nfa_states, len(states))
+
+    def consume(self, transition: Transition) -> bool:
+        taken = sum(
+            len(self.nfa_.transition(state, transition))
+            for state in self.history_[-1][0]
+        )
+        consumed = super().consume(transition)
+        if consumed:
+            self.stats_.transitions += taken
+            if type(transition) != NonCharTransition:
+                self.stats_.symbols += 1
+        return consumed
+
+
+def find_dfa(dfa: Dfa, text: str, stats: Stats) -> t.Tuple[int, int] | None:
+    """
+    Like `redfa.dfa.find`, counting what it does in `stats`.
+    """
+    return dfa_find(dfa, text, traveller_type=partial(InstrumentedDfaTraveller, stats=stats))
+
+
+def find_nfa(nfa: Nfa, text: str, stats: Stats) -> t.Tuple[int, int] | None:
+    """
+    Like `redfa.nfa.find`, counting what it does in `stats`.
+    """
+    return nfa_find(nfa, text, traveller_type=partial(InstrumentedNfaTraveller, stats=stats))
+
+
+class InstrumentedEngine(object):
+    """
+    Wraps a `DfaTable`, `LazyDfa` or `BitNfa` and runs its scans one `step` at
+    a time, counting them.
+    """
+    def __init__(self, engine: t.Any, stats: Stats) -> None:
+        self.engine_ = engine
+        self.stats_ = stats
+        # the states of a BitNfa are sets of NFA states
+        self.counts_nfa_states_ = isinstance(engine, BitNfa)
+        self.dfa_states_ = self.state_count_()
+
+    def __repr__(self) -> str:
+        return f"InstrumentedEngine({self.engine_!r})"
+
+    def start(self) -> t.Any:
+        return self.engine_.start()
+
+    def step(self, state: t.Any, symbol: t.Any) -> t.Any:
+        dest = self.engine_.step(state, symbol)
+        stats = self.stats_
+        if dest:
+            stats.symbols += 1
+            stats.transitions += 1
+            if self.counts_nfa_states_:
+                stats.peak_nfa_states = max(stats.peak_nfa_states, dest.bit_count())
+        return dest
+
+    def accepts(self, state: t.Any) -> bool:
+        return self.engine_.accepts(state)
+
+    def longest(self, text: t.Sequence, pos: int = 0, endpos: int | None = None) -> int | None:
+        if endpos is None:
+            endpos = len(text)
+        state = self.begin_()
+        last = pos if self.accepts(state) else None
+        for i in range(pos, endpos):
+            state = self.step(state, text[i])
+            if not state:
+                break
+            if self.accepts(state):
+                last = i + 1
+        self.end_()
+        return last
+
+    def earliest(self, text: t.Sequence, pos: int = 0, endpos: int | None = None) -> int | None:
+        if endpos is None:
+            endpos = len(text)
+        state = self.begin_()
+        found = pos if self.accepts(state) else None
+        i = pos
+        while found is None and i < endpos:
+            state = self.step(state, text[i])
+            i += 1
+            if not state:
+                break
+            if self.accepts(state):
+                found = i
+        self.end_()
+        return found
+
+    def leftmost(
+        self,
+        text: t.Sequence,
+        pos: int = 0,
+        endpos: int | None = None
+    ) -> t.Tuple[int, int] | None:
+        if endpos is None:
+            endpos = len(text)
+        start = self.begin_()
+        if self.accepts(start):
+            self.end_()
+            end = self.longest(text, pos, endpos)
+            assert end is not None
+            return pos, end
+        # a lazy dfa renumbers its states when its cache is flushed, which
+        # loses track of the runs, so the scan is then left to it
+        flushes = getattr(self.engine_, "flushes_", None)
+        scan = LeftmostScan(start, self.step, self.accepts)
+        for i in range(pos, endpos):
+            scan.add(i)
+            scan.advance(text[i], i + 1)
+            if getattr(self.engine_, "flushes_", None) != flushes:
+                self.end_()
+                return self.engine_.leftmost(text, pos, endpos)
+            if scan.done():
+                break
+        self.end_()
+        return scan.span()
+
+    def state_count_(self) -> int:
+        state_count = getattr(self.engine_, "state_count", None)
+        return state_count() if state_count is not None else 0
+
+    def begin_(self) -> t.Any:
+        self.stats_.restarts += 1
+        return self.start()
+
+    def end_(self) -> None:
+        # a lazy dfa creates states as it goes
+        count = self.state_count_()
+        if count > self.dfa_states_:
+            self.stats_.dfa_states += count - self.dfa_states_
+        self.dfa_states_ = count
+
+
+class InstrumentedRegex(Regex):
+    """
+    A copy of a compiled `Regex` whose engines count what they do in `stats`,
+    which is reported after every search.
+    """
+    def __init__(self, regex: Regex, stats: Stats) -> None:
+        self.__dict__.update(regex.__dict__)
+        self.stats = stats
+        self.depth_ = 0
+        self.table = InstrumentedEngine(regex.table, stats)  # type: ignore
+        self.search_table = InstrumentedEngine(regex.search_table, stats)  # type: ignore
+
+    def find(
+        self,
+        text: t.Sequence,
+        pos: int = 0,
+        endpos: int | None = None
+    ) -> t.Tuple[int, int] | None:
+        with self.reporting_():
+            return super().find(text, pos, endpos)
+
+    def match(
+        self,
+        text: t.Sequence,
+        pos: int = 0,
+        endpos: int | None = None
+    ) -> RegexMatch | None:
+        with self.reporting_():
+            return super().match(text, pos, endpos)
+
+    def fullmatch(
+        self,
+        text: t.Sequence,
+        pos: int = 0,
+        endpos: int | None = None
+    ) -> RegexMatch | None:
+        with self.reporting_():
+            return super().fullmatch(text, pos, endpos)
+
+    def search(
+        self,
+        text: t.Sequence,
+        pos: int = 0,
+        endpos: int | None = None
+    ) -> RegexMatch | None:
+        with self.reporting_():
+            return super().search(text, pos, endpos)
+
+    def finditer(
+        self,
+        text: t.Sequence,
+        pos: int = 0,
+        endpos: int | None = None
+    ) -> t.Generator[t.Tuple[int, int], None, None]:
+        # the depth isn't held across yields, so that searches run while the
+        # generator is suspended still report. it reports once it is
+        # exhausted or closed, unless it is run by another search.
+        try:
+            yield from super().finditer(text, pos, endpos)
+        finally:
+            if self.depth_ == 0:
+                self.stats.report()
+
+    @contextmanager
+    def reporting_(self) -> t.Iterator[None]:
+        # searches that call each other only report once, when the outermost
+        # one is done
+        self.depth_ += 1
+        try:
+            yield
+        finally:
+            self.depth_ -= 1
+            if self.depth_ == 0:
+                self.stats.report()
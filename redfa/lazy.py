@@ -0,0 +1,265 @@
+"""
+A DFA that is determinized on demand.
+
+`nfa2dfa` and `nfa2table` build every reachable subset of NFA states up front,
+which can take exponential time and space. `LazyDfa` only builds the subsets
+that the input actually reaches, and keeps at most `max_states` of them. When
+the cache is full, it is flushed and rebuilt from the state the scan is in.
+
+A `LazyDfa` can be used anywhere a `DfaTable` can.
+"""
+
+from array import array
+import typing as t
+
+from redfa.nfa import Nfa
+from redfa.table import DEAD, LeftmostScan, SymbolClasses, nfa_symbol_classes
+
+
+__all__ = ["DEFAULT_MAX_STATES", "LazyDfa"]
+
+
+DEFAULT_MAX_STATES = 4096
+# transitions that haven't been determinized yet
+UNKNOWN = -1
+
+
+class LazyDfa(object):
+    """
+    Like `DfaTable`, states are identified by the offset of their row in
+    `table_`. A negative entry means the transition hasn't been computed yet.
+    """
+    def __init__(
+        self,
+        nfa: Nfa,
+        *,
+        unanchored: bool = False,
+        max_states: int = DEFAULT_MAX_STATES,
+        tags: t.Dict[int, int] | None = None
+    ) -> None:
+        # the dead state, the start, the current state and its successor must
+        # all fit at the same time
+        if max_states < 4:
+            raise ValueError("max_states must be at least 4")
+        self.nfa_ = nfa.without_deadends()
+        classes, representatives = nfa_symbol_classes(self.nfa_)
+        self.classes_: SymbolClasses = classes
+        self.representatives_ = representatives
+        self.nclasses_ = len(representatives) + 1
+        self.max_states_ = max_states
+        self.initial_ = frozenset(self.nfa_.epsilon_closure(self.nfa_.starting_states()))
+        self.restart_ = self.initial_ if unanchored else frozenset()
+        
+        self.table_ = array("l")
+        self.accepts_ = bytearray()
+        self.ids_: t.Dict[t.FrozenSet[int], int] = {}
+        self.subsets_: t.List[t.FrozenSet[int]] = []
+        # like `DfaTable.tags_`, see `nfa2table`
+        self.nfa_tags_ = tags
+        self.tags_: t.Dict[int, t.FrozenSet[int]] = {}
+        self.start_ = DEAD
+        self.flush_()
+        
+        self.steps_ = 0
+        self.misses_ = 0
+        self.flushes_ = 0
+    
+    def __repr__(self) -> str:
+        return (
+            "LazyDfa(" +
+            f"states={self.state_count()}, " +
+            f"classes={self.nclasses_}, " +
+            f"max_states={self.max_states_}" +
+            ")"
+        )
+    
+    def state_count(self) -> int:
+        return len(self.subsets_)
+    
+    def start(self) -> int:
+        return self.start_
+    
+    def step(self, state: int, symbol: t.Any) -> int:
+        cls = self.classes_[symbol]
+        dest = self.table_[state + cls]
+        if dest < 0:
+            dest = self.determinize_(state, cls)
+        self.steps_ += 1
+        return dest
+    
+    def accepts(self, state: int) -> bool:
+        return bool(self.accepts_[state])
+    
+    def stats(self) -> t.Dict[str, t.Any]:
+        """
+        Get the size of the state cache and how well it has been doing.
+        """
+        hits = self.steps_ - self.misses_
+        return {
+            "states": len(self.subsets_),
+            "max_states": self.max_states_,
+            "hits": hits,
+            "misses": self.misses_,
+            "hit_rate": hits / self.steps_ if self.steps_ else 1.0,
+            "flushes": self.flushes_
+        }
+    
+    def longest(self, text: t.Sequence, pos: int = 0, endpos: int | None = None) -> int | None:
+        """
+        See `DfaTable.longest`.
+        """
+        if endpos is None:
+            endpos = len(text)
+        table = self.table_
+        classes = self.classes_
+        accepts = self.accepts_
+        state = self.start_
+        last = pos if accepts[state] else None
+        i = pos
+        while i < endpos:
+            cls = classes[text[i]]
+            dest = table[state + cls]
+            if dest < 0:
+                dest = self.determinize_(state, cls)
+            state = dest
+            i += 1
+            if not state:
+                break
+            if accepts[state]:
+                last = i
+        self.steps_ += i - pos
+        return last
+    
+    def earliest(self, text: t.Sequence, pos: int = 0, endpos: int | None = None) -> int | None:
+        """
+        See `DfaTable.earliest`.
+        """
+        if endpos is None:
+            endpos = len(text)
+        table = self.table_
+        classes = self.classes_
+        accepts = self.accepts_
+        state = self.start_
+        found = pos if accepts[state] else None
+        i = pos
+        while found is None and i < endpos:
+            cls = classes[text[i]]
+            dest = table[state + cls]
+            if dest < 0:
+                dest = self.determinize_(state, cls)
+            state = dest
+            i += 1
+            if not state:
+                break
+            if accepts[state]:
+                found = i
+        self.steps_ += i - pos
+        return found
+    
+    def leftmost(
+        self,
+        text: t.Sequence,
+        pos: int = 0,
+        endpos: int | None = None
+    ) -> t.Tuple[int, int] | None:
+        """
+        See `DfaTable.leftmost`. The cache is only flushed in between steps,
+        so that the states of every run can be carried over.
+        """
+        if endpos is None:
+            endpos = len(text)
+        table = self.table_
+        classes = self.classes_
+        if self.accepts_[self.start_]:
+            end = self.longest(text, pos, endpos)
+            assert end is not None
+            return pos, end
+        
+        def step(state: int, cls: int) -> int:
+            self.steps_ += 1
+            dest = table[state + cls]
+            return dest if dest >= 0 else self.determinize_(state, cls, flush=False)
+        
+        scan = LeftmostScan(self.start_, step, self.accepts_.__getitem__)
+        for i in range(pos, endpos):
+            scan.runs_ = self.keep_(scan.runs_)
+            scan.start_ = self.start_
+            scan.add(i)
+            scan.advance(classes[text[i]], i + 1)
+            if scan.done():
+                break
+        return scan.span()
+    
+    def add_(self, subset: t.FrozenSet[int]) -> int:
+        state = len(self.subsets_) * self.nclasses_
+        self.ids_[subset] = state
+        self.subsets_.append(subset)
+        fill = DEAD if not subset else UNKNOWN
+        self.table_.extend([fill] * self.nclasses_)
+        self.accepts_.extend(bytes(self.nclasses_))
+        accepted = subset & self.nfa_.accepts_
+        if accepted:
+            self.accepts_[state] = 1
+            if self.nfa_tags_ is not None:
+                self.tags_[state] = frozenset(
+                    self.nfa_tags_[a] for a in accepted if a in self.nfa_tags_
+                )
+        return state
+    
+    def flush_(self) -> None:
+        # cleared in place so that scan loops holding on to these keep working
+        del self.table_[:]
+        del self.accepts_[:]
+        self.ids_.clear()
+        self.subsets_.clear()
+        self.tags_.clear()
+        self.add_(frozenset())
+        self.start_ = self.add_(self.initial_)
+    
+    def keep_(self, runs: t.Dict[int, int]) -> t.Dict[int, int]:
+        """
+        Flush the cache if it is full, adding the states that `runs` are in
+        back in. Returns `runs` with their states renumbered.
+        """
+        if len(self.subsets_) < self.max_states_:
+            return runs
+        held = [(self.subsets_[state // self.nclasses_], origin) for state, origin in runs.items()]
+        self.flush_()
+        self.flushes_ += 1
+        kept: t.Dict[int, int] = {}
+        for subset, origin in held:
+            state = self.ids_.get(subset)
+            if state is None:
+                state = self.add_(subset)
+            kept[state] = origin
+        return kept
+    
+    def determinize_(self, state: int, cls: int, *, flush: bool = True) -> int:
+        """
+        Compute the transition from `state` on symbol class `cls`, adding the
+        destination to the cache. Returns the destination, which may have been
+        renumbered along with `state` if the cache had to be flushed. With
+        `flush` False, the cache grows past `max_states` instead.
+        """
+        self.misses_ += 1
+        subset = self.subsets_[state // self.nclasses_]
+        if cls == 0:
+            dests = self.restart_
+        else:
+            symbol = self.representatives_[cls - 1]
+            dests = frozenset(
+                self.nfa_.epsilon_closure(self.nfa_.transition_states(set(subset), symbol))
+            ) | self.restart_
+        dest = self.ids_.get(dests)
+        if dest is None:
+            if flush and len(self.subsets_) >= self.max_states_:
+                self.flush_()
+                self.flushes_ += 1
+                state = self.ids_.get(subset)
+                if state is None:
+                    state = self.add_(subset)
+                dest = self.ids_.get(dests)
+            if dest is None:
+                dest = self.add_(dests)
+        self.table_[state + cls] = dest
+        return dest
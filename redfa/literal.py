@@ -0,0 +1,178 @@
+"""
+Literal prefilters.
+
+Many patterns can only match text that contains some literal, like `ERROR` in
+`ERROR(1|2)+`. `required_literal` finds such a literal in a DFA, so a search
+can rule out text that doesn't contain it with `str.find` or `bytes.find`,
+which run at C speed, before stepping through the text in Python.
+
+A state that every accepting path goes through is a cut state. Whenever one is
+left on the way to an accept state, the path has to follow the chain of states
+after it that only have one way forward, and whenever it is entered, it has to
+have come through the chain of states before it that only have one way in. The
+symbols along both chains make up a literal that every match contains. If the
+cut state is the start state, the literal is also a prefix of every match.
+"""
+
+import mmap
+import typing as t
+
+from redfa.charclass import CharClass
+from redfa.dfa import Dfa
+from redfa.transition import NonCharTransition, Transition
+
+
+__all__ = ["MAX_ANALYZED_STATES", "Literal", "required_literal"]
+
+
+# finding cut states takes a search per state, so big DFAs aren't analyzed
+MAX_ANALYZED_STATES = 1024
+
+
+class Literal(object):
+    def __init__(self, symbols: t.Sequence[Transition], prefix: bool) -> None:
+        self.prefix = prefix
+        # what to look for in a str and in bytes-like text. a literal that
+        # can't appear in one of them is None.
+        self.text: str | None = None
+        self.data: bytes | None = None
+        if all(type(symbol) == int for symbol in symbols):
+            self.data = bytes(t.cast(t.Sequence[int], symbols))
+        else:
+            self.text = "".join(t.cast(t.Sequence[str], symbols))
+            if all(ord(c) < 256 for c in self.text):
+                # bytes are matched as the characters with the same code points
+                self.data = self.text.encode("latin-1")
+
+    def __repr__(self) -> str:
+        return (
+            "Literal(" +
+            f"text={self.text!r}, " +
+            f"data={self.data!r}, " +
+            f"prefix={self.prefix}" +
+            ")"
+        )
+
+    def find(self, text: t.Sequence, pos: int, endpos: int) -> int | None:
+        """
+        Get the index of the first occurrence of this literal in
+        `text[pos:endpos]`, -1 if there is none, or None if `text` can't be
+        searched for it quickly.
+        """
+        if isinstance(text, str):
+            needle = self.text
+        elif isinstance(text, (bytes, bytearray, mmap.mmap)):
+            needle = self.data
+        else:
+            return None
+        if needle is None:
+            return -1
+        return text.find(needle, pos, endpos)  # type: ignore
+
+
+def _cut_states(dfa: Dfa, useful: t.Set[int]) -> t.List[int]:
+    """
+    Get the states that every path from the start to an accept state goes
+    through.
+    """
+    cuts: t.List[int] = []
+    for cut in useful:
+        if cut == dfa.start_:
+            cuts.append(cut)
+            continue
+        stack = [dfa.start_]
+        visited = {dfa.start_, cut}
+        reaches_accept = False
+        while stack and not reaches_accept:
+            state = stack.pop()
+            reaches_accept = state in dfa.accepts_
+            for dest in dfa.transitions_.get(state, {}).values():
+                if dest in useful and dest not in visited:
+                    visited.add(dest)
+                    stack.append(dest)
+        if not reaches_accept:
+            cuts.append(cut)
+    return cuts
+
+
+def required_literal(dfa: Dfa) -> Literal | None:
+    """
+    Find the longest literal that every string accepted by `dfa` contains,
+    using the cut states of `dfa`. Returns None if there is no such literal or
+    `dfa` is too big to analyze.
+    """
+    if len(dfa.states_) > MAX_ANALYZED_STATES:
+        return None
+    for edges in dfa.transitions_.values():
+        if any(type(symbol) == NonCharTransition for symbol in edges):
+            return None
+
+    # only the states on some path from the start to an accept state matter
+    reachable = {dfa.start_}
+    queue = [dfa.start_]
+    while queue:
+        for dest in dfa.transitions_.get(queue.pop(), {}).values():
+            if dest not in reachable:
+                reachable.add(dest)
+                queue.append(dest)
+    incoming: t.Dict[int, t.List[t.Tuple[int, Transition]]] = {s: [] for s in reachable}
+    for state in reachable:
+        for symbol, dest in dfa.transitions_.get(state, {}).items():
+            incoming[dest].append((state, symbol))
+    useful = reachable & dfa.accepts_
+    queue = list(useful)
+    while queue:
+        for source, _ in incoming[queue.pop()]:
+            if source not in useful:
+                useful.add(source)
+                queue.append(source)
+    if not useful:
+        return None
+
+    def useful_edges(state: int) -> t.List[t.Tuple[Transition, int]]:
+        return [
+            (symbol, dest)
+            for symbol, dest in dfa.transitions_.get(state, {}).items()
+            if dest in useful
+        ]
+
+    best: Literal | None = None
+    best_key = (0, False)
+    for cut in _cut_states(dfa, useful):
+        symbols: t.List[Transition] = []
+        # the states after it that have only one way forward
+        state = cut
+        visited = {state}
+        while state not in dfa.accepts_:
+            edges = useful_edges(state)
+            # a class matches more than one character, so it ends the literal
+            if len(edges) != 1 or edges[0][1] in visited or type(edges[0][0]) == CharClass:
+                break
+            symbols.append(edges[0][0])
+            state = edges[0][1]
+            visited.add(state)
+        # the states before it that have only one way in. the start state can
+        # also be entered without a symbol, at the beginning.
+        state = cut
+        visited = {state}
+        while state != dfa.start_:
+            edges = [
+                (source, symbol)
+                for source, symbol in incoming[state]
+                if source in useful
+            ]
+            if len(edges) != 1 or edges[0][0] in visited or type(edges[0][1]) == CharClass:
+                break
+            symbols.insert(0, edges[0][1])
+            state = edges[0][0]
+            visited.add(state)
+        prefix = state == dfa.start_ and (
+            cut == dfa.start_ or
+            not any(source in useful for source, _ in incoming[state])
+        )
+        # longer literals are rarer, and prefixes also tell where to start
+        key = (len(symbols), prefix)
+        if symbols and key > best_key:
+            best = Literal(symbols, prefix)
+            best_key = key
+    return best
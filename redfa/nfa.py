@@ -1,26 +1,77 @@
-from collections import defaultdict
+from collections import defaultdict, deque
 from copy import deepcopy
 import typing as t
 
+from redfa.charclass import CharClass
 from redfa.transition import NonCharTransition, Transition, text_to_transition
 
 
 Transitions = t.Dict[int, t.Dict[Transition, t.Set[int]]]
+# the class edges out of each state that has any
+ClassEdges = t.Dict[int, t.List[t.Tuple[CharClass, t.Set[int]]]]
 
 
-def transition_of(transitions: Transitions, state: int, transition: Transition) -> t.Set[int]:
-    default_out = {state} if type(transition) == NonCharTransition else set()
-    return transitions.get(state, dict()).get(transition, default_out)
+def class_edges_of(transitions: Transitions) -> ClassEdges:
+    class_edges: ClassEdges = {}
+    for state, edges in transitions.items():
+        classes = [(key, dests) for key, dests in edges.items() if type(key) == CharClass]
+        if classes:
+            class_edges[state] = classes
+    return class_edges
+
+
+def transition_of(
+    transitions: Transitions,
+    state: int,
+    transition: Transition,
+    class_edges: ClassEdges | None = None
+) -> t.Set[int]:
+    """
+    Get the states reached from `state` on `transition`. If `class_edges` is
+    given, only the states in it are checked for classes that `transition` is
+    in, instead of every edge out of `state`.
+    """
+    edges = transitions.get(state)
+    if type(transition) == NonCharTransition:
+        return {state} if edges is None else edges.get(transition, {state})
+    if edges is None:
+        return set()
+    dests = edges.get(transition, set())
+    if class_edges is None:
+        classes = [(key, ds) for key, ds in edges.items() if type(key) == CharClass]
+    else:
+        classes = class_edges.get(state, [])
+    # a character can also be in any of the classes out of the state
+    for key, class_dests in classes:
+        if transition in key:
+            dests = dests | class_dests
+    return dests
 
 
 def transition_states_of(
     transitions: Transitions,
     states: t.Set[int],
-    transition: Transition
+    transition: Transition,
+    class_edges: ClassEdges | None = None
 ) -> t.Set[int]:
-    dests = set()
+    dests: t.Set[int] = set()
+    if class_edges is None or type(transition) == NonCharTransition:
+        for state in states:
+            dests |= transition_of(transitions, state, transition, class_edges)
+        return dests
+    # the same as transition_of, without a call per state
     for state in states:
-        dests |= transition_of(transitions, state, transition)
+        edges = transitions.get(state)
+        if edges is None:
+            continue
+        found = edges.get(transition)
+        if found:
+            dests |= found
+        classes = class_edges.get(state)
+        if classes:
+            for key, class_dests in classes:
+                if transition in key:
+                    dests |= class_dests
     return dests
 
 
@@ -50,14 +101,20 @@ class Nfa(object):
         transitions: Transitions,
         accepts: t.Set[int],
         starts: t.Set[int],
-        groups: t.List[t.Tuple[int, int]] | None = None
+        groups: t.List[t.Tuple[int, int]] | None = None,
+        group_clones: t.Dict[int, t.List[t.Tuple[int, int]]] | None = None
     ) -> None:
         self.states_ = states
         self.transitions_ = transitions
         self.accepts_ = accepts
         self.starts_ = starts
         self.groups_ = groups or []
+        # copies of groups made by counted repetition, by group index. the
+        # spans of a group come from whichever copy was matched last.
+        self.group_clones_ = group_clones or {}
         self.reversed_transitions_: Transitions | None = None
+        self.closures_: t.Dict[int, t.FrozenSet[int]] = {}
+        self.class_edges_: ClassEdges | None = None
     
     def __repr__(self) -> str:
         return (
@@ -66,7 +123,8 @@ class Nfa(object):
             f"transitions={self.transitions_}, " +
             f"accepts={self.accepts_}, " +
             f"start={self.starts_}, " +
-            f"groups={self.groups_}" +
+            f"groups={self.groups_}, " +
+            f"group_clones={self.group_clones_}" +
             ")"
         )
     
@@ -76,7 +134,8 @@ class Nfa(object):
             "transitions": self.transitions_,
             "accepts": self.accepts_,
             "starts": self.starts_,
-            "groups": self.groups_
+            "groups": self.groups_,
+            "group_clones": self.group_clones_
         }
     
     def copy(self) -> "Nfa":
@@ -85,24 +144,53 @@ class Nfa(object):
             transitions=deepcopy(self.transitions_),
             accepts=self.accepts_.copy(),
             starts=self.starts_.copy(),
-            groups=self.groups_.copy()
+            groups=self.groups_.copy(),
+            group_clones={g: clones.copy() for g, clones in self.group_clones_.items()}
         )
     
     def starting_states(self) -> t.Set[int]:
         return self.starts_.copy()
     
     def transition(self, state: int, transition: Transition) -> t.Set[int]:
-        return transition_of(self.transitions_, state, transition)
+        return transition_of(self.transitions_, state, transition, self.class_edges())
+    
+    def class_edges(self) -> ClassEdges:
+        """
+        Get the class edges out of each state that has any, so that looking
+        up a character only checks classes where there are some.
+        """
+        if self.class_edges_ is None:
+            self.class_edges_ = class_edges_of(self.transitions_)
+        return self.class_edges_
     
     def epsilon_closure(self, srcs: t.Set[int]) -> t.Set[int]:
         """
         Get the set of states reachable from the states in `srcs` via only
-        epsilon transitions.
+        epsilon transitions. The closure of each state is computed once and
+        then reused until the NFA is modified.
+        """
+        closures = self.closures_
+        dests: t.Set[int] = set()
+        for src in srcs:
+            closure = closures.get(src)
+            if closure is None:
+                closure = frozenset(epsilon_closure_of(self.transitions_, {src}))
+                closures[src] = closure
+            dests |= closure
+        return dests
+    
+    def invalidate_caches(self) -> "Nfa":
+        """
+        Forget cached epsilon closures, class edges and reversed transitions.
+        This must be called after modifying `transitions_` directly.
         """
-        return epsilon_closure_of(self.transitions_, srcs)
+        self.closures_ = {}
+        self.class_edges_ = None
+        self.reversed_transitions_ = None
+        return self
     
     def transition_states(self, states: t.Set[int], transition: Transition) -> t.Set[int]:
-        return transition_states_of(self.transitions_, states, transition)
+        return transition_states_of(self.transitions_, states, transition, self.class_edges())
     
     def available_transitions(self, states: t.Set[int]) -> t.Set[Transition]:
         transitions: t.Set[Transition] = set()
@@ -120,7 +208,7 @@ class Nfa(object):
             s: {t: ds & self.states_ for t, ds in transitions.items()}
             for s, transitions in self.transitions_.items() if s in self.states_
         }
-        return self
+        return self.invalidate_caches()
     
     def remove_epsilon_transitions(self) -> "Nfa":
         """
@@ -151,23 +239,22 @@ class Nfa(object):
         # remove epsilon transitions
         for state, transitions in self.transitions_.items():
             transitions.pop(NonCharTransition.EPSILON, None)
+        self.invalidate_caches()
         return self.remove_deadends()
     
     def remove_unreachable(self) -> "Nfa":
         """
         Remove states that cannot be reached from a starting state.
         """
-        visited: t.Set[int] = set()
-        queue: t.List[int] = list(self.starting_states())
+        visited: t.Set[int] = self.starting_states()
+        queue: t.Deque[int] = deque(visited)
         # quick and easy bfs
         while len(queue) >= 1:
-            state = queue.pop(0)
-            visited.add(state)
-            more: t.Set[int] = set()
+            state = queue.popleft()
             for dests in self.transitions_.get(state, dict()).values():
-                more |= dests
-            more -= visited
-            queue.extend(more)
+                more = dests - visited
+                visited |= more
+                queue.extend(more)
         self.states_ = visited
         return self.remove_unregistered_states()
     
@@ -177,19 +264,17 @@ class Nfa(object):
         """
         deadends: t.Set[int] = set()
         for start in self.starting_states():
-            visited: t.Set[int] = set()
-            queue: t.List[int] = [start]
+            visited: t.Set[int] = {start}
+            queue: t.Deque[int] = deque(visited)
             # quick and easy bfs
             while len(queue) >= 1:
-                state = queue.pop(0)
+                state = queue.popleft()
                 if self.accepts(state):
                     break
-                visited.add(state)
-                more: t.Set[int] = set()
                 for dests in self.transitions_.get(state, dict()).values():
-                    more |= dests
-                more -= visited
-                queue.extend(more)
+                    more = dests - visited
+                    visited |= more
+                    queue.extend(more)
             else: # while loop breaks when an accept node is found
                 continue
             deadends.add(start)
@@ -208,6 +293,23 @@ class Nfa(object):
     def without_deadends(self) -> "Nfa":
         return self.copy().remove_deadends()
     
+    def reversed(self) -> "Nfa":
+        """
+        Create an NFA that accepts the reverse of every string this NFA
+        accepts. Groups are not carried over.
+        """
+        transitions: Transitions = {}
+        for s, ts in self.transitions_.items():
+            for t, ds in ts.items():
+                for d in ds:
+                    transitions.setdefault(d, {}).setdefault(t, set()).add(s)
+        return Nfa(
+            states=self.states_.copy(),
+            transitions=transitions,
+            accepts=self.starts_.copy(),
+            starts=self.accepts_.copy()
+        )
+    
     def reversed_transitions(self) -> Transitions:
         if self.reversed_transitions_ is not None:
             return self.reversed_transitions_
@@ -228,6 +330,8 @@ class NfaTraveller(object):
     def __init__(self, nfa: Nfa) -> None:
         self.nfa_ = nfa
         self.text_: str | None = None
+        # whether the first step is a START transition instead of a character
+        self.started_ = True
         self.history_: t.List[t.Tuple[t.Set[int], int]] = [(nfa.starting_states(), 0)]
     
     def consume_epsilon(self):
@@ -243,15 +347,16 @@ class NfaTraveller(object):
         if len(dests) <= 0:
             return False
         substr_len = self.history_[-1][1]
-        if type(transition) == str:
+        if type(transition) != NonCharTransition:
             substr_len += 1
         self.history_.append((dests, substr_len))
         return True
     
-    def travel(self, text: str, *, start: bool = True):
+    def travel(self, text: str, *, start: bool = True, end: bool = True):
         self.text_ = text
+        self.started_ = start
         self.consume_epsilon()
-        for transition in text_to_transition(text, start=start):
+        for transition in text_to_transition(text, start=start, end=end):
             if not self.consume(transition):
                 break
             self.consume_epsilon()
@@ -282,7 +387,8 @@ class NfaTraveller(object):
         # last state in the trail
         journey = [(last_frontier & self.nfa_.accepts_, length)]
         reversed_transitions = self.nfa_.reversed_transitions()
-        for i in range(latest_good_index-1, 0, -1):
+        # the last step back to history_[0] is handled below if it was START
+        for i in range(latest_good_index-1, 0 if self.started_ else -1, -1):
             # get the possible states that led to the next trail
             # via epsilon transitions
             frontier = epsilon_closure_of(reversed_transitions, journey[0][0])
@@ -361,13 +467,18 @@ class NfaTraveller(object):
                 else:
                     close_span() # otherwise close previous span first
                     new_span()
-            result[group] = spans
+            result[group] = [(b + offset, e + offset) for b, e in spans]
         return result
 
 
-def find(nfa: Nfa, text: str) -> t.Tuple[int, int] | None:
+def find(
+    nfa: Nfa,
+    text: str,
+    *,
+    traveller_type: t.Callable[[Nfa], NfaTraveller] = NfaTraveller
+) -> t.Tuple[int, int] | None:
     for start_index in range(len(text) + 1):
-        traveller = NfaTraveller(nfa)
+        traveller = traveller_type(nfa)
         traveller.travel(text[start_index:], start=(start_index == 0))
         length = traveller.length()
         if length is not None:
@@ -1,11 +1,21 @@
+from collections import deque
 import typing as t
 
+from redfa.charclass import join_intervals, split_intervals
 from redfa.dfa import Dfa
 from redfa.nfa import Nfa
 from redfa.transition import NonCharTransition, Transition
 
+if t.TYPE_CHECKING:
+    from redfa.instrument import Stats
 
-def nfa2dfa(nfa: Nfa) -> Dfa:
+
+def nfa2dfa(nfa: Nfa, *, stats: "Stats | None" = None) -> Dfa:
+    """
+    Convert `nfa` into a DFA with the subset construction. If `stats` is
+    given, the number of DFA states created and epsilon closures computed are
+    added to it once the construction is done.
+    """
     nfa = nfa.without_deadends()
     
     def set_to_tuple(s: t.Set[int]) -> t.Tuple[int, ...]:
@@ -13,47 +23,52 @@ def nfa2dfa(nfa: Nfa) -> Dfa:
         l.sort()
         return tuple(l)
     
-    queue: t.List[t.Set[int]] = [nfa.epsilon_closure(nfa.starting_states())]
-    # mapping of nfa states to dfa states
-    states_mapping: t.Dict[t.Tuple[int, ...], int] = {}
-    index = 0
-    transitions: t.Dict[int, t.Dict[Transition, int]] = {}
-    visited: t.Set[t.Tuple[int, ...]] = set()
+    start = nfa.epsilon_closure(nfa.starting_states())
+    # mapping of nfa states to dfa states. a set of states is queued when it
+    # is first mapped, so each one is only expanded once.
+    states_mapping: t.Dict[t.Tuple[int, ...], int] = {set_to_tuple(start): 0}
+    index = 1
+    transitions: t.Dict[int, t.Dict[Transition, int]] = {0: {}}
+    queue: t.Deque[t.Set[int]] = deque([start])
     
     # each state in dfa can be mapped to a set of states in nfa
-    while len(queue) >= 1:
-        nfa_states = queue.pop(0)
+    while queue:
+        nfa_states = queue.popleft()
         nfa_states_tuple = set_to_tuple(nfa_states)
         
-        # add nfa set of states to states mapping
-        if nfa_states_tuple not in states_mapping:
-            states_mapping[nfa_states_tuple] = index
-            transitions[index] = {}
-            index += 1
-        
-        # add destinations including after epsilon transitions
-        for transition in nfa.available_transitions(nfa_states):
-            # don't include epsilon transitions, they would have been dealt with
-            # by the next step in previous iterations
-            if transition == NonCharTransition.EPSILON:
-                continue
-            
-            next_states = nfa.epsilon_closure(nfa.transition_states(nfa_states, transition))
+        def add_transition(symbol: Transition) -> int:
+            """
+            Get the dfa state reached on `symbol`, queueing it if it's new.
+            """
+            nonlocal index
+            next_states = nfa.epsilon_closure(nfa.transition_states(nfa_states, symbol))
             next_states_tuple = set_to_tuple(next_states)
             
             if next_states_tuple not in states_mapping:
                 states_mapping[next_states_tuple] = index
                 transitions[index] = {}
                 index += 1
-            
-            # add transition from set a to set b
-            transitions[
-                states_mapping[nfa_states_tuple]
-            ][transition] = states_mapping[next_states_tuple]
-            
-            if next_states_tuple not in visited:
                 queue.append(next_states)
-        visited.add(nfa_states_tuple)
+            return states_mapping[next_states_tuple]
+        
+        edges = transitions[states_mapping[nfa_states_tuple]]
+        available = nfa.available_transitions(nfa_states)
+        # add destinations including after epsilon transitions
+        for transition in available:
+            # don't include epsilon transitions, they would have been dealt with
+            # by the next step in previous iterations
+            if type(transition) == NonCharTransition and transition != NonCharTransition.EPSILON:
+                edges[transition] = add_transition(transition)
+        # characters and classes can overlap, so they are split into pieces
+        # that lead to the same states throughout, and the pieces that lead to
+        # the same dfa state are joined back together
+        targets: t.List[t.Tuple[int, int, Transition | None, int]] = []
+        for lo, hi, literal, _ in split_intervals([
+            c for c in available if type(c) != NonCharTransition
+        ]):
+            symbol = lo if literal is None else literal
+            targets.append((lo, hi, literal, add_transition(symbol)))
+        edges.update(join_intervals(targets))
     
     # any nfa set of states with at least one accept state in the set maps to
     # an accept state in dfa
@@ -63,4 +78,9 @@ def nfa2dfa(nfa: Nfa) -> Dfa:
     }
     dfa_states = set(states_mapping.values())
     
-    return Dfa(dfa_states, transitions, dfa_accepts, 0)
\ No newline at end of file
+    if stats is not None:
+        stats.dfa_states += len(dfa_states)
+        # nfa is a fresh copy, so its closure cache only holds what was used
+        stats.closures += len(nfa.closures_)
+    
+    return Dfa(dfa_states, transitions, dfa_accepts, 0)
@@ -0,0 +1,293 @@
+"""
+Searching with a pool of worker processes.
+
+Scanning is pure Python, so threads don't help. The compiled regex is
+serialized once and handed to every worker process as it starts, so only the
+texts are sent over afterwards.
+
+`find_many` searches many texts, a batch of them per task. `find_parallel`
+searches one large text by splitting it into chunks. Since the state a chunk
+is entered in isn't known until the chunks before it have been scanned, each
+chunk is scanned from every state of the DFA at once. Runs from different
+states usually end up in the same state after a few symbols and are merged,
+so this costs little more than a single run. The results for each chunk are
+then stitched together in order.
+"""
+
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+import itertools
+import os
+import typing as t
+
+from redfa.regex import Regex, _as_symbols
+from redfa.table import DEAD, DfaTable
+
+
+__all__ = ["DEFAULT_MIN_CHUNK_SIZE", "find_many", "find_parallel"]
+
+
+# batches in flight per worker, so workers don't sit idle between batches
+# without reading the whole input ahead
+BATCHES_PER_WORKER = 2
+
+# chunks smaller than this aren't worth sending to another process
+DEFAULT_MIN_CHUNK_SIZE = 1 << 16
+
+# the regex of the current worker process
+_regex: Regex | None = None
+
+
+def _init_worker(data: bytes, reverse: bytes | None = None) -> None:
+    global _regex
+    _regex = Regex.from_bytes(data)
+    # saves every worker from building it again
+    if reverse is not None:
+        _regex.reverse_table = DfaTable.from_bytes(reverse)
+
+
+def _find_batch(texts: t.List[t.Sequence]) -> t.List[t.Tuple[int, int] | None]:
+    assert _regex is not None
+    return [_regex.find(text) for text in texts]
+
+
+class _Run(object):
+    """
+    One or more runs that are in the same state. `last` is where it last
+    accepted, up until it was merged into its `parent`.
+    """
+    __slots__ = ("state", "last", "parent")
+    
+    def __init__(self, state: int) -> None:
+        self.state = state
+        self.last: int | None = None
+        self.parent: "_Run | None" = None
+
+
+# the state a run ends in, and where it last accepts
+_Outcome = t.Tuple[int, int | None]
+
+
+def _simulate(
+    table: DfaTable,
+    text: t.Sequence,
+    origins: t.Iterable[int],
+    backward: bool = False
+) -> t.Dict[int, _Outcome]:
+    """
+    Run `table` over all of `text` from each state in `origins`. Forwards, a
+    run accepts at `i` if it is in an accept state after `text[:i]`.
+    Backwards, if it is after `text[i:]`, so the last accept is the leftmost
+    one. Accepting in the state it starts in doesn't count.
+    """
+    rows = table.table_
+    classes = table.classes_
+    accepts = table.accepts_
+    leaves = {origin: _Run(origin) for origin in origins if origin != DEAD}
+    runs = {run.state: run for run in leaves.values()}
+    indices = range(len(text) - 1, -1, -1) if backward else range(len(text))
+    for i in indices:
+        if not runs:
+            break
+        cls = classes[text[i]]
+        at = i if backward else i + 1
+        moved: t.Dict[int, _Run] = {}
+        merges: t.Set[int] = set()
+        for run in runs.values():
+            state = rows[run.state + cls]
+            run.state = state
+            if not state:
+                continue
+            other = moved.get(state)
+            if other is None:
+                moved[state] = run
+                continue
+            # they have the same future from here on
+            if state not in merges:
+                merges.add(state)
+                moved[state] = _Run(state)
+                other.parent = moved[state]
+            run.parent = moved[state]
+        for state, run in moved.items():
+            if accepts[state]:
+                run.last = at
+        runs = moved
+    
+    outcomes: t.Dict[int, _Outcome] = {}
+    for origin, run in leaves.items():
+        last = None
+        node: _Run | None = run
+        while node is not None:
+            if node.last is not None:
+                last = node.last
+            state = node.state
+            node = node.parent
+        outcomes[origin] = (state, last)
+    return outcomes
+
+
+def _simulate_chunk(
+    name: str,
+    text: t.Sequence,
+    backward: bool
+) -> t.Dict[int, _Outcome]:
+    assert _regex is not None
+    table = getattr(_regex, name)
+    return _simulate(table, text, range(0, len(table.table_), table.nclasses_), backward)
+
+
+def _batches(texts: t.Iterable[t.Sequence], size: int) -> t.Iterator[t.List[t.Sequence]]:
+    iterator = iter(texts)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def find_many(
+    regex: Regex,
+    texts: t.Iterable[t.Sequence],
+    *,
+    workers: int | None = None,
+    chunksize: int = 64,
+    ordered: bool = True
+) -> t.Iterator[t.Any]:
+    """
+    Find the leftmost-longest match of `regex` in each of `texts` using
+    `workers` processes, `os.cpu_count()` by default. Texts are sent to the
+    workers `chunksize` at a time and only a few batches are read ahead, so
+    `texts` can be a long or lazy iterable.
+
+    If `ordered` is true, the results are yielded in the same order as
+    `texts`. Otherwise `(index, result)` pairs are yielded as soon as their
+    batch is done.
+    """
+    if chunksize < 1:
+        raise ValueError("chunksize must be at least 1")
+    if workers is None:
+        workers = os.cpu_count() or 1
+    data = regex.to_bytes()
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(data,)) as executor:
+        limit = BATCHES_PER_WORKER * workers
+        batches = enumerate(_batches(texts, chunksize))
+        if ordered:
+            queue: t.Deque[Future] = deque()
+            for _, batch in batches:
+                queue.append(executor.submit(_find_batch, batch))
+                if len(queue) >= limit:
+                    yield from queue.popleft().result()
+            while queue:
+                yield from queue.popleft().result()
+        else:
+            # maps each pending future to the index of its first text
+            pending: t.Dict[Future, int] = {}
+            exhausted = False
+            while pending or not exhausted:
+                while not exhausted and len(pending) < limit:
+                    item = next(batches, None)
+                    if item is None:
+                        exhausted = True
+                    else:
+                        pending[executor.submit(_find_batch, item[1])] = item[0] * chunksize
+                if not pending:
+                    break
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    offset = pending.pop(future)
+                    for i, result in enumerate(future.result()):
+                        yield offset + i, result
+
+
+def find_parallel(
+    regex: Regex,
+    text: t.Sequence,
+    pos: int = 0,
+    endpos: int | None = None,
+    *,
+    workers: int | None = None,
+    chunksize: int | None = None
+) -> t.Tuple[int, int] | None:
+    """
+    Find the leftmost-longest match of `regex` in `text[pos:endpos]`, scanning
+    chunks of `chunksize` symbols in `workers` processes. By default, the text
+    is split evenly between the workers, with chunks of at least
+    `DEFAULT_MIN_CHUNK_SIZE`. The regex must have been compiled without
+    `RegexFlag.LAZY` or `RegexFlag.NFA`, since the chunks are scanned from
+    every state of its DFA. If its reverse table is too large to build, the
+    text is searched with `Regex.find` in this process instead.
+    """
+    if regex.automaton is None:
+        raise ValueError("parallel search needs a fully built dfa")
+    assert isinstance(regex.table, DfaTable)
+    reverse = regex.reverse_table_()
+    if reverse is None:
+        return regex.find(text, pos, endpos)
+    text = _as_symbols(regex, text)
+    if endpos is None:
+        endpos = len(text)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if chunksize is None:
+        chunksize = max(-(-(endpos - pos) // workers), DEFAULT_MIN_CHUNK_SIZE)
+    if chunksize < 1:
+        raise ValueError("chunksize must be at least 1")
+    
+    def chunk(begin: int) -> t.Sequence:
+        piece = text[begin:min(begin + chunksize, endpos)]
+        # memoryviews can't be pickled
+        return piece.tobytes() if isinstance(piece, memoryview) else piece
+    
+    data = regex.to_bytes()
+    initargs = (data, reverse.to_bytes())
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=initargs) as executor:
+        # the leftmost start, from an unanchored backwards pass
+        begins = range(pos, endpos, chunksize)
+        futures = [
+            executor.submit(_simulate_chunk, "reverse_table", chunk(begin), True)
+            for begin in begins
+        ]
+        # the state each chunk is entered in is only known once the chunks to
+        # its right are done
+        entries = []
+        state = reverse.start()
+        for future in reversed(futures):
+            entries.append(state)
+            if not state:
+                break
+            state = future.result()[state][0]
+        start = endpos if reverse.accepts(reverse.start()) else None
+        for begin, future, state in zip(reversed(begins), reversed(futures), entries):
+            if state:
+                leftmost = future.result()[state][1]
+                if leftmost is not None:
+                    start = begin + leftmost
+        for future in futures:
+            future.cancel()
+        if start is None:
+            return None
+        
+        # the end of the longest match from there, from an anchored forwards
+        # pass. most matches are short, so the first chunk is scanned here
+        # before anything is sent to the workers.
+        table = regex.table
+        end = start if table.accepts(table.start()) else None
+        state, last = _simulate(table, chunk(start), [table.start()])[table.start()]
+        if last is not None:
+            end = start + last
+        begins = range(start + chunksize, endpos, chunksize)
+        if not state or not begins:
+            return start, end
+        futures = [
+            executor.submit(_simulate_chunk, "table", chunk(begin), False)
+            for begin in begins
+        ]
+        for begin, future in zip(begins, futures):
+            state, last = future.result()[state]
+            if last is not None:
+                end = begin + last
+            if not state:
+                break
+        for future in futures:
+            future.cancel()
+        return start, end
@@ -0,0 +1,156 @@
+"""
+A Pike VM.
+
+`PikeVm` simulates an NFA with one thread per active state. Each thread carries
+where its match started and its group tags. Threads are kept in order of
+preference, and when two reach the same state only the preferred one is kept,
+using the same closure as `Tdfa`. A search finds the leftmost-longest match and
+the spans of its groups in one forward pass. It takes O(len(text) * states)
+time and O(states) memory whatever the pattern and the text are, with no cache
+of determinized states that could grow.
+"""
+
+import typing as t
+
+from redfa.nfa import Nfa
+from redfa.table import SymbolClasses, nfa_symbol_classes
+from redfa.tdfa import UNSET, Root, group_tags, priority_closure, thread_states
+
+
+__all__ = ["PikeVm"]
+
+
+# the source of threads that begin a new match
+NEW = -1
+
+# the span of the match and the spans of the groups
+Match = t.Tuple[t.Tuple[int, int], t.List[t.Tuple[int, int]]]
+
+
+class PikeVm(object):
+    def __init__(self, nfa: Nfa) -> None:
+        self.nfa_ = nfa.without_deadends()
+        classes, representatives = nfa_symbol_classes(self.nfa_)
+        self.classes_: SymbolClasses = classes
+        self.representatives_ = representatives
+        self.ngroups_ = len(nfa.groups_)
+        self.tags_ = group_tags(nfa)
+        self.kept_ = thread_states(self.nfa_)
+        self.starts_ = sorted(self.nfa_.starts_)
+
+    def __repr__(self) -> str:
+        return (
+            "PikeVm(" +
+            f"states={len(self.nfa_.states_)}, " +
+            f"groups={self.ngroups_}" +
+            ")"
+        )
+
+    def search(self, text: t.Sequence, pos: int = 0, endpos: int | None = None) -> Match | None:
+        """
+        Find the leftmost-longest match in `text[pos:endpos]` and where its
+        groups matched.
+        """
+        return self.run_(text, pos, endpos, anchored=False)
+
+    def match(self, text: t.Sequence, pos: int = 0, endpos: int | None = None) -> Match | None:
+        """
+        Find the longest match that starts at `pos`.
+        """
+        return self.run_(text, pos, endpos, anchored=True)
+
+    def groups(
+        self,
+        text: t.Sequence,
+        start: int,
+        end: int
+    ) -> t.List[t.Tuple[int, int]] | None:
+        """
+        See `Tdfa.groups`.
+        """
+        found = self.run_(text, start, end, anchored=True)
+        if found is None or found[0][1] != end:
+            return None
+        return found[1]
+
+    def run_(
+        self,
+        text: t.Sequence,
+        pos: int,
+        endpos: int | None,
+        anchored: bool
+    ) -> Match | None:
+        if endpos is None:
+            endpos = len(text)
+        nfa = self.nfa_
+        accepts = nfa.accepts_
+        classes = self.classes_
+        blank = (UNSET,) * (2 * self.ngroups_)
+        starting: t.List[Root] = [(s, NEW, ()) for s in self.starts_]
+
+        # the state, match start and tags of each thread, in order of preference
+        threads: t.List[int] = []
+        origins: t.List[int] = []
+        registers: t.List[t.Tuple[int, ...]] = []
+        roots: t.List[Root] = []
+        best: t.Tuple[int, int, t.Tuple[int, ...]] | None = None
+        i = pos
+        while True:
+            # matches that start later have the lowest priority, and none
+            # are started once one has been found
+            if best is None and (i == pos or not anchored):
+                roots.extend(starting)
+            next_threads, operations = priority_closure(nfa, self.tags_, self.kept_, roots)
+            next_origins: t.List[int] = []
+            next_registers: t.List[t.Tuple[int, ...]] = []
+            for src, crossed in operations:
+                if src == NEW:
+                    origin, tags = i, blank
+                else:
+                    origin, tags = origins[src], registers[src]
+                if crossed:
+                    updated = list(tags)
+                    for tag in crossed:
+                        updated[tag] = i
+                    tags = tuple(updated)
+                next_origins.append(origin)
+                next_registers.append(tags)
+            threads, origins, registers = next_threads, next_origins, next_registers
+
+            for j, state in enumerate(threads):
+                if state in accepts:
+                    origin = origins[j]
+                    if best is None or origin < best[0] or (origin == best[0] and i > best[1]):
+                        best = (origin, i, registers[j])
+                    break
+            if best is not None:
+                # a thread that started later can't beat it anymore
+                kept = [j for j, origin in enumerate(origins) if origin <= best[0]]
+                if len(kept) < len(threads):
+                    threads = [threads[j] for j in kept]
+                    origins = [origins[j] for j in kept]
+                    registers = [registers[j] for j in kept]
+                if not threads:
+                    break
+            if i >= endpos:
+                break
+
+            roots = []
+            cls = classes[text[i]]
+            if cls != 0:
+                symbol = self.representatives_[cls - 1]
+                for j, state in enumerate(threads):
+                    for dest in sorted(nfa.transition(state, symbol)):
+                        roots.append((dest, j, ()))
+            i += 1
+            if not roots and (best is not None or anchored):
+                break
+
+        if best is None:
+            return None
+        start, end, tags = best
+        return (start, end), [
+            (tags[2 * g], tags[2 * g + 1])
+            if tags[2 * g] != UNSET and tags[2 * g + 1] != UNSET else (UNSET, UNSET)
+            for g in range(self.ngroups_)
+        ]
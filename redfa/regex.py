@@ -1,28 +1,679 @@
+from enum import IntFlag
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
 import typing as t
 
-from redfa.dfa import Dfa, find as dfa_find
-from redfa.exception import MalformedRegexError
+from redfa import __version__
+from redfa.bitnfa import BitNfa
+from redfa.cache import LruCache
+from redfa.dfa import Dfa
+from redfa.exception import MalformedRegexError, RegexError, RegexTooLargeError
+from redfa.lazy import LazyDfa
+from redfa.literal import Literal, required_literal
+from redfa.nfa import Nfa
 from redfa.nfa2dfa import nfa2dfa
-from redfa.thompson import thompson
+from redfa.pikevm import PikeVm
+from redfa.serial import Reader
+from redfa.table import DfaTable, dfa2table, nfa2table
+from redfa.tdfa import UNSET, Tdfa, nfa2tdfa
+from redfa.thompson import DEFAULT_STATE_LIMIT, thompson
 
+if t.TYPE_CHECKING:
+    from redfa.instrument import InstrumentedRegex
+    from redfa.regexset import RegexSet
 
-__all__ = ["Regex", "compile", "find"]
+
+__all__ = [
+    "RegexFlag",
+    "Regex",
+    "RegexMatch",
+    "compile",
+    "find",
+    "purge",
+    "cache_info",
+    "set_cache_size",
+    "set_cache_dir",
+    "get_state_limit",
+    "set_state_limit"
+]
+
+
+class RegexFlag(IntFlag):
+    NOFLAG = 0
+    # keep the raw subset construction instead of minimizing it
+    NOMINIMIZE = 1
+    # determinize on demand instead of building the whole dfa up front
+    LAZY = 2
+    # simulate the nfa with bitmasks instead of determinizing it at all
+    NFA = 4
+    # match bytes, with non-ascii characters in the pattern encoded as utf-8
+    BYTES = 8
+
+
+DEFAULT_CACHE_SIZE = 512
+# the unanchored search and reverse tables can take exponentially more states
+# than the anchored dfa, so they are only built if they stay within a multiple
+# of its size
+SEARCH_STATE_FACTOR = 8
+MIN_SEARCH_STATES = 256
+REGEX_MAGIC = b"RDFR"
+REGEX_FORMAT = 3
+
+
+def _search_limit(automaton: Dfa) -> int:
+    """
+    Get the most states an unanchored table built alongside `automaton` can
+    have.
+    """
+    return max(MIN_SEARCH_STATES, SEARCH_STATE_FACTOR * len(automaton.states_))
+
+
+def _search_table(nfa: Nfa, automaton: Dfa) -> DfaTable | LazyDfa:
+    """
+    Build the unanchored table for `nfa`, falling back to a `LazyDfa` if it
+    needs many more states than `automaton`.
+    """
+    try:
+        return nfa2table(nfa, unanchored=True, max_states=_search_limit(automaton))
+    except RegexTooLargeError:
+        return LazyDfa(nfa, unanchored=True)
+
+
+def _as_symbols(regex: "Regex | RegexSet", text: t.Sequence) -> t.Sequence:
+    """
+    Check that `text` can be searched by `regex`, or a set of regexes, and
+    view memoryviews as unsigned bytes.
+    """
+    if isinstance(text, memoryview):
+        return text.cast("B") if text.format != "B" else text
+    if regex.flags & RegexFlag.BYTES and isinstance(text, str):
+        raise TypeError("cannot use a bytes pattern on a str")
+    return text
+
+
+class RegexMatch(object):
+    """
+    A match of `regex` in `string`. Group spans are worked out the first time
+    they are asked for, with a tagged DFA pass over the match, or a Pike VM
+    pass for regexes compiled with `RegexFlag.NFA`. Groups are
+    numbered by their opening brackets from 1, and group 0 is the whole match.
+    Like `re`, a group that didn't take part in the match has the span
+    `(-1, -1)` and the substring None.
+    
+    The groups come from the most preferred way of matching the span, which
+    is what `re` picks too, with one difference. After a loop iteration, `re`
+    tries one more, and if that one matches the empty string, it keeps the
+    groups it set. Here a loop never takes an empty iteration, so
+    `((c{0,2})+)?` on "cc" gives group 2 the span (0, 2), where `re` gives
+    (2, 2).
+    """
+    def __init__(self, regex: "Regex", string: t.Sequence, start: int, end: int) -> None:
+        self.regex = regex
+        self.string = string
+        self.span_ = (start, end)
+        self.groups_: t.List[t.Tuple[int, int]] | None = None
+
+    def __repr__(self) -> str:
+        start, end = self.span_
+        return f"RegexMatch(span={self.span_}, match={self.string[start:end]!r})"
+
+    def __getitem__(self, group: int) -> t.Sequence | None:
+        return self.group(group)
+
+    def span(self, group: int = 0) -> t.Tuple[int, int]:
+        if group == 0:
+            return self.span_
+        if self.groups_ is None:
+            groups = self.regex.submatcher_().groups(self.string, *self.span_)
+            assert groups is not None
+            self.groups_ = groups
+        if not 0 <= group <= len(self.groups_):
+            raise IndexError("no such group")
+        return self.groups_[group - 1]
+
+    def start(self, group: int = 0) -> int:
+        return self.span(group)[0]
+
+    def end(self, group: int = 0) -> int:
+        return self.span(group)[1]
+
+    def group(self, group: int = 0) -> t.Sequence | None:
+        start, end = self.span(group)
+        if start == UNSET:
+            return None
+        return self.string[start:end]
+
+    def groups(self, default: t.Any = None) -> t.Tuple[t.Any, ...]:
+        """
+        Get the substrings of every group, with `default` for the groups that
+        didn't take part in the match.
+        """
+        captured = [self.group(g) for g in range(1, len(self.regex.nfa.groups_) + 1)]
+        return tuple(default if c is None else c for c in captured)
 
 
 class Regex(object):
-    def __init__(self, automaton: Dfa) -> None:
+    def __init__(
+        self,
+        automaton: Dfa | None,
+        nfa: Nfa,
+        pattern: str | None = None,
+        flags: int = RegexFlag.NOFLAG,
+        tables: t.Tuple[DfaTable, DfaTable | None] | None = None
+    ) -> None:
+        self.pattern = pattern
+        self.flags = RegexFlag(flags)
+        # the dict form is kept around for inspection, the tables are what
+        # actually gets run. lazy and nfa regexes don't have a dict form.
         self.automaton = automaton
+        self.nfa = nfa
+        self.table: DfaTable | LazyDfa | BitNfa
+        self.search_table: DfaTable | LazyDfa | BitNfa
+        if self.flags & RegexFlag.NFA:
+            self.table = BitNfa(nfa)
+            self.search_table = BitNfa(nfa, unanchored=True)
+        elif automaton is None:
+            self.table = LazyDfa(nfa)
+            self.search_table = LazyDfa(nfa, unanchored=True)
+        else:
+            # anchored, finds the end of the longest match from a given start
+            self.table = dfa2table(automaton) if tables is None else tables[0]
+            # unanchored, finds where the earliest ending match ends
+            if tables is not None and tables[1] is not None:
+                self.search_table = tables[1]
+            else:
+                self.search_table = _search_table(nfa, automaton)
+        # only built for parallel searches, its subset construction can take
+        # far more states than the forward one
+        self.reverse_table: DfaTable | None = None
+        # whether the reverse table was found to be too large to build
+        self.reverse_too_large = False
+        # only built if groups are asked for
+        self.submatcher: Tdfa | PikeVm | None = None
+        # a literal that every match contains, to skip text without it
+        self.literal: Literal | None = None
+        # the longest a match can be, if there is a limit
+        self.max_length: int | None = None
+        if automaton is not None:
+            self.literal = required_literal(automaton)
+            self.max_length = automaton.max_length()
+
+    def to_bytes(self) -> bytes:
+        """
+        Serialize this regex into a compact binary format that can be read
+        back with `Regex.from_bytes`. The DFA and its tables are included, so
+        loading it skips the subset construction and minimization. A search
+        table that was too large to build is left out and stays lazy. Regexes
+        compiled with `RegexFlag.LAZY` or `RegexFlag.NFA` only store their
+        pattern, since they are cheap to compile.
+        """
+        if self.pattern is None:
+            raise ValueError("cannot serialize a regex without its pattern")
+        pattern = self.pattern.encode("utf-8")
+        sections: t.List[bytes] = []
+        if self.automaton is not None:
+            assert isinstance(self.table, DfaTable)
+            sections = [self.automaton.to_bytes(), self.table.to_bytes()]
+            if isinstance(self.search_table, DfaTable):
+                sections.append(self.search_table.to_bytes())
+        data = struct.pack(
+            "<4sBIIB",
+            REGEX_MAGIC,
+            REGEX_FORMAT,
+            int(self.flags),
+            len(pattern),
+            len(sections)
+        ) + pattern
+        for section in sections:
+            data += struct.pack("<I", len(section)) + section
+        return data
+
+    @staticmethod
+    def from_bytes(data: bytes) -> "Regex":
+        """
+        Load a regex serialized with `Regex.to_bytes`. Raises `ValueError` if
+        `data` is truncated or was written by an incompatible version, and
+        `RegexTooLargeError` if its pattern needs more NFA states than allowed
+        by `set_state_limit`.
+        """
+        reader = Reader(data)
+        reader.header(REGEX_MAGIC, REGEX_FORMAT)
+        flags, size, nsections = reader.unpack("<IIB")
+        pattern = reader.take(size).decode("utf-8")
+        sections = [reader.take(reader.unpack("<I")[0]) for _ in range(nsections)]
+        reader.done()
+        nfa = thompson(pattern, utf8=bool(flags & RegexFlag.BYTES), state_limit=_state_limit)
+        if nfa is None:
+            raise MalformedRegexError("could not parse regex")
+        if not sections:
+            return Regex(None, nfa, pattern, flags)
+        if len(sections) not in (2, 3):
+            raise ValueError(f"expected 2 or 3 sections, found {len(sections)}")
+        automaton = Dfa.from_bytes(sections[0])
+        table = DfaTable.from_bytes(sections[1])
+        search_table = DfaTable.from_bytes(sections[2]) if len(sections) == 3 else None
+        return Regex(automaton, nfa, pattern, flags, (table, search_table))
+
+    def find(
+        self,
+        text: t.Sequence,
+        pos: int = 0,
+        endpos: int | None = None
+    ) -> t.Tuple[int, int] | None:
+        """
+        Find the leftmost-longest match in `text[pos:endpos]`. This takes two
+        forward passes instead of one scan per starting index, neither of
+        which reads any further than the match could still get longer.
+        """
+        text = _as_symbols(self, text)
+        if endpos is None:
+            endpos = len(text)
+        return self.locate_(text, pos, endpos)
+
+    def match(
+        self,
+        text: t.Sequence,
+        pos: int = 0,
+        endpos: int | None = None
+    ) -> RegexMatch | None:
+        """
+        Match the longest prefix of `text[pos:endpos]` that this regex can.
+        The scan stops as soon as no longer match is possible, so this takes
+        time in the length of the match rather than of the text.
+        """
+        text = _as_symbols(self, text)
+        end = self.table.longest(text, pos, endpos)
+        if end is None:
+            return None
+        return RegexMatch(self, text, pos, end)
+
+    def fullmatch(
+        self,
+        text: t.Sequence,
+        pos: int = 0,
+        endpos: int | None = None
+    ) -> RegexMatch | None:
+        """
+        Match all of `text[pos:endpos]`, or nothing. The scan stops as soon as
+        it reaches a state from which no match can be completed.
+        """
+        text = _as_symbols(self, text)
+        if endpos is None:
+            endpos = len(text)
+        if self.table.longest(text, pos, endpos) != endpos:
+            return None
+        return RegexMatch(self, text, pos, endpos)
+
+    def search(
+        self,
+        text: t.Sequence,
+        pos: int = 0,
+        endpos: int | None = None
+    ) -> RegexMatch | None:
+        """
+        Like `Regex.find`, but returns a match object that can also tell
+        where the groups matched.
+        """
+        span = self.find(text, pos, endpos)
+        if span is None:
+            return None
+        return RegexMatch(self, _as_symbols(self, text), *span)
+
+    def finditer(
+        self,
+        text: t.Sequence,
+        pos: int = 0,
+        endpos: int | None = None
+    ) -> t.Generator[t.Tuple[int, int], None, None]:
+        """
+        Yield the spans of all non-overlapping matches in `text[pos:endpos]`
+        from left to right. Empty matches are handled the same way as `re`:
+        they are allowed right after a non-empty match, but never twice at the
+        same position.
+        """
+        text = _as_symbols(self, text)
+        if endpos is None:
+            endpos = len(text)
+        # each match is found when it is asked for, reading about as far as
+        # it ends, so the first ones come out without scanning the whole text
+        while pos <= endpos:
+            found = self.locate_(text, pos, endpos)
+            if found is None:
+                return
+            start, end = found
+            yield start, end
+            pos = end if end > start else end + 1
+
+    def findall(self, text: t.Sequence, pos: int = 0, endpos: int | None = None) -> t.List[t.Sequence]:
+        """
+        Get the substrings of all non-overlapping matches in `text[pos:endpos]`.
+        """
+        return [text[b:e] for b, e in self.finditer(text, pos, endpos)]
+
+    def find_many(
+        self,
+        texts: t.Iterable[t.Sequence],
+        *,
+        workers: int | None = None,
+        chunksize: int = 64,
+        ordered: bool = True
+    ) -> t.Iterator[t.Any]:
+        """
+        Find the leftmost-longest match in each of `texts` in parallel, using a
+        pool of worker processes. See `redfa.parallel.find_many`.
+        """
+        from redfa.parallel import find_many
+        return find_many(self, texts, workers=workers, chunksize=chunksize, ordered=ordered)
 
-    def find(self, text: str) -> t.Tuple[int, int] | None:
-        return dfa_find(self.automaton, text)
+    def find_parallel(
+        self,
+        text: t.Sequence,
+        pos: int = 0,
+        endpos: int | None = None,
+        *,
+        workers: int | None = None,
+        chunksize: int | None = None
+    ) -> t.Tuple[int, int] | None:
+        """
+        Like `Regex.find`, but `text` is split into chunks that are scanned by
+        a pool of worker processes. See `redfa.parallel.find_parallel`.
+        """
+        from redfa.parallel import find_parallel
+        return find_parallel(self, text, pos, endpos, workers=workers, chunksize=chunksize)
 
+    def instrumented(
+        self,
+        hook: t.Callable[[t.Dict[str, int]], t.Any] | None = None
+    ) -> "InstrumentedRegex":
+        """
+        Get a copy of this regex that counts what its searches do in its
+        `stats`, calling `hook` with the counts after each search. This regex
+        itself isn't slowed down. See `redfa.instrument`.
+        """
+        from redfa.instrument import InstrumentedRegex, Stats
+        return InstrumentedRegex(self, Stats(hook))
 
-def compile(regex: str) -> Regex:
-    nfa = thompson(regex)
+    def search_file(
+        self,
+        path: str | os.PathLike,
+        start: int = 0,
+        end: int | None = None
+    ) -> t.Tuple[int, int] | None:
+        """
+        Find the leftmost-longest match in the bytes `start:end` of the file at
+        `path`, returning byte offsets. The file is memory-mapped and scanned
+        without being read into memory or decoded, and only the part of it
+        that the search reads is ever paged in. Unless the regex was compiled
+        with `RegexFlag.BYTES`, each byte is treated as the character with the
+        same code point.
+        """
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return self.find(b"", start, end)
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return self.find(mapped, start, end)
+
+    def finditer_file(
+        self,
+        path: str | os.PathLike,
+        start: int = 0,
+        end: int | None = None
+    ) -> t.Generator[t.Tuple[int, int], None, None]:
+        """
+        Like `Regex.search_file`, but yields the spans of all non-overlapping
+        matches. Each match is found when it is asked for, so the first ones
+        don't read the rest of the file. The file stays mapped until the
+        generator is exhausted or closed.
+        """
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                yield from self.finditer(b"", start, end)
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                yield from self.finditer(mapped, start, end)
+
+    def submatcher_(self) -> Tdfa | PikeVm:
+        """
+        Get what finds the groups of a match. A tagged DFA keeps at most as
+        many states as the lazy DFA of a `RegexFlag.LAZY` regex would, flushing
+        them when it is full. Regexes that are kept as NFAs use a Pike VM,
+        which runs in time linear in the text with a fixed amount of memory.
+        """
+        if self.submatcher is None:
+            if self.flags & RegexFlag.NFA:
+                self.submatcher = PikeVm(self.nfa)
+            elif isinstance(self.table, LazyDfa):
+                self.submatcher = nfa2tdfa(self.nfa, max_states=self.table.max_states_)
+            else:
+                self.submatcher = nfa2tdfa(self.nfa)
+        return self.submatcher
+
+    def reverse_table_(self) -> DfaTable | None:
+        """
+        Get the minimized unanchored table over the reversed NFA, which finds
+        where the leftmost match starts when run from right to left. Only
+        regexes with a DFA have one. Returns None if it would need many more
+        states than the DFA, like counted repetitions such as `[a-z]{14}x` do.
+        """
+        if self.reverse_table is None and not self.reverse_too_large:
+            if self.automaton is None:
+                raise ValueError("only regexes with a dfa have a reverse table")
+            try:
+                self.reverse_table = nfa2table(
+                    self.nfa.reversed(),
+                    unanchored=True,
+                    max_states=_search_limit(self.automaton)
+                ).minimized()
+            except RegexTooLargeError:
+                self.reverse_too_large = True
+        return self.reverse_table
+
+    def window_(self, pos: int, earliest: int) -> int:
+        """
+        Get where the leftmost match can start at the earliest, given where
+        the earliest ending match ends. Every match ends there or later, so
+        none can start more than `max_length` before it.
+        """
+        if self.max_length is None:
+            return pos
+        return max(pos, earliest - self.max_length)
+
+    def locate_(self, text: t.Sequence, pos: int, endpos: int) -> t.Tuple[int, int] | None:
+        """
+        Find the leftmost-longest match in `text[pos:endpos]`, which has
+        already been converted to symbols.
+        """
+        found = self.earliest_(text, pos, endpos)
+        if found is None:
+            return None
+        start, earliest = found
+        # the earliest ending match isn't necessarily the leftmost one, so
+        # the match is found by running from every start at once instead
+        span = self.table.leftmost(text, self.window_(start, earliest), endpos)
+        assert span is not None
+        return span
+
+    def earliest_(self, text: t.Sequence, pos: int, endpos: int) -> t.Tuple[int, int] | None:
+        """
+        Find where the earliest ending match in `text[pos:endpos]` ends, along
+        with an index that no match starts before. Returns None if there is no
+        match.
+
+        The required literal is used to jump to the first place a match could
+        start. If matches have a maximum length, each occurrence of the
+        literal is then only scanned around, and the scan jumps on to the next
+        one when no match is found there. Otherwise the scan goes on from the
+        first occurrence, since a match can start any distance before it.
+        """
+        literal = self.literal
+        length = self.max_length
+        while literal is not None:
+            found = literal.find(text, pos, endpos)
+            if found is None:
+                # can't be searched quickly
+                break
+            if found < 0:
+                return None
+            # matches start with a prefix, but can start before an inner
+            # literal, as far as they are long
+            if literal.prefix:
+                start = found
+            elif length is None:
+                start = pos
+            else:
+                start = max(pos, found - length)
+            stop = endpos if length is None else min(endpos, start + 2 * length)
+            earliest = self.search_table.earliest(text, start, stop)
+            if earliest is not None:
+                return start, earliest
+            if stop == endpos:
+                return None
+            # any match that started early enough to end by stop was ruled out
+            pos = stop - t.cast(int, length) + 1
+        # cheap rejection, most texts don't contain a match at all
+        earliest = self.search_table.earliest(text, pos, endpos)
+        return None if earliest is None else (pos, earliest)
+
+
+# compiled patterns shared by every caller in this process
+_cache: LruCache[t.Tuple[str, int], Regex] = LruCache(DEFAULT_CACHE_SIZE)
+# where compiled patterns are saved between processes, if anywhere
+_cache_dir: str | None = None
+# the most NFA states a pattern can compile to
+_state_limit = DEFAULT_STATE_LIMIT
+
+
+def _cache_path(regex: str, flags: int) -> str:
+    assert _cache_dir is not None
+    key = f"{__version__}\0{REGEX_FORMAT}\0{int(flags)}\0{regex}".encode("utf-8")
+    return os.path.join(_cache_dir, hashlib.sha256(key).hexdigest() + ".rdfr")
+
+
+def _load_cached(regex: str, flags: int) -> Regex | None:
+    try:
+        with open(_cache_path(regex, flags), "rb") as f:
+            compiled = Regex.from_bytes(f.read())
+    except (OSError, ValueError, struct.error, RegexError):
+        # missing or unreadable, just compile it again
+        return None
+    # guard against hash collisions
+    if compiled.pattern != regex or compiled.flags != flags:
+        return None
+    return compiled
+
+
+def _save_cached(compiled: Regex) -> None:
+    assert compiled.pattern is not None
+    path = _cache_path(compiled.pattern, compiled.flags)
+    temporary: str | None = None
+    try:
+        # a file of its own, so that threads saving the same pattern don't
+        # write into the same one
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), suffix=".tmp", delete=False) as f:
+            temporary = f.name
+            f.write(compiled.to_bytes())
+        # other processes never see a half written file
+        os.replace(temporary, path)
+    except OSError:
+        if temporary is not None and os.path.exists(temporary):
+            try:
+                os.remove(temporary)
+            except OSError:
+                pass
+
+
+def compile(regex: str, flags: int = RegexFlag.NOFLAG) -> Regex:
+    """
+    Compile `regex`. Compiled patterns are cached, so compiling the same
+    pattern with the same flags again is cheap. If a cache directory has been
+    set with `set_cache_dir`, compiled patterns are also saved there and
+    loaded by later processes.
+    
+    Raises `RegexTooLargeError` if the pattern needs more NFA states than
+    allowed by `set_state_limit`.
+    """
+    key = (regex, int(flags))
+    compiled = _cache.get(key)
+    if compiled is not None:
+        return compiled
+    if _cache_dir is not None:
+        compiled = _load_cached(regex, flags)
+        if compiled is not None:
+            _cache.put(key, compiled)
+            return compiled
+    nfa = thompson(regex, utf8=bool(flags & RegexFlag.BYTES), state_limit=_state_limit)
     if nfa is None:
         raise MalformedRegexError("could not parse regex")
-    return Regex(nfa2dfa(nfa))
+    dfa: Dfa | None = None
+    if not flags & (RegexFlag.LAZY | RegexFlag.NFA):
+        dfa = nfa2dfa(nfa)
+        if not flags & RegexFlag.NOMINIMIZE:
+            dfa.minimize()
+    compiled = Regex(dfa, nfa, regex, flags)
+    _cache.put(key, compiled)
+    if _cache_dir is not None:
+        _save_cached(compiled)
+    return compiled
+
+
+def find(regex: str, text: str, flags: int = RegexFlag.NOFLAG) -> t.Tuple[int, int] | None:
+    return compile(regex, flags).find(text)
+
+
+def purge() -> None:
+    """
+    Clear the compiled pattern cache.
+    """
+    _cache.purge()
+
+
+def cache_info() -> t.Dict[str, int]:
+    """
+    Get the hit, miss and eviction counts of the compiled pattern cache, along
+    with its current and maximum size.
+    """
+    return _cache.stats()
+
+
+def set_cache_size(maxsize: int) -> None:
+    """
+    Change how many compiled patterns are kept, evicting the least recently
+    used ones if needed. 0 disables the cache.
+    """
+    _cache.resize(maxsize)
+
+
+def set_cache_dir(path: str | os.PathLike | None) -> None:
+    """
+    Save compiled patterns in the directory at `path`, creating it if needed,
+    so that other processes can load them instead of compiling them again.
+    Entries are keyed by a hash of the pattern, the flags and the library
+    version. None turns this off.
+    """
+    global _cache_dir
+    if path is None:
+        _cache_dir = None
+        return
+    os.makedirs(path, exist_ok=True)
+    _cache_dir = os.fspath(path)
+
+
+def get_state_limit() -> int:
+    """
+    Get how many NFA states a pattern can compile to.
+    """
+    return _state_limit
 
 
-def find(regex: str, text: str) -> t.Tuple[int, int] | None:
-    return compile(regex).find(text)
\ No newline at end of file
+def set_state_limit(limit: int = DEFAULT_STATE_LIMIT) -> None:
+    """
+    Change how many NFA states a pattern can compile to. Patterns that were
+    already compiled and cached aren't affected.
+    """
+    global _state_limit
+    if limit < 1:
+        raise ValueError("limit must be at least 1")
+    _state_limit = limit
@@ -0,0 +1,113 @@
+import typing as t
+
+from redfa.exception import MalformedRegexError, RegexTooLargeError
+from redfa.lazy import LazyDfa
+from redfa.nfa import Nfa, Transitions
+from redfa.regex import RegexFlag, _as_symbols, get_state_limit
+from redfa.table import DfaTable, nfa2table
+from redfa.thompson import thompson
+from redfa.transition import NonCharTransition
+
+
+__all__ = ["RegexSet"]
+
+
+def _combine(nfas: t.Sequence[Nfa]) -> t.Tuple[Nfa, t.Dict[int, int]]:
+    """
+    Put `nfas` side by side behind a new starting state 0, and tag the accept
+    states of each NFA with its index in `nfas`.
+    """
+    states: t.Set[int] = {0}
+    transitions: Transitions = {0: {NonCharTransition.EPSILON: set()}}
+    accepts: t.Set[int] = set()
+    tags: t.Dict[int, int] = {}
+    offset = 1
+    for index, nfa in enumerate(nfas):
+        states |= {s + offset for s in nfa.states_}
+        for s, edges in nfa.transitions_.items():
+            transitions[s + offset] = {
+                c: {d + offset for d in ds} for c, ds in edges.items()
+            }
+        transitions[0][NonCharTransition.EPSILON] |= {s + offset for s in nfa.starts_}
+        for a in nfa.accepts_:
+            accepts.add(a + offset)
+            tags[a + offset] = index
+        offset += max(nfa.states_) + 1
+    return Nfa(states, transitions, accepts, {0}), tags
+
+
+class RegexSet(object):
+    """
+    Match many patterns at once. All patterns are combined into one NFA with
+    tagged accept states and determinized into a single unanchored table, so
+    finding out which patterns occur in a text takes one pass over it.
+    
+    With `RegexFlag.LAZY`, the table is a `LazyDfa` that only determinizes
+    the states the text reaches, since the combined DFA of many patterns can
+    be huge. `RegexFlag.BYTES` works as it does for `compile`.
+    
+    Raises `RegexTooLargeError` if the combined NFA needs more states than
+    allowed by `set_state_limit`.
+    """
+    def __init__(self, patterns: t.Iterable[str], flags: int = RegexFlag.NOFLAG) -> None:
+        self.patterns = list(patterns)
+        self.flags = RegexFlag(flags)
+        if self.flags & RegexFlag.NFA:
+            raise ValueError("regex sets can't be kept as nfas, use RegexFlag.LAZY")
+        limit = get_state_limit()
+        nfas: t.List[Nfa] = []
+        for pattern in self.patterns:
+            nfa = thompson(pattern, utf8=bool(self.flags & RegexFlag.BYTES), state_limit=limit)
+            if nfa is None:
+                raise MalformedRegexError(f"could not parse regex {pattern!r}")
+            nfas.append(nfa)
+        self.nfa, tags = _combine(nfas)
+        if len(self.nfa.states_) > limit:
+            raise RegexTooLargeError(f"regex set needs more than {limit} states")
+        self.table: DfaTable | LazyDfa
+        if self.flags & RegexFlag.LAZY:
+            self.table = LazyDfa(self.nfa, unanchored=True, tags=tags)
+        else:
+            self.table = nfa2table(self.nfa, unanchored=True, tags=tags)
+    
+    def __len__(self) -> int:
+        return len(self.patterns)
+    
+    def matches(self, text: t.Sequence, pos: int = 0, endpos: int | None = None) -> t.Set[int]:
+        """
+        Get the indices of the patterns that match somewhere in
+        `text[pos:endpos]`.
+        """
+        text = _as_symbols(self, text)
+        if endpos is None:
+            endpos = len(text)
+        table = self.table.table_
+        classes = self.table.classes_
+        accepts = self.table.accepts_
+        tags = self.table.tags_
+        everything = len(self.patterns)
+        state = self.table.start_
+        matched: t.Set[int] = set(tags[state]) if accepts[state] else set()
+        if isinstance(self.table, LazyDfa):
+            # a flush renumbers the states, but clears these in place
+            step = self.table.step
+            for i in range(pos, endpos):
+                if len(matched) >= everything:
+                    break
+                state = step(state, text[i])
+                if accepts[state]:
+                    matched |= tags[state]
+            return matched
+        for i in range(pos, endpos):
+            if len(matched) >= everything:
+                break
+            state = table[state + classes[text[i]]]
+            if accepts[state]:
+                matched |= tags[state]
+        return matched
+    
+    def is_match(self, text: t.Sequence, pos: int = 0, endpos: int | None = None) -> bool:
+        """
+        Check if any of the patterns match somewhere in `text[pos:endpos]`.
+        """
+        return self.table.earliest(_as_symbols(self, text), pos, endpos) is not None
@@ -0,0 +1,140 @@
+"""
+Helpers for the binary formats of `Dfa`, `DfaTable` and `Regex`.
+
+Every format starts with a 4 byte magic string and a format version byte, and
+stores integers little-endian.
+"""
+
+from array import array
+import struct
+import sys
+import typing as t
+
+from redfa.charclass import CharClass
+from redfa.transition import NonCharTransition, Transition
+
+
+__all__ = [
+    "Reader",
+    "pack_array",
+    "encode_transition",
+    "decode_transition",
+    "flatten_classes",
+    "unflatten_classes"
+]
+
+
+# kinds of transitions
+CHAR = 0
+BYTE = 1
+NONCHAR = 2
+CLASS = 3
+NONCHARS = list(NonCharTransition)
+
+
+def pack_array(items: array) -> bytes:
+    if sys.byteorder != "little":
+        items = array(items.typecode, items)
+        items.byteswap()
+    return items.tobytes()
+
+
+def encode_transition(
+    transition: Transition,
+    classes: t.List[CharClass] | None = None
+) -> t.Tuple[int, int]:
+    """
+    Get the kind of `transition` and an int that identifies it within that
+    kind. Character classes don't fit in an int, so they are added to
+    `classes` and identified by their index in it.
+    """
+    if type(transition) == str:
+        return CHAR, ord(transition)
+    elif type(transition) == int:
+        return BYTE, transition
+    elif type(transition) == NonCharTransition:
+        return NONCHAR, NONCHARS.index(transition)
+    elif type(transition) == CharClass and classes is not None:
+        classes.append(transition)
+        return CLASS, len(classes) - 1
+    raise ValueError(f"cannot serialize transition {transition!r}")
+
+
+def decode_transition(
+    kind: int,
+    value: int,
+    classes: t.Sequence[CharClass] = ()
+) -> Transition:
+    if kind == CHAR:
+        return chr(value)
+    elif kind == BYTE:
+        return value
+    elif kind == NONCHAR:
+        return NONCHARS[value]
+    elif kind == CLASS:
+        if value >= len(classes):
+            raise ValueError(f"unknown character class {value}")
+        return classes[value]
+    raise ValueError(f"unknown transition kind {kind}")
+
+
+def flatten_classes(classes: t.Sequence[CharClass]) -> array:
+    """
+    Store each of `classes` as its number of intervals followed by their
+    first and last code points.
+    """
+    items = array("I")
+    for char_class in classes:
+        items.append(len(char_class.ranges))
+        for lo, hi in char_class.ranges:
+            items.extend((lo, hi))
+    return items
+
+
+def unflatten_classes(items: array) -> t.List[CharClass]:
+    classes: t.List[CharClass] = []
+    i = 0
+    while i < len(items):
+        end = i + 1 + 2 * items[i]
+        if end > len(items):
+            raise ValueError("character class is truncated")
+        classes.append(CharClass(zip(items[i + 1:end:2], items[i + 2:end:2])))
+        i = end
+    return classes
+
+
+class Reader(object):
+    def __init__(self, data: bytes) -> None:
+        self.data_ = memoryview(data)
+        self.offset_ = 0
+    
+    def header(self, magic: bytes, version: int) -> None:
+        """
+        Check the magic string and format version at the current offset.
+        """
+        found, found_version = self.unpack("<4sB")
+        if found != magic:
+            raise ValueError(f"expected {magic!r}, found {found!r}")
+        if found_version != version:
+            raise ValueError(f"unsupported format version {found_version}, expected {version}")
+    
+    def take(self, size: int) -> bytes:
+        if self.offset_ + size > len(self.data_):
+            raise ValueError("data is truncated")
+        chunk = self.data_[self.offset_:self.offset_ + size].tobytes()
+        self.offset_ += size
+        return chunk
+    
+    def unpack(self, fmt: str) -> t.Tuple[t.Any, ...]:
+        return struct.unpack(fmt, self.take(struct.calcsize(fmt)))
+    
+    def array(self, typecode: str, count: int) -> array:
+        items = array(typecode)
+        items.frombytes(self.take(count * items.itemsize))
+        if sys.byteorder != "little":
+            items.byteswap()
+        return items
+    
+    def done(self) -> None:
+        if self.offset_ != len(self.data_):
+            raise ValueError("unexpected data at the end")
@@ -0,0 +1,135 @@
+"""
+Matching over text that arrives in chunks.
+
+`StreamMatcher` finds the same non-overlapping leftmost-longest matches as
+`Regex.finditer`, but the text is fed to it a chunk at a time and match spans
+come out as absolute offsets as soon as they are decided. Pending runs only
+carry their states, so the only text kept around is the chunks that a match
+that was found but not decided yet may have to be rescanned from.
+"""
+
+from collections import deque
+import typing as t
+
+from redfa.bitnfa import BitNfa
+from redfa.lazy import LazyDfa
+from redfa.regex import Regex
+from redfa.table import LeftmostScan
+
+
+__all__ = ["StreamMatcher"]
+
+
+class StreamMatcher(object):
+    """
+    Runs the anchored table of a regex from every position at once, the same
+    way `DfaTable.leftmost` does, one symbol at a time. A match is decided as
+    soon as no run that started at or before it is left, and the scan then
+    goes on from where it ends, so every symbol is stepped about as many times
+    as `Regex.finditer` would step it.
+    """
+    def __init__(self, regex: Regex) -> None:
+        # a lazy dfa renumbers its states when its cache is flushed, so the
+        # states of pending runs wouldn't survive that
+        self.engine_: t.Any = regex.table
+        if isinstance(self.engine_, LazyDfa):
+            self.engine_ = BitNfa(regex.nfa)
+        # the chunks that are kept, with the absolute offset of each
+        self.chunks_: t.Deque[t.Tuple[int, t.Sequence]] = deque()
+        # how much has been fed in all
+        self.size_ = 0
+        # absolute offset of the next item to be scanned
+        self.pos_ = 0
+        # matches may not start before this
+        self.resume_ = 0
+        self.runs_ = self.restart_()
+        self.finished_ = False
+    
+    def feed(self, chunk: t.Sequence) -> t.List[t.Tuple[int, int]]:
+        """
+        Scan the next chunk of the stream and return the spans of the matches
+        that it completes.
+        """
+        if self.finished_:
+            raise ValueError("stream has already been finished")
+        if chunk:
+            self.chunks_.append((self.size_, chunk))
+            self.size_ += len(chunk)
+        spans = self.scan_()
+        # emit_ only goes back to where a pending match ends, and runs only
+        # need their states, so the chunks before that are never read again
+        keep = self.runs_.end_ if self.runs_.found_ >= 0 else self.pos_
+        while self.chunks_ and self.chunks_[0][0] + len(self.chunks_[0][1]) <= keep:
+            self.chunks_.popleft()
+        return spans
+    
+    def finish(self) -> t.List[t.Tuple[int, int]]:
+        """
+        Mark the end of the stream and return the spans of the remaining
+        matches.
+        """
+        if self.finished_:
+            raise ValueError("stream has already been finished")
+        self.finished_ = True
+        spans: t.List[t.Tuple[int, int]] = []
+        while True:
+            spans.extend(self.scan_())
+            # past the end after an empty match there
+            if self.pos_ > self.size_:
+                break
+            self.add_()
+            # no run can go any further
+            self.runs_.runs_ = {}
+            if self.runs_.found_ < 0:
+                break
+            spans.append(self.emit_())
+        self.chunks_.clear()
+        return spans
+    
+    def scan_(self) -> t.List[t.Tuple[int, int]]:
+        """
+        Step through the kept chunks up to the end of the last one, emitting
+        matches as they are decided.
+        """
+        spans: t.List[t.Tuple[int, int]] = []
+        index = 0
+        while index < len(self.chunks_):
+            base, chunk = self.chunks_[index]
+            if self.pos_ < base:
+                # emit_ went back into an earlier chunk
+                index -= 1
+                continue
+            end = base + len(chunk)
+            while self.pos_ < end:
+                self.add_()
+                self.pos_ += 1
+                self.runs_.advance(chunk[self.pos_ - base - 1], self.pos_)
+                if self.runs_.done():
+                    spans.append(self.emit_())
+                    if self.pos_ < base:
+                        break
+            if self.pos_ >= end:
+                index += 1
+        return spans
+    
+    def restart_(self) -> LeftmostScan:
+        engine = self.engine_
+        return LeftmostScan(engine.start(), engine.step, engine.accepts)
+    
+    def add_(self) -> None:
+        """
+        Start a run at `pos_`, unless matches can't start there.
+        """
+        if self.pos_ >= self.resume_:
+            self.runs_.add(self.pos_)
+    
+    def emit_(self) -> t.Tuple[int, int]:
+        """
+        Return the match that was found and go back to where it ends, since
+        no runs have been started since it was found.
+        """
+        found, end = self.runs_.found_, self.runs_.end_
+        self.resume_ = end if end > found else end + 1
+        self.pos_ = self.resume_
+        self.runs_ = self.restart_()
+        return found, end
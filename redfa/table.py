@@ -0,0 +1,605 @@
+"""
+Flat, integer-indexed transition tables for running compiled automata.
+
+A `Dfa` stores its transitions as a dict of dicts, which is nice to inspect but
+slow to step through one character at a time. `DfaTable` lowers that into a
+single `array` indexed by state and symbol class, with state 0 reserved as a
+dead state that every missing transition leads to.
+
+Only character transitions are lowered. `NonCharTransition` edges are not
+represented in the table since `thompson` never produces them; use
+`redfa.dfa.find` for hand-made automata that rely on them.
+"""
+
+from array import array
+from bisect import bisect_right
+import struct
+import typing as t
+
+from redfa.charclass import Piece, codepoint, split_intervals
+from redfa.dfa import Dfa
+from redfa.exception import RegexTooLargeError
+from redfa.nfa import Nfa
+from redfa.serial import Reader, decode_transition, encode_transition, pack_array
+from redfa.transition import NonCharTransition, Transition
+
+
+__all__ = [
+    "DEAD",
+    "SymbolClasses",
+    "DfaTable",
+    "LeftmostScan",
+    "nfa_symbol_classes",
+    "dfa2table",
+    "nfa2table",
+    "find"
+]
+
+
+DEAD = 0
+TABLE_MAGIC = b"RDFT"
+TABLE_FORMAT = 2
+
+
+class SymbolClasses(dict):
+    """
+    Mapping of symbols to their symbol class. Symbols that never appear in the
+    automaton fall into class 0.
+    
+    Bytes are looked up as the character with the same code point, so that
+    `bytes` and `mmap` objects can be scanned directly without decoding them.
+    Automata compiled for bytes have int symbols, which are found directly.
+    
+    Character classes give whole intervals of code points a symbol class.
+    Those are found with a binary search the first time a symbol is looked up,
+    and then cached like any other symbol.
+    """
+    def __init__(self, intervals: t.Iterable[t.Tuple[int, int, int]] = ()) -> None:
+        super().__init__()
+        # (first code point, last code point, class), sorted and disjoint
+        self.intervals_: t.List[t.Tuple[int, int, int]] = []
+        for lo, hi, cls in sorted(intervals):
+            if self.intervals_ and self.intervals_[-1][1] + 1 == lo and self.intervals_[-1][2] == cls:
+                self.intervals_[-1] = (self.intervals_[-1][0], hi, cls)
+            else:
+                self.intervals_.append((lo, hi, cls))
+        self.starts_ = [lo for lo, _, _ in self.intervals_]
+    
+    def __missing__(self, key: t.Any) -> int:
+        cp = codepoint(key)
+        if cp is None:
+            return 0
+        cls = self.get(chr(key), 0) if type(key) == int else 0
+        if cls == 0:
+            cls = self.interval_class(cp)
+        self[key] = cls
+        return cls
+    
+    def interval_class(self, cp: int) -> int:
+        """
+        Get the class of the interval that code point `cp` is in, or 0.
+        """
+        i = bisect_right(self.starts_, cp) - 1
+        if i >= 0 and cp <= self.intervals_[i][1]:
+            return self.intervals_[i][2]
+        return 0
+    
+    def symbols(self) -> t.Dict[t.Any, int]:
+        """
+        Get the symbols that were given a class of their own, leaving out the
+        ones that have only been looked up.
+        """
+        return {
+            symbol: cls for symbol, cls in self.items()
+            if cls != 0 and self.interval_class(t.cast(int, codepoint(symbol))) != cls
+        }
+
+
+class DfaTable(object):
+    """
+    A DFA stored as a flat transition table.
+    
+    `table_` holds `nclasses_` entries per state. To save a multiplication per
+    character, states are identified by the offset of their row in `table_`,
+    so the next state is `table_[state + classes_[char]]`. `accepts_` is
+    indexed the same way.
+    """
+    def __init__(
+        self,
+        classes: SymbolClasses,
+        nclasses: int,
+        table: array,
+        accepts: bytearray,
+        start: int,
+        tags: t.Dict[int, t.FrozenSet[int]] | None = None
+    ) -> None:
+        self.classes_ = classes
+        self.nclasses_ = nclasses
+        self.table_ = table
+        self.accepts_ = accepts
+        self.start_ = start
+        # tags of the nfa accept states in each accepting state, if any
+        self.tags_ = tags or {}
+    
+    def __repr__(self) -> str:
+        return (
+            "DfaTable(" +
+            f"states={self.state_count()}, " +
+            f"classes={self.nclasses_}, " +
+            f"start={self.start_}" +
+            ")"
+        )
+    
+    def state_count(self) -> int:
+        return len(self.table_) // self.nclasses_
+    
+    def to_bytes(self) -> bytes:
+        """
+        Serialize this table into a compact binary format that can be read
+        back with `DfaTable.from_bytes`.
+        """
+        classes = array("I")
+        for symbol, cls in self.classes_.symbols().items():
+            kind, value = encode_transition(symbol)
+            classes.extend((kind, value, cls))
+        intervals = array("I", (n for interval in self.classes_.intervals_ for n in interval))
+        tags = array("I")
+        for state, state_tags in sorted(self.tags_.items()):
+            tags.extend((state, len(state_tags)))
+            tags.extend(sorted(state_tags))
+        header = struct.pack(
+            "<4sBIIIIII",
+            TABLE_MAGIC,
+            TABLE_FORMAT,
+            self.nclasses_,
+            len(self.table_),
+            self.start_,
+            len(classes) // 3,
+            len(intervals) // 3,
+            len(tags)
+        )
+        return (
+            header +
+            pack_array(classes) +
+            pack_array(intervals) +
+            pack_array(array("I", self.table_)) +
+            bytes(self.accepts_) +
+            pack_array(tags)
+        )
+    
+    @staticmethod
+    def from_bytes(data: bytes) -> "DfaTable":
+        """
+        Load a table serialized with `DfaTable.to_bytes`.
+        """
+        reader = Reader(data)
+        reader.header(TABLE_MAGIC, TABLE_FORMAT)
+        nclasses, size, start, nsymbols, nintervals, ntags = reader.unpack("<IIIIII")
+        entries = reader.array("I", nsymbols * 3)
+        intervals = reader.array("I", nintervals * 3)
+        table = array("l", reader.array("I", size))
+        accepts = bytearray(reader.take(size))
+        tag_items = reader.array("I", ntags)
+        reader.done()
+        classes = SymbolClasses(
+            tuple(intervals[i:i + 3]) for i in range(0, len(intervals), 3)  # type: ignore
+        )
+        for i in range(0, len(entries), 3):
+            kind, value, cls = entries[i:i + 3]
+            classes[decode_transition(kind, value)] = cls
+        tags: t.Dict[int, t.FrozenSet[int]] = {}
+        i = 0
+        while i < len(tag_items):
+            state, count = tag_items[i], tag_items[i + 1]
+            tags[state] = frozenset(tag_items[i + 2:i + 2 + count])
+            i += 2 + count
+        return DfaTable(classes, nclasses, table, accepts, start, tags)
+    
+    def minimized(self) -> "DfaTable":
+        """
+        Get an equivalent table with as few states as possible, for tables
+        built straight from an NFA. States are merged with Moore's partition
+        refinement, which only keeps states apart if they differ in whether
+        they accept, in their tags, or in where their rows lead. The dead
+        state stays 0.
+        """
+        nclasses = self.nclasses_
+        rows = self.table_
+        count = len(rows) // nclasses
+    
+        def renumber(keys: t.List[t.Hashable]) -> t.List[int]:
+            # in order of first appearance, so the dead state's block is 0
+            ids: t.Dict[t.Hashable, int] = {}
+            return [ids.setdefault(key, len(ids)) for key in keys]
+    
+        blocks = renumber([
+            (self.accepts_[s * nclasses], self.tags_.get(s * nclasses)) for s in range(count)
+        ])
+        while True:
+            refined = renumber([
+                (blocks[s],) + tuple(
+                    blocks[rows[s * nclasses + c] // nclasses] for c in range(nclasses)
+                )
+                for s in range(count)
+            ])
+            if max(refined) == max(blocks):
+                break
+            blocks = refined
+    
+        representatives: t.Dict[int, int] = {}
+        for s in range(count):
+            representatives.setdefault(blocks[s], s)
+        table = array("l")
+        accepts = bytearray(len(representatives) * nclasses)
+        tags: t.Dict[int, t.FrozenSet[int]] = {}
+        for b, s in sorted(representatives.items()):
+            table.extend(blocks[d // nclasses] * nclasses for d in rows[s * nclasses:(s + 1) * nclasses])
+            accepts[b * nclasses] = self.accepts_[s * nclasses]
+            if s * nclasses in self.tags_:
+                tags[b * nclasses] = self.tags_[s * nclasses]
+        start = blocks[self.start_ // nclasses] * nclasses
+        return DfaTable(self.classes_, nclasses, table, accepts, start, tags)
+    
+    def start(self) -> int:
+        return self.start_
+    
+    def step(self, state: int, symbol: t.Any) -> int:
+        return self.table_[state + self.classes_[symbol]]
+    
+    def accepts(self, state: int) -> bool:
+        return bool(self.accepts_[state])
+    
+    def longest(self, text: t.Sequence, pos: int = 0, endpos: int | None = None) -> int | None:
+        """
+        Run the table from `pos` and return the end of the longest match that
+        starts there, or None if there is none.
+        """
+        if endpos is None:
+            endpos = len(text)
+        table = self.table_
+        classes = self.classes_
+        accepts = self.accepts_
+        state = self.start_
+        last = pos if accepts[state] else None
+        for i in range(pos, endpos):
+            state = table[state + classes[text[i]]]
+            if not state:
+                break
+            if accepts[state]:
+                last = i + 1
+        return last
+    
+    def earliest(self, text: t.Sequence, pos: int = 0, endpos: int | None = None) -> int | None:
+        """
+        Run the table from `pos` and return the first position at which it is
+        in an accept state, or None if it never is. On an unanchored table this
+        is where the earliest ending match in `text[pos:endpos]` ends.
+        """
+        if endpos is None:
+            endpos = len(text)
+        table = self.table_
+        classes = self.classes_
+        accepts = self.accepts_
+        state = self.start_
+        if accepts[state]:
+            return pos
+        for i in range(pos, endpos):
+            state = table[state + classes[text[i]]]
+            if not state:
+                return None
+            if accepts[state]:
+                return i + 1
+        return None
+    
+    def leftmost(
+        self,
+        text: t.Sequence,
+        pos: int = 0,
+        endpos: int | None = None
+    ) -> t.Tuple[int, int] | None:
+        """
+        Run an anchored table from every index of `text[pos:endpos]` at once
+        and return the span of the leftmost-longest match, or None if there
+        is none. Runs that reach the same state have the same future, so only
+        the one that started first is kept, and no more runs are started once
+        a match has been found. This is a single forward pass that stops as
+        soon as the match can't get any longer.
+        """
+        if endpos is None:
+            endpos = len(text)
+        table = self.table_
+        classes = self.classes_
+        accepts = self.accepts_
+        start = self.start_
+        if accepts[start]:
+            # there is an empty match at pos, which nothing can start before
+            end = self.longest(text, pos, endpos)
+            assert end is not None
+            return pos, end
+        # while there is no more than one run, which is the usual case, it is
+        # kept in state and origin instead of going through a LeftmostScan
+        state = DEAD
+        origin = -1
+        found = end = -1
+        scan: LeftmostScan | None = None
+        i = pos
+        while i < endpos:
+            cls = classes[text[i]]
+            dest = table[state + cls]
+            new = table[start + cls]
+            i += 1
+            if not dest:
+                state, origin = new, i - 1
+            elif new and new != dest and not accepts[dest]:
+                # the scan takes over until at most one run is left
+                if scan is None:
+                    scan = LeftmostScan(start, lambda run, cls: table[run + cls], accepts.__getitem__)
+                scan.runs_ = {dest: origin, new: i - 1}
+                scan.check_(i)
+                while i < endpos and len(scan.runs_) > 1:
+                    scan.add(i)
+                    scan.advance(classes[text[i]], i + 1)
+                    i += 1
+                found, end = scan.found_, scan.end_
+                state, origin = next(iter(scan.runs_.items()), (DEAD, -1))
+                if found >= 0:
+                    break
+                continue
+            else:
+                # a run that starts later can't beat one that matches
+                state = dest
+            if accepts[state]:
+                found, end = origin, i
+                break
+        # at most one run is left, which can only make the match longer, or
+        # replace it if it started before it
+        while state and i < endpos:
+            state = table[state + classes[text[i]]]
+            i += 1
+            if accepts[state]:
+                found, end = origin, i
+        return None if found < 0 else (found, end)
+
+
+class LeftmostScan(object):
+    """
+    The runs of a leftmost-longest scan, which runs an anchored engine from
+    every index at once. Runs that reach the same state have the same future,
+    so only the one that started first is kept, and no more runs are started
+    once a match has been found. `step` and `accepts` are those of the engine,
+    and `step` is given whatever is passed to `advance`.
+    """
+    def __init__(
+        self,
+        start: t.Any,
+        step: t.Callable[[t.Any, t.Any], t.Any],
+        accepts: t.Callable[[t.Any], t.Any]
+    ) -> None:
+        self.start_ = start
+        self.step_ = step
+        self.accepts_ = accepts
+        # the state of each run and where it started, oldest first
+        self.runs_: t.Dict[t.Any, int] = {}
+        # the span of the best match found so far, if any
+        self.found_ = -1
+        self.end_ = -1
+    
+    def add(self, pos: int) -> None:
+        """
+        Start a run at `pos`, unless a match has already been found.
+        """
+        start = self.start_
+        if self.found_ >= 0 or not start or start in self.runs_:
+            return
+        self.runs_[start] = pos
+        if self.accepts_(start):
+            self.found_ = self.end_ = pos
+    
+    def advance(self, symbol: t.Any, pos: int) -> None:
+        """
+        Step every run over `symbol`, which ends at `pos`.
+        """
+        step = self.step_
+        stepped: t.Dict[t.Any, int] = {}
+        for state, origin in self.runs_.items():
+            self.keep_(stepped, step(state, symbol), origin)
+        self.runs_ = stepped
+        self.check_(pos)
+    
+    def keep_(self, stepped: t.Dict[t.Any, int], dest: t.Any, origin: int) -> None:
+        if dest and dest not in stepped:
+            stepped[dest] = origin
+    
+    def check_(self, pos: int) -> None:
+        """
+        Record a match ending at `pos` if a run is in an accept state. The
+        oldest one wins, and runs that started after it can't beat it anymore.
+        """
+        accepts = self.accepts_
+        for state, origin in self.runs_.items():
+            if accepts(state):
+                if self.found_ < 0 or origin < self.found_:
+                    self.found_ = origin
+                    self.runs_ = {s: o for s, o in self.runs_.items() if o <= origin}
+                self.end_ = pos
+                break
+    
+    def done(self) -> bool:
+        """
+        Check if the match that was found can't change anymore.
+        """
+        return self.found_ >= 0 and not self.runs_
+    
+    def span(self) -> t.Tuple[int, int] | None:
+        return None if self.found_ < 0 else (self.found_, self.end_)
+
+
+def _symbol_classes(
+    pieces: t.Sequence[Piece],
+    signature_of: t.Callable[[Piece], t.Hashable]
+) -> t.Tuple[SymbolClasses, t.List[Transition]]:
+    """
+    Group symbols that behave identically into the same class. `pieces` are
+    split from the transitions of an automaton with `split_intervals`, and
+    `signature_of` gives a signature of how each of them behaves. Class 0 is
+    reserved for symbols that aren't in any piece. Also returns one
+    representative symbol for each class from 1 onwards: a character or byte,
+    or the first code point of a piece of a character class.
+    """
+    signatures: t.Dict[t.Hashable, int] = {}
+    representatives: t.List[Transition] = []
+    symbols: t.Dict[Transition, int] = {}
+    intervals: t.List[t.Tuple[int, int, int]] = []
+    # ordered by the first transition that covers them, so that automata
+    # without classes number their symbol classes as they always have
+    for piece in sorted(pieces, key=lambda piece: piece[3][0]):
+        lo, hi, literal, _ = piece
+        signature = signature_of(piece)
+        if signature not in signatures:
+            signatures[signature] = len(representatives) + 1
+            representatives.append(lo if literal is None else literal)
+        if literal is None:
+            intervals.append((lo, hi, signatures[signature]))
+        else:
+            symbols[literal] = signatures[signature]
+    classes = SymbolClasses(intervals)
+    classes.update(symbols)
+    return classes, representatives
+
+
+def nfa_symbol_classes(nfa: Nfa) -> t.Tuple[SymbolClasses, t.List[Transition]]:
+    """
+    Get the symbol classes of `nfa`, along with one representative symbol for
+    each class from 1 onwards. Characters that lead to the same destinations
+    from the same states share a class.
+    """
+    keys: t.List[Transition] = []
+    # the states each transition is out of, and where it leads from them
+    uses: t.Dict[Transition, t.List[t.Tuple[int, t.Set[int]]]] = {}
+    for s in sorted(nfa.transitions_.keys()):
+        for c, dests in nfa.transitions_[s].items():
+            if type(c) != NonCharTransition:
+                if c not in uses:
+                    keys.append(c)
+                    uses[c] = []
+                uses[c].append((s, dests))
+    
+    def signature_of(piece: Piece) -> t.Hashable:
+        covering = piece[3]
+        if len(covering) == 1:
+            return tuple((s, tuple(sorted(dests))) for s, dests in uses[keys[covering[0]]])
+        merged: t.Dict[int, t.Set[int]] = {}
+        for i in covering:
+            for s, dests in uses[keys[i]]:
+                merged.setdefault(s, set()).update(dests)
+        return tuple((s, tuple(sorted(merged[s]))) for s in sorted(merged))
+    
+    return _symbol_classes(split_intervals(keys), signature_of)
+
+
+def dfa2table(dfa: Dfa) -> DfaTable:
+    """
+    Lower `dfa` into a `DfaTable`. `dfa` itself is left untouched.
+    
+    States from which no accept state can be reached are merged into the dead
+    state, so that scans stop as soon as they can't match anymore instead of
+    running on to the end of the text.
+    """
+    dfa = dfa.without_dead_states()
+    # number dfa states from 1, leaving 0 as the dead state
+    order = sorted(dfa.states_)
+    ids = {s: i + 1 for i, s in enumerate(order)}
+    keys = list({
+        c: None for s in order for c in dfa.transitions_.get(s, dict()).keys()
+        if type(c) != NonCharTransition
+    })
+    pieces = split_intervals(keys)
+    columns: t.Dict[int, t.Tuple[int, ...]] = {}
+    for lo, _, literal, _ in pieces:
+        symbol = lo if literal is None else literal
+        columns[lo] = tuple(ids.get(dfa.transition(s, symbol), DEAD) for s in order)
+    classes, representatives = _symbol_classes(pieces, lambda piece: columns[piece[0]])
+    nclasses = len(representatives) + 1
+    
+    table = array("l", [DEAD]) * ((len(order) + 1) * nclasses)
+    accepts = bytearray(len(table))
+    for i, s in enumerate(order):
+        row = (i + 1) * nclasses
+        for cls, symbol in enumerate(representatives, 1):
+            table[row + cls] = ids.get(dfa.transition(s, symbol), DEAD) * nclasses
+        if dfa.accepts(s):
+            accepts[row] = 1
+    start = ids.get(dfa.start(), DEAD) * nclasses
+    return DfaTable(classes, nclasses, table, accepts, start)
+
+
+def nfa2table(
+    nfa: Nfa,
+    *,
+    unanchored: bool = False,
+    tags: t.Dict[int, int] | None = None,
+    max_states: int | None = None
+) -> DfaTable:
+    """
+    Build a `DfaTable` straight from `nfa` using the subset construction.
+    
+    If `unanchored` is True, the starting states are added back in after
+    every step, as if the NFA was prefixed with a lazy `.*` loop. Such a table
+    is in an accept state after reading `text[:i]` if and only if a match
+    ends at `i`.
+    
+    `tags` maps accept states of `nfa` to a tag. Each accepting state of the
+    table is then tagged with the tags of the accept states it contains.
+    
+    Raises `RegexTooLargeError` if the table would need more than
+    `max_states` states.
+    """
+    nfa = nfa.without_deadends()
+    classes, representatives = nfa_symbol_classes(nfa)
+    nclasses = len(representatives) + 1
+    
+    initial = frozenset(nfa.epsilon_closure(nfa.starting_states()))
+    restart = initial if unanchored else frozenset()
+    
+    # the empty set of nfa states is the dead state
+    ids: t.Dict[t.FrozenSet[int], int] = {frozenset(): DEAD}
+    subsets: t.List[t.FrozenSet[int]] = [frozenset()]
+    rows: t.List[t.List[int]] = [[DEAD] * nclasses]
+    
+    def state_of(subset: t.FrozenSet[int]) -> int:
+        if subset not in ids:
+            if max_states is not None and len(subsets) >= max_states:
+                raise RegexTooLargeError(f"table needs more than {max_states} states")
+            ids[subset] = len(subsets)
+            subsets.append(subset)
+        return ids[subset]
+    
+    start = state_of(initial)
+    index = 1
+    while index < len(subsets):
+        subset = subsets[index]
+        row = [state_of(restart)]
+        for symbol in representatives:
+            dests = nfa.epsilon_closure(nfa.transition_states(set(subset), symbol))
+            row.append(state_of(frozenset(dests) | restart))
+        rows.append(row)
+        index += 1
+    
+    table = array("l", (d * nclasses for row in rows for d in row))
+    accepts = bytearray(len(table))
+    subset_tags: t.Dict[int, t.FrozenSet[int]] = {}
+    for i, subset in enumerate(subsets):
+        accepted = subset & nfa.accepts_
+        if accepted:
+            accepts[i * nclasses] = 1
+            if tags is not None:
+                subset_tags[i * nclasses] = frozenset(tags[a] for a in accepted if a in tags)
+    return DfaTable(classes, nclasses, table, accepts, start * nclasses, subset_tags)
+
+
+def find(table: DfaTable, text: str) -> t.Tuple[int, int] | None:
+    for start_index in range(len(text) + 1):
+        end = table.longest(text, start_index)
+        if end is not None:
+            return start_index, end
+    return None
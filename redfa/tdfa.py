@@ -0,0 +1,246 @@
+"""
+A tagged DFA for capture groups.
+
+Entering the start state of a group's fragment sets the group's opening tag to
+the current position, and entering its accept state sets its closing tag. A
+plain DFA state is a set of NFA states, which forgets which path led to each of
+them. A `Tdfa` state is an ordered tuple of NFA states, or threads, from the
+most to the least preferred path. Each transition carries a list of
+operations. The i-th operation gives the thread of the previous state that the
+i-th new thread came from, and the tags that were crossed on the way. Running
+it only copies tag values between threads, so groups are found in one pass.
+
+Threads are ordered the same way a backtracking matcher would try them. The
+epsilon transitions out of a Thompson state lead to lower numbered states
+first when the preferred path is taken, so the closure visits them in
+ascending order. When two paths reach the same NFA state, the preferred one is
+kept, since both have the same future from there. Unlike a backtracking
+matcher, a path never goes around a loop without reading anything, so groups
+inside a loop that can match the empty string keep the spans of its last
+non-empty iteration, where `re` would report an empty one at the end.
+
+States are determinized on demand, since there can be many more ordered
+tuples than sets. Like `LazyDfa`, at most `max_states` of them are kept, and
+the cache is flushed when it is full.
+"""
+
+import typing as t
+
+from redfa.lazy import DEFAULT_MAX_STATES
+from redfa.nfa import Nfa
+from redfa.table import SymbolClasses, nfa_symbol_classes
+from redfa.transition import NonCharTransition
+
+
+__all__ = ["Tdfa", "UNSET", "group_tags", "thread_states", "priority_closure", "nfa2tdfa"]
+
+
+# the value of a tag that hasn't been crossed
+UNSET = -1
+
+# for each new thread, the thread it came from and the tags it crossed
+Operations = t.Tuple[t.Tuple[int, t.Tuple[int, ...]], ...]
+# a state to start a closure from, the thread it came from and the tags
+# crossed so far
+Root = t.Tuple[int, int, t.Tuple[int, ...]]
+
+
+def group_tags(nfa: Nfa) -> t.Dict[int, t.Tuple[int, ...]]:
+    """
+    Get the tags set by entering each state of `nfa`. The opening tag of group
+    g is 2g and its closing tag is 2g + 1. Copies of a group set the same
+    tags as the group itself.
+    """
+    tags: t.Dict[int, t.List[int]] = {}
+    for g, group in enumerate(nfa.groups_):
+        for start, accept in [group] + nfa.group_clones_.get(g, []):
+            tags.setdefault(start, []).append(2 * g)
+            tags.setdefault(accept, []).append(2 * g + 1)
+    return {s: tuple(ts) for s, ts in tags.items()}
+
+
+def thread_states(nfa: Nfa) -> t.Set[int]:
+    """
+    Get the states of `nfa` that threads have to stop at: those with
+    transitions on symbols, and accept states. The others are only passed
+    through.
+    """
+    return {
+        s for s, edges in nfa.transitions_.items()
+        if any(c != NonCharTransition.EPSILON for c in edges)
+    } | nfa.accepts_
+
+
+def priority_closure(
+    nfa: Nfa,
+    tags: t.Dict[int, t.Tuple[int, ...]],
+    kept: t.Set[int],
+    roots: t.Iterable[Root]
+) -> t.Tuple[t.List[int], t.List[t.Tuple[int, t.Tuple[int, ...]]]]:
+    """
+    Follow the epsilon transitions from `roots`, in order of preference.
+    Returns the states in `kept` that were reached, most preferred first,
+    along with the thread each came from and the tags it crossed.
+    """
+    transitions = nfa.transitions_
+    seen: t.Set[int] = set()
+    threads: t.List[int] = []
+    operations: t.List[t.Tuple[int, t.Tuple[int, ...]]] = []
+    for root, src, crossed in roots:
+        stack = [(root, crossed + tags.get(root, ()))]
+        while stack:
+            state, crossed = stack.pop()
+            if state in seen:
+                continue
+            seen.add(state)
+            if state in kept:
+                threads.append(state)
+                operations.append((src, crossed))
+            epsilons = transitions.get(state, {}).get(NonCharTransition.EPSILON, ())
+            # pushed backwards, so that the lowest numbered is visited first
+            for dest in sorted(epsilons, reverse=True):
+                if dest not in seen:
+                    stack.append((dest, crossed + tags.get(dest, ())))
+    return threads, operations
+
+
+class _TaggedState(object):
+    __slots__ = ("threads", "accepting", "next")
+
+    def __init__(self, threads: t.Tuple[int, ...], accepting: int) -> None:
+        self.threads = threads
+        # index of the most preferred thread in an accept state, or -1
+        self.accepting = accepting
+        # symbol class -> (next state, operations)
+        self.next: t.Dict[int, t.Tuple["_TaggedState", Operations]] = {}
+
+
+class Tdfa(object):
+    def __init__(self, nfa: Nfa, *, max_states: int = DEFAULT_MAX_STATES) -> None:
+        # the start, the current state and its successor must all fit at the
+        # same time
+        if max_states < 3:
+            raise ValueError("max_states must be at least 3")
+        self.nfa_ = nfa.without_deadends()
+        classes, representatives = nfa_symbol_classes(self.nfa_)
+        self.classes_: SymbolClasses = classes
+        self.representatives_ = representatives
+        self.ngroups_ = len(nfa.groups_)
+        self.tags_ = group_tags(nfa)
+        self.kept_ = thread_states(self.nfa_)
+        self.max_states_ = max_states
+        self.states_: t.Dict[t.Tuple[int, ...], _TaggedState] = {}
+        self.flushes_ = 0
+        roots = [(s, -1, ()) for s in sorted(self.nfa_.starts_)]
+        self.start_, self.start_operations_ = self.closure_(roots)
+
+    def __repr__(self) -> str:
+        return (
+            "Tdfa(" +
+            f"states={len(self.states_)}, " +
+            f"groups={self.ngroups_}, " +
+            f"max_states={self.max_states_}" +
+            ")"
+        )
+
+    def groups(
+        self,
+        text: t.Sequence,
+        start: int,
+        end: int
+    ) -> t.List[t.Tuple[int, int]] | None:
+        """
+        Get the spans of the groups in the most preferred way of matching all
+        of `text[start:end]`, with `(UNSET, UNSET)` for groups that don't
+        take part in it. Returns None if `text[start:end]` doesn't match.
+        """
+        blank = (UNSET,) * (2 * self.ngroups_)
+        registers = [
+            self.apply_(blank, tags, start) for _, tags in self.start_operations_
+        ]
+        state = self.start_
+        classes = self.classes_
+        for i in range(start, end):
+            if not state.threads:
+                return None
+            cls = classes[text[i]]
+            step = state.next.get(cls)
+            if step is None:
+                step = self.determinize_(state, cls)
+            state, operations = step
+            registers = [
+                self.apply_(registers[src], tags, i + 1) for src, tags in operations
+            ]
+        if state.accepting < 0:
+            return None
+        tags = registers[state.accepting]
+        return [
+            (tags[2 * g], tags[2 * g + 1])
+            if tags[2 * g] != UNSET and tags[2 * g + 1] != UNSET else (UNSET, UNSET)
+            for g in range(self.ngroups_)
+        ]
+
+    @staticmethod
+    def apply_(
+        registers: t.Tuple[int, ...],
+        tags: t.Tuple[int, ...],
+        pos: int
+    ) -> t.Tuple[int, ...]:
+        if not tags:
+            return registers
+        updated = list(registers)
+        for tag in tags:
+            updated[tag] = pos
+        return tuple(updated)
+
+    def closure_(self, roots: t.Iterable[Root]) -> t.Tuple[_TaggedState, Operations]:
+        """
+        Get the state reached by following the epsilon transitions from
+        `roots`, and how to get its threads' tags.
+        """
+        threads, operations = priority_closure(self.nfa_, self.tags_, self.kept_, roots)
+        key = tuple(threads)
+        tagged = self.states_.get(key)
+        if tagged is None:
+            accepting = next(
+                (i for i, s in enumerate(threads) if s in self.nfa_.accepts_), -1
+            )
+            tagged = self.states_[key] = _TaggedState(key, accepting)
+        return tagged, tuple(operations)
+
+    def determinize_(
+        self,
+        state: _TaggedState,
+        cls: int
+    ) -> t.Tuple[_TaggedState, Operations]:
+        if len(self.states_) >= self.max_states_:
+            self.flush_(state)
+        roots: t.List[Root] = []
+        if cls != 0:
+            symbol = self.representatives_[cls - 1]
+            for i, thread in enumerate(state.threads):
+                for dest in sorted(self.nfa_.transition(thread, symbol)):
+                    roots.append((dest, i, ()))
+        step = self.closure_(roots)
+        state.next[cls] = step
+        return step
+
+    def flush_(self, keep: _TaggedState) -> None:
+        """
+        Forget every state but the start and `keep`, along with all of their
+        transitions, so that the forgotten ones can be freed.
+        """
+        for tagged in self.states_.values():
+            tagged.next.clear()
+        self.states_.clear()
+        self.states_[self.start_.threads] = self.start_
+        self.states_[keep.threads] = keep
+        self.flushes_ += 1
+
+
+def nfa2tdfa(nfa: Nfa, *, max_states: int = DEFAULT_MAX_STATES) -> Tdfa:
+    """
+    Convert `nfa` into a tagged DFA that records where its groups match. Its
+    states are determinized as they are needed, keeping at most `max_states`.
+    """
+    return Tdfa(nfa, max_states=max_states)
@@ -1,219 +1,204 @@
-from functools import reduce
 import typing as t
-from redfa.exception import MalformedRegexError
+from redfa.exception import MalformedRegexError, RegexTooLargeError
 
-from redfa.nfa import Nfa
-from redfa.token import tokenize, SpecialToken, Token
+from redfa.charclass import MAX_BYTE, MAX_CODEPOINT, CharClass
+from redfa.nfa import Nfa, Transitions
+from redfa.token import tokenize, RepeatToken, SetToken, SpecialToken, Token
 from redfa.transition import NonCharTransition, Transition
 
 
-__all__ = ["ThompsonParser", "thompson"]
+__all__ = ["DEFAULT_STATE_LIMIT", "ThompsonParser", "thompson"]
 
 
-def _empty_expression() -> Nfa:
-    """
-    Create an NFA with one epsilon transition from 0 to 1, with 0 being the
-    start and 1 being an accept state. This expression is particularly useful
-    for building an expression with an optional skip.
-    """
-    return Nfa(
-        states={0, 1},
-        transitions={0: {NonCharTransition.EPSILON: {1}}},
-        accepts={1},
-        starts={0},
-        groups=[]
-    )
-
-
-def _symbol_expression(char: Transition) -> Nfa:
-    """
-    Create an NFA where `char` is a transition from state 0 to state 1.
-    """
-    return Nfa(
-        states={0, 1},
-        transitions={0: {char: {1}}},
-        accepts={1},
-        starts={0},
-        groups=[]
-    )
-
-
-def _kleene_plus_expression(expression: Nfa) -> Nfa:
-    """
-    Convert `expression` into a kleene plus expression.
-    """
-    if len(expression.starts_) != 1 or len(expression.accepts_) != 1:
-        raise ValueError("expression must have only one accept state and one start state.")
-    expression = expression.copy()
-    # create a loop from accept to start
-    start = next(iter(expression.starts_))
-    accept = next(iter(expression.accepts_))
-    if accept not in expression.transitions_:
-        expression.transitions_[accept] = {}
-    if NonCharTransition.EPSILON not in expression.transitions_[accept]:
-        expression.transitions_[accept][NonCharTransition.EPSILON] = set()
-    expression.transitions_[accept][NonCharTransition.EPSILON].add(start)
-    return expression
-
-
-def _kleene_star_expression(expression: Nfa) -> Nfa:
-    """
-    Convert `expression` into a kleene star expression.
-    """
-    return _optional_expression(_kleene_plus_expression(expression))
-
-
-def _optional_expression(expression: Nfa) -> Nfa:
-    """
-    Convert `expression` into an optional expression.
-    """
-    return _join_nfa(_empty_expression(), expression, 0, 1)
+# the most states an NFA can have, so that something like (a{1000}){1000}
+# fails quickly instead of running out of memory
+DEFAULT_STATE_LIMIT = 100_000
 
 
-def _union_expression(expressions: t.Iterable[Nfa]) -> Nfa:
-    """
-    Create a "branched" expression from `expressions`.
-    """
-    primary = Nfa(
-        states={0, 1},
-        transitions={},
-        accepts={1},
-        starts={0},
-        groups=[]
-    )
-    for expression in expressions:
-        _join_nfa(primary, expression, 0, 1)
-    return primary
+# the start and accept state of a part of the NFA being built
+Fragment = t.Tuple[int, int]
 
 
-def _grouped_expression(expression: Nfa) -> Nfa:
+class _Builder(object):
     """
-    Make this expression grouped. Assumes one start and one accept.
-    """
-    start = next(iter(expression.starts_))
-    accept = next(iter(expression.accepts_))
-    if (start, accept) not in expression.groups_:
-        expression.groups_.insert(0, (start, accept))
-    return expression
-
-
-def _concatenate_nfa(primary: Nfa, secondary: Nfa) -> Nfa:
-    """
-    Add secondary to primary, such that the starting state of secondary becomes
-    the accepting state of primary. This function requires that primary and
-    secondary each have only one accept state and one start state.
+    Builds an NFA one fragment at a time. Every fragment is added to the same
+    NFA, with states numbered from a single counter, so each operator only
+    adds a few states and transitions instead of copying and renumbering the
+    fragments it is applied to.
+    
+    States that wrap a fragment are created after it, so that the epsilon
+    transitions out of a state lead to lower numbered states first when the
+    preferred path is taken: into a loop before out of it, and into the left
+    branch of a union before the right one.
     """
-    if (
-        len(primary.starts_) != 1 or
-        len(primary.accepts_) != 1 or
-        len(secondary.starts_) != 1 or
-        len(secondary.accepts_) != 1
-    ):
-        raise ValueError(
-            "primary and secondary each must have only one accept state and one start state."
-        )
-    offset = max(primary.states_) + 1
-    offsetter = lambda s: s + offset
+    def __init__(self, state_limit: int = DEFAULT_STATE_LIMIT) -> None:
+        self.transitions_: Transitions = {}
+        self.groups_: t.List[t.Tuple[int, int]] = []
+        self.group_clones_: t.Dict[int, t.List[t.Tuple[int, int]]] = {}
+        self.next_state_ = 0
+        self.state_limit_ = state_limit
     
-    # add secondary states to primary
-    primary.states_ |= set(map(offsetter, secondary.states_))
+    def reserve_(self, count: int) -> None:
+        if self.next_state_ + count > self.state_limit_:
+            raise RegexTooLargeError(
+                f"regex needs more than {self.state_limit_} states"
+            )
     
-    # add transitions from secondary
-    for s, transitions in secondary.transitions_.items():
-        primary.transitions_[offsetter(s)] = {
-            t: set(map(offsetter, ds)) for t, ds in transitions.items()
-        }
+    def state(self) -> int:
+        self.reserve_(1)
+        state = self.next_state_
+        self.next_state_ += 1
+        return state
     
-    # link primary.accepts_ to secondary.starts_
-    start = offsetter(next(iter(secondary.starts_)))
-    accept = next(iter(primary.accepts_))
-    if accept not in primary.transitions_:
-        primary.transitions_[accept] = {}
-    if NonCharTransition.EPSILON not in primary.transitions_[accept]:
-        primary.transitions_[accept][NonCharTransition.EPSILON] = set()
-    primary.transitions_[accept][NonCharTransition.EPSILON].add(start)
-    """
-    if start not in primary.transitions_:
-        primary.transitions_[start] = {}
-    for transition, dests in primary.transitions_.pop(accept, dict()).items():
-        primary.transitions_[start][transition] = (
-            primary.transitions_[start].get(transition, set()) | dests
-        )
-    for transitions in primary.transitions_.values():
-        for dests in transitions.values():
-            if accept in dests:
-                dests.discard(accept)
-                dests.add(start)
-    """
+    def edge(self, src: int, transition: Transition, dest: int) -> None:
+        edges = self.transitions_.get(src)
+        if edges is None:
+            edges = self.transitions_[src] = {}
+        dests = edges.get(transition)
+        if dests is None:
+            dests = edges[transition] = set()
+        dests.add(dest)
     
-    # set secondary.accepts_ as primary.accepts_
-    primary.accepts_ = set(map(offsetter, secondary.accepts_))
+    def symbols(self, chars: t.Sequence[Transition]) -> Fragment:
+        """
+        Create a fragment that matches `chars` one after another.
+        """
+        start = state = self.state()
+        for char in chars:
+            dest = self.state()
+            self.edge(state, char, dest)
+            state = dest
+        return start, state
     
-    # add groups from secondary to primary
-    primary.groups_.extend(((offsetter(s), offsetter(a)) for s, a in secondary.groups_))
+    def concatenate(self, first: Fragment, second: Fragment) -> Fragment:
+        self.edge(first[1], NonCharTransition.EPSILON, second[0])
+        return first[0], second[1]
     
-    return primary
-
-
-def _join_nfa(primary: Nfa, secondary: Nfa, start: int, end: int) -> Nfa:
-    """
-    Mutates primary such that secondary is included inside it.
-    Assumes that there is only one accept state and one start state in
-    secondary.
-    """
-    if len(secondary.starts_) != 1 or len(secondary.accepts_) != 1:
-        raise ValueError("secondary must have only one accept state and one start state.")
-    offset = max(primary.states_) + 1
-    offsetter = lambda s: s + offset
+    def kleene_plus(self, fragment: Fragment) -> Fragment:
+        # create a loop from accept to start
+        self.edge(fragment[1], NonCharTransition.EPSILON, fragment[0])
+        return fragment
     
-    # add secondary states to primary
-    primary.states_ |= set(map(offsetter, secondary.states_))
+    def kleene_star(self, fragment: Fragment) -> Fragment:
+        return self.optional(self.kleene_plus(fragment))
     
-    # join primary[start] to secondary.starts_
-    if start not in primary.transitions_:
-        primary.transitions_[start] = {}
-    if NonCharTransition.EPSILON not in primary.transitions_[start]:
-        primary.transitions_[start][NonCharTransition.EPSILON] = set()
-    primary.transitions_[start][NonCharTransition.EPSILON] |= set(map(offsetter, secondary.starts_))
+    def optional(self, fragment: Fragment) -> Fragment:
+        start, accept = self.state(), self.state()
+        self.edge(start, NonCharTransition.EPSILON, fragment[0])
+        self.edge(start, NonCharTransition.EPSILON, accept)
+        self.edge(fragment[1], NonCharTransition.EPSILON, accept)
+        return start, accept
     
-    # add transitions from secondary
-    for s, transitions in secondary.transitions_.items():
-        primary.transitions_[offsetter(s)] = {
-            t: set(map(offsetter, ds)) for t, ds in transitions.items()
-        }
+    def union(self, fragments: t.Iterable[Fragment]) -> Fragment:
+        """
+        Create a "branched" fragment from `fragments`.
+        """
+        fragments = list(fragments)
+        start, accept = self.state(), self.state()
+        for fragment in fragments:
+            self.edge(start, NonCharTransition.EPSILON, fragment[0])
+            self.edge(fragment[1], NonCharTransition.EPSILON, accept)
+        return start, accept
     
-    # join secondary.accepts_ to primary[end]
-    accept = offsetter(next(iter(secondary.accepts_)))
-    if accept not in primary.transitions_:
-        primary.transitions_[accept] = {}
-    if NonCharTransition.EPSILON not in primary.transitions_[accept]:
-        primary.transitions_[accept][NonCharTransition.EPSILON] = set()
-    primary.transitions_[accept][NonCharTransition.EPSILON].add(end)
+    def clone(self, first: int, last: int, fragment: Fragment) -> Fragment:
+        """
+        Copy `fragment`, which is made of the states from `first` up to but
+        not including `last`, along with the groups in it. The copy's states
+        are numbered in the same order, so it prefers the same paths.
+        """
+        size = last - first
+        self.reserve_(size)
+        offset = self.next_state_ - first
+        for state in range(first, last):
+            edges = self.transitions_.get(state)
+            if edges is not None:
+                self.transitions_[state + offset] = {
+                    c: {d + offset for d in dests} for c, dests in edges.items()
+                }
+        self.next_state_ += size
+        for g, group in enumerate(self.groups_):
+            copies = [
+                (start + offset, accept + offset)
+                for start, accept in [group] + self.group_clones_.get(g, [])
+                if first <= start < last
+            ]
+            if copies:
+                self.group_clones_.setdefault(g, []).extend(copies)
+        return fragment[0] + offset, fragment[1] + offset
     
-    # add groups from secondary to primary
-    primary.groups_.extend(((offsetter(s), offsetter(a)) for s, a in secondary.groups_))
+    def repeat(self, first: int, fragment: Fragment, minimum: int, maximum: int | None) -> Fragment:
+        """
+        Repeat `fragment`, which is made of the states from `first` on, from
+        `minimum` to `maximum` times. Copies are made with `clone`, so this
+        takes time in the size of the result.
+        """
+        if maximum == 0:
+            # the fragment is left unconnected
+            return self.symbols([])
+        if maximum is None and minimum <= 1:
+            return self.kleene_star(fragment) if minimum == 0 else self.kleene_plus(fragment)
+        last = self.next_state_
+        count = minimum if maximum is None else maximum
+        # every copy is made before any of them is connected to the others,
+        # so that they don't copy those connections
+        copies = [fragment] + [self.clone(first, last, fragment) for _ in range(count - 1)]
+        if maximum is None:
+            # x{n,} is n - 1 copies of x followed by x+
+            copies[-1] = self.kleene_plus(copies[-1])
+            minimum = count
+        # x{n,m} is n copies of x followed by m - n nested optional copies,
+        # like x(x(x)?)?, so that a shorter match doesn't try every way of
+        # skipping copies
+        tail: Fragment | None = None
+        for copy in reversed(copies[minimum:]):
+            tail = self.optional(copy if tail is None else self.concatenate(copy, tail))
+        result = tail
+        for copy in reversed(copies[:minimum]):
+            result = copy if result is None else self.concatenate(copy, result)
+        assert result is not None
+        return result
     
-    return primary
+    def open_group(self) -> int:
+        """
+        Reserve a place for a group, so that groups are ordered by where they
+        open rather than where they close.
+        """
+        self.groups_.append((-1, -1))
+        return len(self.groups_) - 1
+    
+    def close_group(self, index: int, fragment: Fragment) -> Fragment:
+        self.groups_[index] = fragment
+        return fragment
+    
+    def build(self, fragment: Fragment) -> Nfa:
+        return Nfa(
+            states=set(range(self.next_state_)),
+            transitions=self.transitions_,
+            accepts={fragment[1]},
+            starts={fragment[0]},
+            groups=self.groups_,
+            group_clones=self.group_clones_
+        )
 
 
-def _nothing() -> Nfa:
+class ThompsonParser(object):
     """
-    Create an empty expression.
+    Parses tokens into fragments of a single NFA, which `build` returns once
+    the whole expression has been parsed.
     """
-    return Nfa(
-        states={0},
-        transitions={},
-        accepts={0},
-        starts={0},
-        groups=[]
-    )
-
-
-class ThompsonParser(object):
-    def __init__(self, tokenizer: t.Iterator[Token]) -> None:
+    def __init__(
+        self,
+        tokenizer: t.Iterator[Token],
+        *,
+        utf8: bool = False,
+        state_limit: int = DEFAULT_STATE_LIMIT
+    ) -> None:
         self.tokenizer = tokenizer
+        self.builder = _Builder(state_limit)
         self.current_token: Token | None = None
         self.token_used: bool = False
+        # match bytes instead of characters
+        self.utf8 = utf8
     
     def grab_if_used(self) -> bool:
         """
@@ -230,7 +215,13 @@ class ThompsonParser(object):
             self.token_used = False
         return True
     
-    def parse_char(self) -> Nfa | None:
+    def build(self, fragment: Fragment) -> Nfa:
+        """
+        Get the NFA with `fragment` as its start and accept state.
+        """
+        return self.builder.build(fragment)
+    
+    def parse_char(self) -> Fragment | None:
         """
         Parse character.
         """
@@ -238,10 +229,46 @@ class ThompsonParser(object):
             return None
         if type(self.current_token) == str:
             self.token_used = True
-            return _symbol_expression(self.current_token)
+            if self.utf8:
+                return self.builder.symbols(self.current_token.encode("utf-8"))
+            return self.builder.symbols(self.current_token)
         return None
     
-    def parse_round_bracket(self) -> Nfa | None:
+    def parse_set(self) -> Fragment | None:
+        """
+        Parse character classes, `.` and the escapes that stand for a class.
+        """
+        if not self.grab_if_used():
+            return None
+        token = self.current_token
+        excluded: t.Tuple[t.Tuple[t.Tuple[int, int], ...], ...] = ()
+        if token == SpecialToken.Dot:
+            # like re, . matches anything but a newline
+            char_class, negated = CharClass([(ord("\n"), ord("\n"))]), True
+        elif isinstance(token, SetToken):
+            char_class, negated = CharClass(token.ranges), token.negated
+            excluded = token.excluded
+        else:
+            return None
+        self.token_used = True
+        maximum = MAX_BYTE if self.utf8 else MAX_CODEPOINT
+        # a character outside of ascii is more than one byte long
+        if self.utf8 and char_class.ranges and char_class.ranges[-1][1] > 0x7F:
+            raise MalformedRegexError("classes can only hold ascii characters when matching bytes")
+        if excluded:
+            char_class = CharClass(char_class.ranges + tuple(
+                interval for ranges in excluded for interval in CharClass(ranges).negated(maximum).ranges
+            ))
+        if negated:
+            char_class = char_class.negated(maximum)
+        if char_class.size() == 1:
+            cp = char_class.ranges[0][0]
+            return self.builder.symbols([cp] if self.utf8 else [chr(cp)])
+        start, accept = self.builder.state(), self.builder.state()
+        self.builder.edge(start, char_class, accept)
+        return start, accept
+    
+    def parse_round_bracket(self) -> Fragment | None:
         """
         Parse round bracket expressions, including those with pipes in them.
         """
@@ -251,10 +278,11 @@ class ThompsonParser(object):
         if self.current_token != SpecialToken.OpenRoundBracket:
             return None
         self.token_used = True
+        group = self.builder.open_group()
         
         # list of expressions, expressions in a () can be separated by pipes '|'
         # which basically signify an "or" clause
-        expressions: t.List[Nfa] = []
+        expressions: t.List[Fragment] = []
         pipe_encountered = True # pretend a pipe has been encountered
         while True:
             if not self.grab_if_used():
@@ -277,60 +305,81 @@ class ThompsonParser(object):
                 expressions.append(expression)
         
         # join all the or clauses together
-        return _grouped_expression(_union_expression(expressions))
+        return self.builder.close_group(group, self.builder.union(expressions))
     
-    def parse_basic(self) -> Nfa | None:
+    def parse_basic(self) -> Fragment | None:
         """
         Parse "atomic" expressions, like characters and brackets.
         """
         expression = self.parse_char()
+        if expression is not None:
+            return expression
+        expression = self.parse_set()
         if expression is not None:
             return expression
         return self.parse_round_bracket()
     
-    def parse_kleene(self) -> Nfa | None:
+    def parse_kleene(self) -> Fragment | None:
         """
         Add additional data onto an expression.
         """
+        first = self.builder.next_state_
         expression = self.parse_basic()
         if expression is None:
             return None
         elif not self.grab_if_used(): # it's fine, just exit
             return expression
-        if self.current_token == SpecialToken.Star:
+        if isinstance(self.current_token, RepeatToken):
+            self.token_used = True
+            minimum, maximum = self.current_token
+            return self.builder.repeat(first, expression, minimum, maximum)
+        elif self.current_token == SpecialToken.Star:
             self.token_used = True
-            return _kleene_star_expression(expression)
+            return self.builder.kleene_star(expression)
         elif self.current_token == SpecialToken.Plus:
             self.token_used = True
-            return _kleene_plus_expression(expression)
+            return self.builder.kleene_plus(expression)
         elif self.current_token == SpecialToken.Question:
             self.token_used = True
-            return _optional_expression(expression)
+            return self.builder.optional(expression)
         else:
             return expression
     
-    def parse_expression(self) -> Nfa | None:
+    def parse_expression(self) -> Fragment | None:
         """
         Parse one expression.
         """
-        expressions: t.List[Nfa] = []
+        result: Fragment | None = None
         while True:
             expression = self.parse_kleene()
             if expression is None:
                 break
-            expressions.append(expression)
-        if len(expressions) <= 0:
-            return None
-        return reduce(_concatenate_nfa, expressions)
+            if result is None:
+                result = expression
+            else:
+                result = self.builder.concatenate(result, expression)
+        return result
 
 
-def thompson(regex: str) -> Nfa | None:
+def thompson(
+    regex: str,
+    *,
+    utf8: bool = False,
+    state_limit: int = DEFAULT_STATE_LIMIT
+) -> Nfa | None:
     """
     Create an NFA using Thompson's Construction. Returns None if nothing is
     parsed.
+    
+    If `utf8` is True, the NFA matches bytes instead of characters: its
+    transitions are ints from 0 to 255, and characters outside of ASCII
+    become their UTF-8 byte sequence.
+    
+    Raises `RegexTooLargeError` if the NFA would need more than `state_limit`
+    states, which counted repetition can easily ask for.
     """
-    parser = ThompsonParser(tokenize(regex))
-    nfa = parser.parse_expression()
-    if nfa is None:
+    parser = ThompsonParser(tokenize(regex), utf8=utf8, state_limit=state_limit)
+    fragment = parser.parse_expression()
+    if fragment is None:
         return None
-    return nfa.remove_deadends()
\ No newline at end of file
+    return parser.build(fragment).remove_deadends()
\ No newline at end of file
@@ -12,9 +12,34 @@ class SpecialToken(Enum):
     Star = 6
     Plus = 7
     Question = 8
+    Dot = 9
 
 
-Token: t.TypeAlias = str | SpecialToken
+class SetToken(t.NamedTuple):
+    """
+    A set of characters from `[...]`, `\\d`, `\\w` or `\\s`, as sorted
+    intervals of code points. If `negated` is True, it stands for every
+    character that isn't in them.
+    
+    `excluded` holds the intervals of escapes like `\\D` inside `[...]`. Each
+    of them adds every character that isn't in it, which goes up to the
+    largest code point or byte depending on what is being matched.
+    """
+    ranges: t.Tuple[t.Tuple[int, int], ...]
+    negated: bool = False
+    excluded: t.Tuple[t.Tuple[t.Tuple[int, int], ...], ...] = ()
+
+
+class RepeatToken(t.NamedTuple):
+    """
+    A count from `{n}`, `{n,}` or `{n,m}`. `maximum` is None if there is no
+    upper bound.
+    """
+    minimum: int
+    maximum: int | None
+
+
+Token: t.TypeAlias = str | SpecialToken | SetToken | RepeatToken
 
 
 # First item is the token returned if not escaped
@@ -28,21 +53,131 @@ SPECIALS: t.Dict[str, t.Tuple[Token, Token]] = {
     "*": (SpecialToken.Star, "*"),
     "+": (SpecialToken.Plus, "+"),
     "?": (SpecialToken.Question, "?"),
+    ".": (SpecialToken.Dot, "."),
 }
 SPECIAL_CHARS = set(SPECIALS.keys())
+# characters that can be escaped, in and out of classes
+ESCAPABLE_CHARS = SPECIAL_CHARS | {"\\", "[", "]", "-", "{", "}"}
+
+# classes that can be written as an escape, these only cover ascii like
+# re.ASCII does. the upper case escapes are their negations.
+CLASS_ESCAPES: t.Dict[str, t.Tuple[t.Tuple[int, int], ...]] = {
+    "d": ((ord("0"), ord("9")),),
+    "w": ((ord("0"), ord("9")), (ord("A"), ord("Z")), (ord("_"), ord("_")), (ord("a"), ord("z"))),
+    "s": ((ord("\t"), ord("\r")), (ord(" "), ord(" "))),
+}
+
+
+def _parse_set(regex: str, i: int) -> t.Tuple[SetToken, int]:
+    """
+    Parse the character class that starts after the `[` before `regex[i]`.
+    Returns it and the index after its closing `]`.
+    """
+    negated = regex.startswith("^", i)
+    if negated:
+        i += 1
+    ranges: t.List[t.Tuple[int, int]] = []
+    excluded: t.List[t.Tuple[t.Tuple[int, int], ...]] = []
+    
+    def take_char() -> str | SetToken:
+        nonlocal i
+        c = regex[i]
+        i += 1
+        if c != "\\":
+            return c
+        if i >= len(regex):
+            raise ValueError("character class is not closed")
+        c = regex[i]
+        i += 1
+        if c.lower() in CLASS_ESCAPES:
+            return SetToken(CLASS_ESCAPES[c.lower()], c.isupper())
+        if c not in ESCAPABLE_CHARS:
+            raise ValueError(f"{repr(c)} cannot be escaped")
+        return c
+    
+    first = True
+    while True:
+        if i >= len(regex):
+            raise ValueError("character class is not closed")
+        # a ] right at the start is a character, like in re
+        if regex[i] == "]" and not first:
+            return SetToken(tuple(sorted(ranges)), negated, tuple(excluded)), i + 1
+        first = False
+        lo = take_char()
+        if isinstance(lo, SetToken):
+            if lo.negated:
+                # complemented by the parser, which knows whether it is
+                # matching bytes
+                excluded.append(lo.ranges)
+            else:
+                ranges.extend(lo.ranges)
+            continue
+        # a - at the end is a character too
+        if regex.startswith("-", i) and i + 1 < len(regex) and regex[i + 1] != "]":
+            i += 1
+            hi = take_char()
+            if isinstance(hi, SetToken):
+                raise ValueError(f"bad character range {lo}-")
+            if hi < lo:
+                raise ValueError(f"bad character range {lo}-{hi}")
+            ranges.append((ord(lo), ord(hi)))
+        else:
+            ranges.append((ord(lo), ord(lo)))
+
+
+def _parse_repeat(regex: str, i: int) -> t.Tuple[RepeatToken, int] | None:
+    """
+    Parse the count that starts after the `{` before `regex[i]`. Returns it and
+    the index after its closing `}`, or None if it isn't a count, in which case
+    the `{` is just a character like in re.
+    """
+    end = regex.find("}", i)
+    if end < 0:
+        return None
+    minimum, comma, maximum = regex[i:end].partition(",")
+    if not (minimum.isdigit() or (comma and not minimum)):
+        return None
+    if maximum and not maximum.isdigit():
+        return None
+    token = RepeatToken(
+        int(minimum or 0),
+        int(maximum) if maximum else (None if comma else int(minimum))
+    )
+    if token.maximum is not None and token.maximum < token.minimum:
+        raise ValueError(f"min repeat greater than max repeat in {regex[i - 1:end + 1]!r}")
+    return token, end + 1
 
 
 def tokenize(regex: str) -> t.Generator[Token, None, None]:
-    escaped = False
-    for c in regex:
+    i = 0
+    while i < len(regex):
+        c = regex[i]
+        i += 1
         if c == "\\":
-            if escaped:
+            # a trailing backslash escapes nothing
+            if i >= len(regex):
+                break
+            c = regex[i]
+            i += 1
+            if c.lower() in CLASS_ESCAPES:
+                yield SetToken(CLASS_ESCAPES[c.lower()], c.isupper())
+            elif c in SPECIALS:
+                yield SPECIALS[c][1]
+            elif c in ESCAPABLE_CHARS:
                 yield c
-            escaped = not escaped
+            else:
+                raise ValueError(f"{repr(c)} cannot be escaped")
+        elif c == "[":
+            token, i = _parse_set(regex, i)
+            yield token
+        elif c == "{":
+            repeat = _parse_repeat(regex, i)
+            if repeat is None:
+                yield c
+            else:
+                yield repeat[0]
+                i = repeat[1]
         elif c in SPECIALS:
-            yield SPECIALS[c][int(escaped)]
-            escaped = False
+            yield SPECIALS[c][0]
         else:
-            if escaped:
-                raise ValueError(f"{repr(c)} cannot be escaped")
-            yield c
\ No newline at end of file
+            yield c
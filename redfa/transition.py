@@ -1,6 +1,9 @@
 from enum import Enum
 import typing as t
 
+if t.TYPE_CHECKING:
+    from redfa.charclass import CharClass
+
 
 class NonCharTransition(Enum):
     START = 0
@@ -8,11 +11,24 @@ class NonCharTransition(Enum):
     EPSILON = 2
 
 
-Transition: t.TypeAlias = str | NonCharTransition
+# characters are str, bytes (when matching bytes) are int, and a CharClass is
+# any of a set of either
+Transition: t.TypeAlias = t.Union[str, int, NonCharTransition, "CharClass"]
 
 
-def text_to_transition(text: str, *, start: bool = True) -> t.Generator[Transition, None, None]:
+def text_to_transition(
+    text: str,
+    *,
+    start: bool = True,
+    end: bool = True
+) -> t.Generator[Transition, None, None]:
+    """
+    Turn `text` into transitions. `start` and `end` should only be True if
+    `text` begins or finishes the whole input, e.g. when scanning a stream in
+    chunks.
+    """
     if start:
         yield NonCharTransition.START
     yield from text
-    yield NonCharTransition.END
\ No newline at end of file
+    if end:
+        yield NonCharTransition.END
\ No newline at end of file
@@ -0,0 +1,48 @@
+from redfa.bitnfa import BitNfa, find
+from redfa.nfa import find as nfa_find
+from redfa.regex import RegexFlag, compile as re_compile
+from redfa.thompson import thompson
+from tests.experiments import make_nfa_0, make_nfa_1, make_nfa_2, make_nfa_3
+
+
+def test_bitnfa_0():
+    texts = ["", "a", "b", "aa", "ca", "aabab", "baab", "acb", "aaab", "bab", "1100", "01010"]
+    for make_nfa in [make_nfa_0, make_nfa_1, make_nfa_2, make_nfa_3]:
+        nfa = make_nfa()
+        bitnfa = BitNfa(nfa)
+        for text in texts:
+            assert find(bitnfa, text) == nfa_find(nfa, text), text
+
+
+def test_bitnfa_wide():
+    # more than 8 states, so steps go through several byte tables
+    nfa = thompson("(ab(cd)*ef)+")
+    assert nfa is not None and len(nfa.states_) > 16
+    bitnfa = BitNfa(nfa)
+    
+    assert bitnfa.longest("abcdcdefabefx") == 12
+    assert bitnfa.longest("abcdce") is None
+    assert bitnfa.leftmost("xabcdabefabcdefx") == (5, 15)
+
+
+def test_bitnfa_regex():
+    regex = re_compile("(a|b)*a(a|b)(a|b)", RegexFlag.NFA)
+    
+    assert regex.automaton is None
+    assert regex.find("cbbabbaab") == (1, 9)
+    assert regex.findall("abbcbab") == ["abb"]
+
+
+def test_bitnfa_sparse():
+    # too many states for byte tables, so steps OR together the successors of
+    # the active states instead
+    nfa = thompson("(a|b)*a(a|b){100}")
+    assert nfa is not None and len(nfa.states_) > 512
+    bitnfa = BitNfa(nfa)
+    tabled = BitNfa(nfa, max_table_states=len(nfa.states_))
+    
+    text = "cc" + "abbab" * 30 + "c"
+    assert bitnfa.longest(text, 2) == tabled.longest(text, 2) == 151
+    assert bitnfa.leftmost(text) == tabled.leftmost(text) == (2, 151)
+    assert bitnfa.leftmost(text, 100) is None
+    assert bitnfa.tables_ == [None] * bitnfa.nclasses_
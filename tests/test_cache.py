@@ -0,0 +1,33 @@
+from redfa.cache import LruCache
+from redfa import regex
+
+
+def test_lrucache_0():
+    cache: LruCache[str, int] = LruCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    # b is the least recently used now
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    assert cache.stats() == {"hits": 2, "misses": 1, "evictions": 1, "size": 2, "maxsize": 2}
+    
+    cache.resize(1)
+    assert len(cache) == 1 and cache.get("c") == 3
+    cache.purge()
+    assert len(cache) == 0
+
+
+def test_regex_cache():
+    regex.purge()
+    before = regex.cache_info()
+    first = regex.compile("(a|b)*a")
+    assert regex.compile("(a|b)*a") is first
+    assert regex.find("(a|b)*a", "ca") == (1, 2)
+    after = regex.cache_info()
+    assert after["misses"] - before["misses"] == 1
+    assert after["hits"] - before["hits"] == 2
+    
+    regex.purge()
+    assert regex.compile("(a|b)*a") is not first
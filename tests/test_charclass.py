@@ -0,0 +1,44 @@
+from redfa.charclass import MAX_BYTE, CharClass, join_intervals, split_intervals
+
+
+def test_charclass():
+    digits = CharClass([(ord("5"), ord("9")), (ord("0"), ord("4"))])
+    
+    assert digits.ranges == ((ord("0"), ord("9")),)
+    assert digits == CharClass([(ord("0"), ord("9"))])
+    assert "7" in digits
+    assert ord("7") in digits
+    assert "a" not in digits
+    assert "42" not in digits
+    assert digits.size() == 10
+    assert repr(digits) == "CharClass('0-9')"
+    
+    others = digits.negated(MAX_BYTE)
+    assert others.ranges == ((0, ord("0") - 1), (ord("9") + 1, MAX_BYTE))
+    assert "7" not in others
+    assert 255 in others
+    assert 256 not in others
+    assert others.negated(MAX_BYTE) == digits
+
+
+def test_split_intervals():
+    lower = CharClass([(ord("a"), ord("z"))])
+    vowels = CharClass([(ord("a"), ord("a")), (ord("e"), ord("e"))])
+    pieces = split_intervals([lower, "b", vowels, "z"])
+    
+    assert pieces == [
+        (ord("a"), ord("a"), None, [0, 2]),
+        (ord("b"), ord("b"), "b", [0, 1]),
+        (ord("c"), ord("d"), None, [0]),
+        (ord("e"), ord("e"), None, [0, 2]),
+        (ord("f"), ord("y"), None, [0]),
+        (ord("z"), ord("z"), "z", [0, 3])
+    ]
+    
+    edges = join_intervals((lo, hi, literal, len(covering)) for lo, hi, literal, covering in pieces)
+    assert edges == {
+        "b": 2,
+        "z": 2,
+        CharClass([(ord("a"), ord("a")), (ord("e"), ord("e"))]): 2,
+        CharClass([(ord("c"), ord("d")), (ord("f"), ord("y"))]): 1
+    }
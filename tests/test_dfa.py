@@ -1,4 +1,5 @@
-from redfa.dfa import Dfa, find
+from redfa.charclass import CharClass
+from redfa.dfa import Dfa, DfaTraveller, HistoryDfaTraveller, find
 from redfa.transition import NonCharTransition
 
 
@@ -43,5 +44,95 @@ def test_dfa_1():
     assert find(dfa, "01010") == (0, 0)
 
 
+def test_dfa_unreachable():
+    dfa = Dfa({0, 1, 2}, {0: {"a": 1}, 2: {"a": 1}}, {1}, 0)
+    dfa.remove_unreachable_states()
+    
+    assert dfa.states_ == {0, 1}
+    assert dfa.transitions_ == {0: {"a": 1}}
+
+
+def test_dfa_minimize():
+    # /(a|b)*a/ with a redundant copy of every state and a dead state
+    states = {0, 1, 2, 3, 4}
+    transitions = {
+        0: {"a": 1, "b": 2, "c": 4},
+        1: {"a": 3, "b": 2},
+        2: {"a": 1, "b": 0},
+        3: {"a": 1, "b": 0},
+        4: {"a": 4}
+    }
+    dfa = Dfa(states, transitions, {1, 3}, 0)
+    minimal = dfa.minimized()
+    
+    assert len(minimal.states_) == 2
+    assert minimal.start_ == 0
+    assert minimal.transitions_ == {0: {"a": 1, "b": 0}, 1: {"a": 1, "b": 0}}
+    for text in ["a", "b", "aa", "ca", "bcab", "c"]:
+        assert find(minimal, text) == find(dfa, text)
+
+
+def test_dfa_minimize_empty():
+    dfa = Dfa({0, 1}, {0: {"a": 1}}, set(), 0).minimize()
+    
+    assert dfa.states_ == {0}
+    assert dfa.transitions_ == {} and dfa.accepts_ == set()
+
+
+def test_dfa_max_length():
+    # /ab(c|de)/
+    dfa = Dfa({0, 1, 2, 3, 4}, {0: {"a": 1}, 1: {"b": 2}, 2: {"c": 4, "d": 3}, 3: {"e": 4}}, {4}, 0)
+    assert dfa.max_length() == 4
+    dfa.transitions_[4] = {"f": 4}
+    dfa.invalidate_caches()
+    assert dfa.max_length() is None
+    assert Dfa({0, 1}, {0: {"a": 1}}, set(), 0).max_length() == -1
+
+
+def test_dfa_serialize():
+    states = {0, 1, 2}
+    transitions = {
+        0: {"a": 1, 98: 2, NonCharTransition.START: 0},
+        1: {"é": 1, "b": 2, CharClass([(ord("c"), ord("z"))]): 0},
+        2: {"a": 1, CharClass([(0, 96), (99, 0x10FFFF)]): 2}
+    }
+    dfa = Dfa(states, transitions, {1}, 0)
+    loaded = Dfa.from_bytes(dfa.to_bytes())
+    
+    assert loaded.states_ == dfa.states_
+    assert loaded.transitions_ == dfa.transitions_
+    assert loaded.accepts_ == dfa.accepts_
+    assert loaded.start_ == dfa.start_
+
+
+def test_dfa_traveller():
+    # /(a|b)*a/
+    states = {0, 1, 2}
+    transitions = {
+        0: {"a": 1, "b": 2},
+        1: {"a": 1, "b": 2},
+        2: {"a": 1, "b": 2}
+    }
+    dfa = Dfa(states, transitions, {1}, 0)
+    
+    traveller = DfaTraveller(dfa)
+    traveller.travel("abab" * 1000 + "c" + "a")
+    assert traveller.length() == 3999
+    assert not hasattr(traveller, "states_")
+    
+    history = HistoryDfaTraveller(dfa)
+    history.travel("abac", start=False)
+    assert history.length() == 3
+    assert history.states_ == [(0, 0), (1, 1), (2, 2), (1, 3)]
+    assert find(dfa, "cbab", traveller_type=HistoryDfaTraveller) == (1, 3)
+    
+    # the dead states are only pruned once
+    live = dfa.live()
+    assert find(dfa, "cbab") == (1, 3)
+    assert dfa.live() is live
+    dfa.remove_unreachable_states()
+    assert dfa.live() is not live
+
+
 if __name__ == "__main__":
-    test_dfa_0()
\ No newline at end of file
+    test_dfa_0()
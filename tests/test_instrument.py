@@ -0,0 +1,90 @@
+from redfa.dfa import find as dfa_find
+from redfa.instrument import Stats, find_dfa, find_nfa
+from redfa.nfa2dfa import nfa2dfa
+from redfa.regex import RegexFlag, compile as re_compile
+from redfa.thompson import thompson
+
+
+def test_instrument_travellers():
+    nfa = thompson("(a|b)*abb")
+    stats = Stats()
+    dfa = nfa2dfa(nfa, stats=stats)
+    assert stats.dfa_states == len(dfa.states_)
+    assert stats.closures > 0
+    
+    stats.reset()
+    assert find_dfa(dfa, "ccabb", stats) == dfa_find(dfa, "ccabb") == (2, 5)
+    assert stats.restarts == 3
+    assert stats.symbols == 3
+    
+    stats.reset()
+    assert find_nfa(nfa, "ccabb", stats) == (2, 5)
+    assert stats.restarts == 3
+    assert stats.peak_nfa_states > 1
+
+
+def test_instrument_regex():
+    reports = []
+    regex = re_compile("(a|b)*abb")
+    instrumented = regex.instrumented(hook=reports.append)
+    
+    assert instrumented.find("xxabbab") == regex.find("xxabbab") == (2, 5)
+    assert list(instrumented.finditer("abbabb")) == [(0, 6)]
+    assert len(reports) == 2
+    assert reports[-1] == instrumented.stats.asdict()
+    assert instrumented.stats.symbols > 0
+    
+    # every public search reports exactly once, even when it calls another
+    assert instrumented.match("abb") is not None
+    assert instrumented.fullmatch("abbx") is None
+    assert instrumented.search("xxabb").span() == (2, 5)
+    assert instrumented.findall("abbxabb") == ["abb", "abb"]
+    assert len(reports) == 6
+    # the original isn't touched
+    assert type(regex.table).__name__ == "DfaTable"
+    
+    lazy = re_compile("(a|b)*abb", RegexFlag.LAZY).instrumented()
+    assert lazy.find("xxabbab") == (2, 5)
+    assert lazy.stats.dfa_states > 0
+    bits = re_compile("(a|b)*abb", RegexFlag.NFA).instrumented()
+    assert bits.find("xxabbab") == (2, 5)
+    assert bits.stats.peak_nfa_states > 1
+
+
+def test_instrument_finditer():
+    reports = []
+    regex = re_compile("ab").instrumented(hook=reports.append)
+    matches = regex.finditer("xabab")
+    
+    # a suspended finditer doesn't keep other searches from reporting
+    assert next(matches) == (1, 3)
+    assert regex.find("ab") == (0, 2)
+    assert len(reports) == 1
+    assert next(matches) == (3, 5)
+    assert regex.match("ab") is not None
+    assert len(reports) == 2
+    assert list(matches) == []
+    assert len(reports) == 3
+    
+    # and it reports when it is closed before it is exhausted
+    matches = regex.finditer("abab")
+    assert next(matches) == (0, 2)
+    matches.close()
+    assert len(reports) == 4
+    assert reports[-1] == regex.stats.asdict()
+
+
+def test_instrument_early_match():
+    regex = re_compile("(ab|cd)+").instrumented()
+    text = "xabcd" + "y" * 1_000_000
+    
+    assert regex.find(text) == (1, 5)
+    # nothing reads much further than the match, however long the text is
+    assert regex.stats.symbols < 50
+    
+    # and finditer finds each match when it is asked for
+    regex.stats.reset()
+    matches = regex.finditer(text + "cd")
+    assert next(matches) == (1, 5)
+    assert regex.stats.symbols < 50
+    assert list(matches) == [(1_000_005, 1_000_007)]
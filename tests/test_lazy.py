@@ -0,0 +1,42 @@
+from redfa.lazy import LazyDfa
+from redfa.nfa import find as nfa_find
+from redfa.thompson import thompson
+from redfa.regex import RegexFlag, compile as re_compile
+from tests.experiments import make_nfa_1
+
+
+def test_lazy_0():
+    nfa = make_nfa_1()
+    lazy = LazyDfa(nfa)
+    
+    # nothing but the dead state and the start until something is scanned
+    assert lazy.state_count() == 2
+    assert lazy.longest("aabab") == 5
+    assert lazy.longest("baab", 1) == 4
+    assert lazy.longest("acb") is None
+    assert lazy.stats()["misses"] >= 1
+
+
+def test_lazy_flush():
+    nfa = thompson("(a|b)*a(a|b)(a|b)c")
+    lazy = LazyDfa(nfa, unanchored=True, max_states=4)
+    
+    assert lazy.earliest("abbabaabbabbc") == 13
+    assert lazy.stats()["flushes"] >= 1
+    assert lazy.state_count() <= 4
+    
+    # runs are carried over when the cache is flushed in the middle of a scan
+    anchored = LazyDfa(nfa, max_states=4)
+    assert anchored.leftmost("cabbabaabbabbcab") == (1, 14)
+    assert anchored.stats()["flushes"] >= 1
+
+
+def test_lazy_regex():
+    # the eager dfa for this has 2**12 states
+    pattern = "(a|b)*a" + "(a|b)" * 11
+    regex = re_compile(pattern, RegexFlag.LAZY)
+    text = "ab" * 20 + "c" + "b" * 30 + "a" * 12
+    
+    assert regex.automaton is None
+    assert regex.find(text) == nfa_find(regex.nfa, text)
+    assert regex.findall("a" * 13 + "c" + "b" * 12) == ["a" * 13]
@@ -0,0 +1,57 @@
+from redfa.literal import required_literal
+from redfa.regex import RegexFlag, compile as re_compile
+
+
+def literal_of(pattern, flags=RegexFlag.NOFLAG):
+    literal = required_literal(re_compile(pattern, flags).automaton)
+    return literal and (literal.text, literal.data, literal.prefix)
+
+
+def test_required_literal():
+    assert literal_of("ERROR (1|2)+") == ("ERROR ", b"ERROR ", True)
+    assert literal_of("(abc|abd)e") == ("ab", b"ab", True)
+    assert literal_of("(foo|bar)baz(1|2)") == ("baz", b"baz", False)
+    assert literal_of("(a|b)*abb") == ("bb", b"bb", False)
+    assert literal_of("x(ab)*yz") == ("yz", b"yz", False)
+    assert literal_of("中文(a|b)") == ("中文", None, True)
+    assert literal_of("café", RegexFlag.BYTES) == (None, b"caf\xc3\xa9", True)
+    assert literal_of("a*") is None
+    assert literal_of("(a|b)") is None
+
+
+def test_literal_search(tmp_path):
+    regex = re_compile("(foo|bar)baz(1|2)")
+    text = "foobaz3 barbaz1 foobaz2"
+    
+    assert regex.literal is not None
+    assert regex.find(text) == (8, 15)
+    assert regex.find(text.encode()) == (8, 15)
+    assert regex.find(memoryview(text.encode())) == (8, 15)
+    assert regex.find("foobar" * 100) is None
+    assert list(regex.finditer(text)) == [(8, 15), (16, 23)]
+    assert regex.find(text, 0, 14) is None
+    
+    prefix = re_compile("ERROR (1|2)+")
+    path = tmp_path / "log.txt"
+    path.write_bytes(b"ERROR 3\nERROR 12\n")
+    assert prefix.search_file(path) == (8, 16)
+    assert prefix.find("中文 ERROR 21") == (3, 11)
+    assert re_compile("中文(a|b)").find(b"\xe4\xb8\xadb") is None
+
+
+def test_literal_skip():
+    # each occurrence of the literal is only scanned around, as far as a
+    # match could reach, before jumping on to the next one
+    cases = [("(foo|bar)baz(1|2)", (35525, 35532)), ("ERROR (1|2)", (35533, 35540))]
+    for pattern, expected in cases:
+        regex = re_compile(pattern).instrumented()
+        text = ("foobaz3 ERROR 3" + "x" * 1000) * 35 + "barbaz1 ERROR 1"
+        
+        assert regex.find(text) == expected
+        assert regex.stats.symbols < 2000
+        regex.stats.reset()
+        assert list(regex.finditer(text)) == [expected]
+        assert regex.stats.symbols < 2000
+    # matches can start any distance before an inner literal of an unbounded
+    # pattern, so it is only used to rule text out
+    assert re_compile("a*bc").find("a" * 100 + "bc") == (0, 102)
@@ -1,4 +1,6 @@
+from redfa.charclass import CharClass
 from redfa.nfa import find
+from redfa.thompson import thompson
 from tests.experiments import make_nfa_0, make_nfa_1, make_nfa_2, make_nfa_3
 
 
@@ -70,5 +72,35 @@ def test_nfa_3_no_epsilon():
     assert find(nfa, "01010") == (0, 0)
 
 
+def test_nfa_closure_cache():
+    nfa = make_nfa_0()
+    
+    assert nfa.epsilon_closure({0}) == {0, 1, 2, 4, 7}
+    assert nfa.closures_[0] == {0, 1, 2, 4, 7}
+    assert nfa.epsilon_closure({3, 8}) == {1, 2, 3, 4, 6, 7, 8}
+    
+    # mutating the nfa forgets cached closures
+    nfa.states_ -= {7}
+    nfa.remove_unregistered_states()
+    assert nfa.closures_ == {}
+    assert nfa.epsilon_closure({0}) == {0, 1, 2, 4}
+
+
+
+def test_nfa_class_edges():
+    nfa = thompson("(x[a-c]|[b-d]y)")
+    
+    # only states with class edges are listed
+    assert {s for s, edges in nfa.class_edges().items()} == {
+        s for s, edges in nfa.transitions_.items() if any(type(c) == CharClass for c in edges)
+    }
+    assert nfa.transition_states(nfa.epsilon_closure(nfa.starting_states()), "b") == {5}
+    assert nfa.transition_states({2, 4}, "c") == {3, 5}
+    assert nfa.transition_states({0}, "x") == {1}
+    
+    # mutating the nfa forgets them
+    nfa.remove_unregistered_states()
+    assert nfa.class_edges_ is None
+
 if __name__ == "__main__":
     test_nfa_3()
\ No newline at end of file
@@ -1,5 +1,6 @@
 from redfa.dfa import find
 from redfa.nfa2dfa import nfa2dfa
+from redfa.thompson import thompson
 from tests.experiments import make_nfa_0, make_nfa_1, make_nfa_2, make_nfa_3
 
 
@@ -38,4 +39,25 @@ def test_nfa2dfa_3():
     assert find(dfa, "1100") == (0, 4)
     # i thought it should be (1, 5) but expected behaviour is actually (0, 0)
     # try it using python's re module
-    assert find(dfa, "01010") == (0, 0)
\ No newline at end of file
+    assert find(dfa, "01010") == (0, 0)
+
+
+def test_nfa2dfa_minimized():
+    for make_nfa in [make_nfa_0, make_nfa_1, make_nfa_2, make_nfa_3]:
+        dfa = nfa2dfa(make_nfa())
+        minimal = dfa.minimized()
+        assert len(minimal.states_) <= len(dfa.states_)
+        for text in ["", "a", "b", "aabab", "baab", "acb", "1100", "01010", "111111"]:
+            assert find(minimal, text) == find(dfa, text)
+
+
+def test_nfa2dfa_visited():
+    # every subset is expanded once, this used to requeue subsets that were
+    # waiting to be expanded and hang
+    pattern = r"(((.[^a])+([ab][ab]{2,}b)+)|((\W[^a])+(c|1{1})(.*[a-c]\d)){2,3}|((bb?[ab]){1,3}(aa+1)?b+))"
+    nfa = thompson(pattern)
+    assert nfa is not None
+    dfa = nfa2dfa(nfa)
+    
+    assert len(dfa.states_) == 414
+    assert find(dfa, "bbab") == (0, 4)
@@ -67,4 +67,14 @@ def test_nfagroupparity_1():
     mine = my_match(p, t)
     stdlib = re.match(p, t)
     assert mine is not None and stdlib is not None
-    assert mine.latest_captures()[1:] == list(stdlib.groups())
\ No newline at end of file
+    assert mine.latest_captures()[1:] == list(stdlib.groups())
+
+
+def test_nfagroup_offset():
+    m = my_match(r"(ab|cd)+", "xxabcdx")
+    assert m is not None
+    assert m.span_ == (2, 6)
+    assert m.all_captures() == [
+        ["abcd"],
+        ["ab", "cd"]
+    ]
@@ -0,0 +1,69 @@
+import pytest
+
+from redfa.parallel import _simulate
+from redfa.regex import RegexFlag, compile as re_compile
+
+
+def test_find_many():
+    regex = re_compile("(ab|a)(c|bcd)(d*)")
+    texts = ["xabcd", "acd", "", "abbcd", "zzabcdd"] * 20
+    expected = [regex.find(text) for text in texts]
+    
+    assert list(regex.find_many(texts, workers=2, chunksize=3)) == expected
+    unordered = dict(regex.find_many(iter(texts), workers=2, chunksize=7, ordered=False))
+    assert [unordered[i] for i in range(len(texts))] == expected
+    assert list(regex.find_many([], workers=2)) == []
+
+
+def test_find_many_lazy():
+    regex = re_compile("caf(é|e)+", RegexFlag.LAZY | RegexFlag.BYTES)
+    texts = [b"cafe", b"un caf\xc3\xa9", b"cafx"]
+    
+    assert list(regex.find_many(texts, workers=1)) == [(0, 4), (3, 8), None]
+    with pytest.raises(ValueError):
+        list(regex.find_many(texts, chunksize=0))
+
+
+def test_simulate():
+    regex = re_compile("(ab|a)(c|bcd)(d*)")
+    table = regex.table
+    origins = range(table.nclasses_, len(table.table_), table.nclasses_)
+    text = "abcdda"
+    outcomes = _simulate(table, text, origins)
+    
+    for origin in origins:
+        state = origin
+        last = None
+        for i, symbol in enumerate(text):
+            state = table.step(state, symbol)
+            if not state:
+                break
+            if table.accepts(state):
+                last = i + 1
+        assert outcomes[origin] == (state, last), origin
+
+
+def test_find_parallel():
+    regex = re_compile("(ab|a)(c|bcd)(d*)")
+    text = "xx" + "abbcd" * 3 + "abcddddddddddddd" + "ab" * 10
+    
+    for chunksize in [1, 2, 3, 5, 8, 100]:
+        assert regex.find_parallel(text, workers=2, chunksize=chunksize) == regex.find(text)
+        assert regex.find_parallel(text, 3, workers=2, chunksize=chunksize) == regex.find(text, 3)
+        assert regex.find_parallel(text, 0, 6, workers=2, chunksize=chunksize) is None
+        assert regex.find_parallel(text, 17, workers=2, chunksize=chunksize) == regex.find(text, 17) == (17, 33)
+    assert regex.reverse_table is not None
+    
+    # the reverse table of a counted repetition blows up, so the text is
+    # searched sequentially instead
+    counted = re_compile("[a-z]{14}x")
+    text = "0" * 10 + "b" * 30 + "x" + "0" * 10
+    assert counted.find_parallel(text, workers=2, chunksize=8) == counted.find(text) == (26, 41)
+    assert counted.reverse_table is None and counted.reverse_too_large
+    
+    empty = re_compile("a*")
+    assert empty.find_parallel("bbaaab", workers=2, chunksize=2) == (0, 0)
+    assert empty.find_parallel("aaab", workers=2, chunksize=2) == (0, 3)
+    assert empty.find_parallel("", workers=2) == (0, 0)
+    with pytest.raises(ValueError):
+        re_compile("a*", RegexFlag.LAZY).find_parallel("aaab")
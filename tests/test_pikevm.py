@@ -0,0 +1,80 @@
+import re
+
+from redfa.pikevm import PikeVm
+from redfa.regex import RegexFlag, compile as re_compile
+from redfa.tdfa import UNSET
+from redfa.thompson import thompson
+
+
+PATTERNS = [
+    "(ab|cd)+",
+    "(a+b*)*a(a|b)",
+    "(ab(cd)*ef)+",
+    "((a)|b)+",
+    "(a|ab)(c|bcd)(d*)",
+    "(a*)(a*)",
+    "x(a?)(ab)?b?y"
+]
+TEXTS = ["xxabcdx", "zaaaab", "xabcdefabef", "ab", "abcd", "aaa", "xaby", "xyz", ""]
+
+
+def test_pikevm_search():
+    for pattern in PATTERNS:
+        regex = re_compile(pattern)
+        vm = PikeVm(regex.nfa)
+        for text in TEXTS:
+            found = vm.search(text)
+            expected = regex.search(text)
+            if expected is None:
+                assert found is None, (pattern, text)
+                continue
+            assert found is not None, (pattern, text)
+            span, groups = found
+            assert span == expected.span(), (pattern, text)
+            assert groups == [expected.span(g) for g in range(1, len(groups) + 1)]
+
+
+def test_pikevm_stdlib():
+    for pattern in PATTERNS:
+        vm = PikeVm(thompson(pattern))
+        for text in TEXTS:
+            found = vm.search(text)
+            stdlib = re.search(pattern, text)
+            if found is None or stdlib is None or found[0] != stdlib.span():
+                # leftmost-longest and leftmost-first can pick different spans
+                continue
+            assert found[1] == list(stdlib.regs[1:]), (pattern, text)
+
+
+def test_pikevm_match():
+    vm = PikeVm(thompson("(a|ab)(c|bcd)(d*)"))
+    
+    assert vm.match("abcdd!") == ((0, 5), [(0, 1), (1, 4), (4, 5)])
+    assert vm.match("xabcd") is None
+    assert vm.match("xabcd", 1) == ((1, 5), [(1, 2), (2, 5), (5, 5)])
+    assert vm.groups("abcdd", 0, 4) == [(0, 1), (1, 4), (4, 4)]
+    assert vm.groups("abcdd", 0, 3) == [(0, 2), (2, 3), (3, 3)]
+    assert vm.groups("abcdd", 0, 2) is None
+    
+    vm = PikeVm(thompson("x((a)|b)*y"))
+    assert vm.search("..xbby") == ((2, 6), [(4, 5), (UNSET, UNSET)])
+    assert vm.search("xaby", 0, 3) is None
+
+
+def test_pikevm_regex():
+    regex = re_compile("(a|ab)(c|bcd)(d*)", RegexFlag.NFA)
+    
+    m = regex.search("xxabcdd")
+    assert m is not None
+    assert m.span() == (2, 7)
+    assert m.groups() == ("a", "bcd", "d")
+    assert isinstance(regex.submatcher, PikeVm)
+    
+    # adversarial for backtracking, still one pass
+    n = 20
+    pattern = "(a?)" * n + "a" * n
+    vm = PikeVm(thompson(pattern))
+    found = vm.search("a" * n)
+    assert found is not None
+    assert found[0] == (0, n)
+    assert found[1] == list(re.search(pattern, "a" * n).regs[1:])
@@ -1,4 +1,24 @@
-from redfa.regex import compile as re_compile
+import random
+import re
+
+import pytest
+
+from redfa.exception import RegexError, RegexTooLargeError
+from redfa.lazy import LazyDfa
+from redfa.regex import (
+    MIN_SEARCH_STATES,
+    Regex,
+    RegexFlag,
+    compile as re_compile,
+    get_state_limit,
+    purge,
+    set_cache_dir,
+    set_state_limit
+)
+from redfa.nfa import find as nfa_find
+from redfa.table import DfaTable
+from redfa.tdfa import Tdfa, nfa2tdfa
+from redfa.thompson import DEFAULT_STATE_LIMIT
 
 
 def test_regex_0():
@@ -34,4 +54,317 @@ def test_regex_3():
     assert regex.find("") == (0, 0)
     assert regex.find("111111") == (0, 6)
     assert regex.find("1100") == (0, 4)
-    assert regex.find("01010") == (0, 0)
\ No newline at end of file
+    assert regex.find("01010") == (0, 0)
+
+
+def test_regex_parity():
+    # spans must agree with the per-start-index search on the nfa
+    patterns = ["(a|b)*a", "a?b", "(11)*(00|10)*", "(abcd|c)", "(ab|a)(bc|c)?", "b*"]
+    texts = ["", "a", "abcd", "cabcab", "aababcbc", "xxabcdxx", "0110100", "bbab"]
+    for pattern in patterns:
+        regex = re_compile(pattern)
+        for text in texts:
+            assert regex.find(text) == nfa_find(regex.nfa, text), (pattern, text)
+
+
+def test_regex_pos():
+    regex = re_compile("ab+")
+    
+    assert regex.find("abbxab", 1) == (4, 6)
+    assert regex.find("abbxab", 0, 2) == (0, 2)
+    assert regex.find("abbxab", 1, 5) is None
+
+
+def test_regex_search_table():
+    # the unanchored subset construction of this one is exponential, while
+    # its dfa has 18 states
+    regex = re_compile("a[a-z]{15}x")
+    
+    assert isinstance(regex.search_table, LazyDfa)
+    assert regex.find("zzab" + "c" * 14 + "xq") == (2, 19)
+    assert regex.find("a" * 16 + "y") is None
+    loaded = Regex.from_bytes(regex.to_bytes())
+    assert isinstance(loaded.search_table, LazyDfa)
+    assert loaded.find("zzab" + "c" * 14 + "xq") == (2, 19)
+    
+    regex = re_compile("(a|b)*abc")
+    assert isinstance(regex.search_table, DfaTable)
+    assert regex.search_table.state_count() <= MIN_SEARCH_STATES
+
+
+def test_regex_finditer():
+    regex = re_compile("ab+")
+    
+    assert list(regex.finditer("abbxabyab")) == [(0, 3), (4, 6), (7, 9)]
+    assert list(regex.finditer("abbxabyab", 1, 8)) == [(4, 6)]
+    assert list(regex.finditer("xyz")) == []
+    assert regex.findall("abbxabyab") == ["abb", "ab", "ab"]
+
+
+def test_regex_finditer_empty():
+    # same spans as python's re for patterns that can match nothing
+    for pattern, text in [("a*", "baaa"), ("a*", ""), ("(ab)*", "abxab"), ("b?", "abb")]:
+        mine = list(re_compile(pattern).finditer(text))
+        stdlib = [m.span() for m in re.finditer(pattern, text)]
+        assert mine == stdlib, (pattern, text)
+
+
+def test_regex_file(tmp_path):
+    path = tmp_path / "log.txt"
+    path.write_bytes(b"INFO ok\nERROR 12\nERROR 3\n")
+    regex = re_compile("ERROR (1|2|3)+")
+    
+    assert regex.find(b"xxERROR 1") == (2, 9)
+    assert regex.search_file(path) == (8, 16)
+    assert regex.search_file(path, 10) == (17, 24)
+    assert regex.search_file(path, 0, 15) == (8, 15)
+    assert regex.search_file(path, 0, 14) is None
+    assert list(regex.finditer_file(path)) == [(8, 16), (17, 24)]
+    
+    empty = tmp_path / "empty.txt"
+    empty.write_bytes(b"")
+    assert regex.search_file(empty) is None
+    assert list(re_compile("a*").finditer_file(empty)) == [(0, 0)]
+    
+    # the first results don't read the whole file
+    large = tmp_path / "large.txt"
+    large.write_bytes(b"ERROR 1\n" + b"INFO ok\n" * 500_000 + b"ERROR 2\n")
+    instrumented = regex.instrumented()
+    assert instrumented.search_file(large) == (0, 7)
+    matches = instrumented.finditer_file(large)
+    assert next(matches) == (0, 7)
+    assert instrumented.stats.symbols < 100
+    matches.close()
+
+
+def test_regex_bytes():
+    regex = re_compile("caf(é|e)+", RegexFlag.BYTES)
+    text = "un café".encode("utf-8")
+    
+    assert regex.find(text) == (3, 8)
+    assert regex.find(bytearray(text)) == (3, 8)
+    assert regex.find(memoryview(text)) == (3, 8)
+    assert regex.findall(b"cafe\xffcafee") == [b"cafe", b"cafee"]
+    assert regex.find("un café".encode("latin-1")) is None
+    with pytest.raises(TypeError):
+        regex.find("un café")
+
+
+def test_regex_serialize():
+    for flags in [RegexFlag.NOFLAG, RegexFlag.BYTES, RegexFlag.LAZY]:
+        regex = re_compile("(ab|a)(c|bcd)(d*)", flags)
+        loaded = Regex.from_bytes(regex.to_bytes())
+        
+        assert loaded.pattern == regex.pattern
+        assert loaded.flags == regex.flags
+        assert loaded.find(b"xabcd") == regex.find(b"xabcd") == (1, 5)
+        assert list(loaded.finditer(b"acd abcdd")) == [(0, 3), (4, 9)]
+    
+    regex = re_compile("[a-z]+[0-9]?")
+    loaded = Regex.from_bytes(regex.to_bytes())
+    assert loaded.find("AB cd9!") == (3, 6)
+    assert loaded.table.classes_.intervals_ == regex.table.classes_.intervals_
+    # the reverse table is only built for parallel searches, its subset
+    # construction blows up on patterns like this one
+    assert re_compile("[a-z]{16}x").reverse_table is None
+    
+    data = re_compile("a+").to_bytes()
+    with pytest.raises(ValueError):
+        Regex.from_bytes(data[:-1])
+    with pytest.raises(ValueError):
+        Regex.from_bytes(b"XXXX" + data[4:])
+
+
+def test_regex_classes():
+    patterns = [
+        "[a-z0-9]+",
+        "[^,]+",
+        "a.c",
+        "\\d+-\\d+",
+        "\\w+@\\w+",
+        "[\\s,]+",
+        "[]a]+",
+        "[a-]+",
+        "(a|[ab])c",
+        "[ab]*a[bc]",
+        "(x[a-c]|y.)+",
+        "[\\D]+",
+        "[\\W,]+",
+        "[^\\S]+"
+    ]
+    texts = ["Hello World 42", "a,bc,,d", "abc a\nc axc", "tel 555-1234!", "bob_1@host", "x]a-y", "bc ac zxaybxcz"]
+    for flags in [RegexFlag.NOFLAG, RegexFlag.LAZY, RegexFlag.NFA]:
+        for pattern in patterns:
+            regex = re_compile(pattern, flags)
+            data = re_compile(pattern, flags | RegexFlag.BYTES)
+            for text in texts:
+                stdlib = re.search(pattern, text, re.ASCII)
+                expected = stdlib.span() if stdlib else None
+                assert regex.find(text) == expected, (pattern, text, flags)
+                assert data.find(text.encode("utf-8")) == expected, (pattern, text, flags)
+    
+    regex = re_compile("[^,]+")
+    assert regex.find(",café,") == (1, 5)
+    assert re_compile("[^,]+", RegexFlag.BYTES).find(",café,".encode("utf-8")) == (1, 6)
+    with pytest.raises(RegexError):
+        re_compile("[é]", RegexFlag.BYTES)
+    # escapes that are negated inside a class cover every other byte
+    assert re_compile("[\\D]+", RegexFlag.BYTES).find("12café3".encode("utf-8")) == (2, 7)
+    assert re_compile("[\\W,]+", RegexFlag.BYTES).find(b"ab\xff,\x80c") == (2, 5)
+
+
+def test_regex_repeat():
+    patterns = [
+        "a{3}",
+        "a{2,}",
+        "a{2,4}",
+        "a{,2}b",
+        "(ab){2}",
+        "(a|(b)){3}",
+        "((a)b{1,2}){2,3}",
+        "x{0}y",
+        "[0-9]{3}-[0-9]{4}",
+        "(a?){3}",
+        "a{x}"
+    ]
+    texts = ["aaaaaaa", "aab", "xababab", "bab", "abbabab", "xy", "call 555-12345", "a{x}"]
+    for flags in [RegexFlag.NOFLAG, RegexFlag.LAZY, RegexFlag.NFA]:
+        for pattern in patterns:
+            regex = re_compile(pattern, flags)
+            for text in texts:
+                mine = regex.search(text)
+                stdlib = re.search(pattern, text)
+                assert (mine and mine.span()) == (stdlib and stdlib.span()), (pattern, text, flags)
+                if mine is not None:
+                    assert mine.groups() == stdlib.groups(), (pattern, text, flags)
+    
+    data = re_compile("[a-z]{1000}", RegexFlag.LAZY).to_bytes()
+    set_state_limit(1000)
+    try:
+        assert get_state_limit() == 1000
+        with pytest.raises(RegexTooLargeError):
+            re_compile("[a-z]{1000}")
+        # a saved regex doesn't get around the limit either
+        with pytest.raises(RegexTooLargeError):
+            Regex.from_bytes(data)
+        assert re_compile("[a-z]{100}").find("x" * 100) == (0, 100)
+    finally:
+        set_state_limit()
+    assert get_state_limit() == DEFAULT_STATE_LIMIT
+
+
+def test_regex_cache_dir(tmp_path):
+    set_cache_dir(tmp_path)
+    try:
+        purge()
+        regex = re_compile("(a|b)*abb")
+        files = list(tmp_path.iterdir())
+        assert len(files) == 1
+        
+        # a fresh process would load it from disk
+        purge()
+        loaded = re_compile("(a|b)*abb")
+        assert loaded is not regex
+        assert loaded.automaton is not None
+        assert loaded.find("babb") == (0, 4)
+        
+        # corrupt entries are compiled again and replaced
+        purge()
+        files[0].write_bytes(b"garbage")
+        assert re_compile("(a|b)*abb").find("babb") == (0, 4)
+        assert files[0].read_bytes() == regex.to_bytes()
+    finally:
+        set_cache_dir(None)
+        purge()
+
+
+def test_regex_groups():
+    patterns = [
+        "(ab|cd)+",
+        "(a+b*)*a(a|b)",
+        "(ab(cd)*ef)+",
+        "((a)|b)+",
+        "(a|ab)(c|bcd)(d*)",
+        "(a*)(a*)",
+        "x(a?)(ab)?b?y"
+    ]
+    texts = ["xxabcdx", "zaaaab", "xabcdefabef", "ab", "abcd", "aaa", "xaby", "xyz"]
+    for pattern in patterns:
+        regex = re_compile(pattern)
+        for text in texts:
+            mine = regex.search(text)
+            stdlib = re.search(pattern, text)
+            if mine is None or stdlib is None or mine.span() != stdlib.span():
+                # leftmost-longest and leftmost-first can pick different spans
+                continue
+            # none of these loops can match the empty string, so re doesn't
+            # take an extra empty iteration at the end
+            assert mine.groups() == stdlib.groups(), (pattern, text)
+            assert [mine.span(g) for g in range(1, len(mine.groups()) + 1)] == list(stdlib.regs[1:])
+    
+    # where re does, the groups of the last non-empty iteration are kept
+    for flags in [RegexFlag.NOFLAG, RegexFlag.NFA]:
+        m = re_compile("((c{0,2})+)?", flags).match("cc")
+        assert m.span(2) == (0, 2)
+        assert re.match("((c{0,2})+)?", "cc").span(2) == (2, 2)
+
+
+def test_regex_groups_flush():
+    # the tagged dfa for this builds thousands of states on random text
+    pattern = "(a|b)*a((a|b){12})"
+    regex = re_compile(pattern, RegexFlag.LAZY)
+    rng = random.Random(0)
+    text = "".join(rng.choice("ab") for _ in range(2000))
+    
+    m = regex.search(text)
+    assert m is not None
+    assert m.group(2) == text[m.end() - 12:m.end()]
+    submatcher = regex.submatcher_()
+    assert isinstance(submatcher, Tdfa)
+    assert len(submatcher.states_) <= LazyDfa(regex.nfa).max_states_
+    
+    # groups come out the same when the cache is flushed on every step
+    tdfa = nfa2tdfa(regex.nfa, max_states=3)
+    assert tdfa.groups(text, *m.span()) == submatcher.groups(text, *m.span())
+    assert len(tdfa.states_) <= 3
+    assert tdfa.flushes_ > 0
+
+
+def test_regex_match():
+    regex = re_compile("(a|ab)(c|bcd)(d*)")
+    
+    m = regex.match("abcdd!")
+    assert m is not None
+    assert m.span() == (0, 5)
+    assert m[0] == "abcdd"
+    assert m.group(2) == "bcd"
+    assert m.groups() == ("a", "bcd", "d")
+    assert regex.match("xabcd") is None
+    assert regex.match("xabcd", 1).span() == (1, 5)
+    
+    m = re_compile("caf(é)", RegexFlag.BYTES).search("un café".encode("utf-8"))
+    assert m is not None
+    assert m.group(1) == "é".encode("utf-8")
+    with pytest.raises(IndexError):
+        m.span(2)
+
+
+def test_regex_fullmatch():
+    for flags in [RegexFlag.NOFLAG, RegexFlag.LAZY, RegexFlag.NFA]:
+        regex = re_compile("(a|ab)(c|bcd)(d*)", flags)
+        
+        m = regex.fullmatch("abcdd")
+        assert m is not None
+        assert m.span() == (0, 5)
+        assert m.groups() == ("a", "bcd", "d")
+        assert regex.fullmatch("abcdd!") is None
+        assert regex.fullmatch("xabcd") is None
+        assert regex.fullmatch("xabcd", 1).span() == (1, 5)
+        assert regex.fullmatch("abcdd", 0, 3).span() == (0, 3)
+        assert regex.fullmatch("") is None
+        
+        # only the characters up to the first mismatch are read
+        instrumented = regex.instrumented()
+        assert instrumented.fullmatch("abx" + "d" * 1000) is None
+        assert instrumented.match("abcz" + "d" * 1000).span() == (0, 3)
+        assert instrumented.stats.symbols == 5
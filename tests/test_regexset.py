@@ -0,0 +1,59 @@
+import pytest
+
+from redfa.exception import RegexTooLargeError
+from redfa.regex import RegexFlag, compile as re_compile, set_state_limit
+from redfa.regexset import RegexSet
+
+
+def test_regexset_0():
+    patterns = ["ERROR(1|2)+", "WARN", "(a|b)*c", "x?y"]
+    regexset = RegexSet(patterns)
+    texts = ["", "ERROR12 and WARN", "abac", "WARNING y", "ERROR3", "nothing"]
+    for text in texts:
+        expected = {i for i, p in enumerate(patterns) if re_compile(p).find(text) is not None}
+        assert regexset.matches(text) == expected, text
+        assert regexset.is_match(text) == bool(expected)
+
+
+def test_regexset_empty():
+    regexset = RegexSet(["a*", "b"])
+    
+    assert regexset.matches("") == {0}
+    assert regexset.matches("cb") == {0, 1}
+    assert regexset.matches("cb", 0, 1) == {0}
+
+
+def test_regexset_flags():
+    patterns = ["ERROR(1|2)+", "WARN", "(a|b)*c", "x?y"]
+    texts = ["", "ERROR12 and WARN", "abac", "WARNING y", "ERROR3", "nothing"]
+    lazy = RegexSet(patterns, RegexFlag.LAZY)
+    # small enough to be flushed in the middle of a text
+    lazy.table.max_states_ = 4
+    for text in texts:
+        expected = {i for i, p in enumerate(patterns) if re_compile(p).find(text) is not None}
+        assert lazy.matches(text) == expected, text
+        assert lazy.is_match(text) == bool(expected)
+    
+    regexset = RegexSet(["café", "[0-9]+"], RegexFlag.BYTES)
+    assert regexset.matches("un café".encode("utf-8")) == {0}
+    assert regexset.matches(b"cafe 42") == {1}
+    # memoryviews of any format are read as bytes, like Regex does
+    words = memoryview(bytearray(b"cafe 42")).cast("b")
+    assert regexset.matches(words) == {1}
+    assert regexset.is_match(words)
+    assert RegexSet(["42"]).matches(memoryview(b"x42").cast("c")) == {0}
+    with pytest.raises(TypeError):
+        regexset.matches("cafe 42")
+    with pytest.raises(TypeError):
+        regexset.is_match("cafe 42")
+    
+    set_state_limit(1000)
+    try:
+        with pytest.raises(RegexTooLargeError):
+            RegexSet(["[a-z]{1000}"])
+        # each pattern fits, but not all of them together
+        with pytest.raises(RegexTooLargeError):
+            RegexSet(["[a-z]{100}"] * 10)
+        assert len(RegexSet(["[a-z]{100}"] * 2)) == 2
+    finally:
+        set_state_limit()
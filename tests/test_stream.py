@@ -0,0 +1,69 @@
+from redfa.regex import RegexFlag, compile as re_compile
+from redfa.stream import StreamMatcher
+
+
+def stream_spans(pattern: str, chunks, flags: int = RegexFlag.NOFLAG):
+    matcher = StreamMatcher(re_compile(pattern, flags))
+    spans = []
+    for chunk in chunks:
+        spans.extend(matcher.feed(chunk))
+    spans.extend(matcher.finish())
+    return spans
+
+
+def test_stream_0():
+    patterns = ["ab+", "a*", "(abcd|c)", "(a|b)*a(a|b)", "b?", "(11)*(00|10)*"]
+    texts = ["", "abbxabyab", "baaa", "xabcdcx", "aababbab", "0110100111"]
+    for pattern in patterns:
+        for text in texts:
+            expected = list(re_compile(pattern).finditer(text))
+            # every way of splitting the text into two chunks, and one
+            # character at a time
+            for split in range(len(text) + 1):
+                assert stream_spans(pattern, [text[:split], text[split:]]) == expected
+            assert stream_spans(pattern, list(text)) == expected, (pattern, text)
+
+
+def test_stream_incremental():
+    matcher = StreamMatcher(re_compile("ab+"))
+    
+    assert matcher.feed("xxab") == []
+    # the match could still grow
+    assert matcher.feed("bb") == []
+    assert matcher.feed("bc") == [(2, 7)]
+    # the pending match is only rescanned from where it ends, so none of the
+    # text is kept
+    assert matcher.feed("xyzab") == []
+    assert not matcher.chunks_
+    assert matcher.finish() == [(11, 13)]
+
+
+def test_stream_lazy():
+    assert stream_spans("(a|b)*a(a|b)", ["aab", "cba", "b"], RegexFlag.LAZY) == [(0, 3), (4, 7)]
+
+
+def test_stream_linear():
+    def run(pattern, chunks):
+        regex = re_compile(pattern).instrumented()
+        matcher = StreamMatcher(regex)
+        for chunk in chunks:
+            matcher.feed(chunk)
+        matcher.finish()
+        return regex.stats.transitions
+    
+    # every match is decided as soon as it can be, without going back over
+    # the rest of the chunk, so four times the input is four times the work
+    assert run("a", ["a" * 20000]) <= 4 * run("a", ["a" * 5000]) + 10
+    assert run("ax*b", ["a"] + ["x" * 100] * 400) <= 4 * run("ax*b", ["a"] + ["x" * 100] * 100) + 10
+
+
+def test_stream_memory():
+    # a run that stays open doesn't keep the text it went through
+    matcher = StreamMatcher(re_compile("ax*b"))
+    assert matcher.feed("a") == []
+    for _ in range(200):
+        assert matcher.feed("x" * 1000) == []
+        assert sum(len(chunk) for _, chunk in matcher.chunks_) <= 1000
+    assert matcher.feed("b") == []
+    assert not matcher.chunks_
+    assert matcher.finish() == [(0, 200002)]
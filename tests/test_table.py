@@ -0,0 +1,116 @@
+from redfa.dfa import Dfa
+from redfa.nfa2dfa import nfa2dfa
+from redfa.regexset import RegexSet
+from redfa.table import DEAD, DfaTable, LeftmostScan, dfa2table, find, nfa2table
+from redfa.thompson import thompson
+from tests.experiments import make_nfa_1, make_nfa_3
+
+
+def test_table_0():
+    # /(a|b)*a/
+    states = {0, 1, 2}
+    transitions = {
+        0: {"a": 1, "b": 2},
+        1: {"a": 1, "b": 2},
+        2: {"a": 1, "b": 2}
+    }
+    table = dfa2table(Dfa(states, transitions, {1}, 0))
+    
+    # a and b lead to different states, c is in the "other" class
+    assert table.classes_["a"] != table.classes_["b"]
+    assert table.classes_["c"] == 0
+    assert table.step(table.start(), "c") == DEAD
+    
+    assert find(table, "a") == (0, 1)
+    assert find(table, "b") is None
+    assert find(table, "aa") == (0, 2)
+    assert find(table, "ca") == (1, 2)
+
+
+def test_table_1():
+    table = dfa2table(nfa2dfa(make_nfa_1()))
+    
+    assert find(table, "aabab") == (0, 5)
+    assert find(table, "c") is None
+    assert find(table, "baab") == (1, 4)
+    assert find(table, "acb") is None
+
+
+def test_table_3():
+    table = dfa2table(nfa2dfa(make_nfa_3()))
+    
+    assert find(table, "") == (0, 0)
+    assert find(table, "111111") == (0, 6)
+    assert find(table, "1100") == (0, 4)
+    assert find(table, "01010") == (0, 0)
+    assert table.longest("x1100", 1) == 5
+    assert table.longest("11001", 0, 3) == 2
+
+
+def test_table_dead_states():
+    # /ab/, with a state after "b" that can never accept
+    states = {0, 1, 2, 3}
+    transitions = {
+        0: {"a": 1, "b": 3},
+        1: {"b": 2},
+        3: {"a": 3, "b": 3}
+    }
+    table = dfa2table(Dfa(states, transitions, {2}, 0))
+    
+    assert table.state_count() == 4
+    assert table.step(table.start(), "b") == DEAD
+    assert table.longest("ab") == 2
+    assert table.longest("ba") is None
+    assert find(table, "bbbab") == (3, 5)
+
+
+def test_table_leftmost():
+    table = nfa2table(thompson("(abcd|c)"))
+    # "c" ends first, but "abcd" starts first
+    assert table.leftmost("abcd") == (0, 4)
+    assert table.leftmost("xxabcx") == (4, 5)
+    assert table.leftmost("abcd", 1) == (2, 3)
+    assert table.leftmost("xyz") is None
+    assert nfa2table(thompson("a*")).leftmost("baa") == (0, 0)
+    # runs that start later are dropped when one that started first matches
+    assert nfa2table(thompson("(ab|b)(bc)*")).leftmost("abbcbcb") == (0, 6)
+
+
+def test_table_minimized():
+    texts = ["", "a", "ab", "abb", "babb", "aabbabb", "bbbb"]
+    for pattern in ["(a|b)*abb", "(ab|a)(c|bcd)(d*)", "a*"]:
+        table = nfa2table(thompson(pattern), unanchored=True)
+        minimized = table.minimized()
+        
+        assert minimized.state_count() < table.state_count(), pattern
+        assert not any(minimized.table_[:minimized.nclasses_])
+        for text in texts:
+            assert minimized.earliest(text) == table.earliest(text), (pattern, text)
+            assert minimized.longest(text) == table.longest(text), (pattern, text)
+    
+    # accept states are only merged if they have the same tags
+    assert nfa2table(thompson("a|b"), unanchored=True).minimized().state_count() == 3
+    assert RegexSet(["a", "b"]).table.minimized().state_count() == 4
+
+
+def test_table_serialize():
+    table = dfa2table(nfa2dfa(make_nfa_1()))
+    loaded = DfaTable.from_bytes(table.to_bytes())
+    
+    assert loaded.state_count() == table.state_count()
+    assert find(loaded, "baab") == (1, 4)
+    assert find(loaded, "acb") is None
+
+
+def test_leftmost_scan():
+    table = nfa2table(thompson("(abcd|c)"))
+    scan = LeftmostScan(table.start(), table.step, table.accepts)
+    for i, symbol in enumerate("xabcdx"):
+        scan.add(i)
+        scan.advance(symbol, i + 1)
+        if scan.done():
+            break
+    
+    # the run from 3 matched first, but the one from 1 started before it
+    assert scan.span() == (1, 5)
+    assert i == 5
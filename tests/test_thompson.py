@@ -0,0 +1,84 @@
+import pytest
+
+from redfa.charclass import CharClass
+from redfa.exception import MalformedRegexError, RegexTooLargeError
+from redfa.nfa import match
+from redfa.thompson import thompson
+
+
+def test_thompson_groups():
+    nfa = thompson("((a)|(b(c)))d(e)?")
+    assert nfa is not None
+    m = match(nfa, "bcde")
+    assert m is not None
+    assert m.latest_captures() == ["bcde", "bc", "", "bc", "c", "e"]
+
+
+def test_thompson_large():
+    def sizes(n):
+        words = [f"w{i:05d}" for i in range(n)]
+        nfa = thompson("(" + "|".join(words) + ")+")
+        assert nfa is not None
+        transitions = sum(
+            len(dests)
+            for edges in nfa.transitions_.values()
+            for dests in edges.values()
+        )
+        return nfa, len(nfa.states_), transitions
+    
+    _, states, transitions = sizes(500)
+    nfa, states_10x, transitions_10x = sizes(5000)
+    # every character and operator only adds a constant number of states
+    # and transitions, so 10 times the pattern is at most 10 times the NFA
+    assert states_10x <= 10 * states + 10
+    assert transitions_10x <= 10 * transitions + 10
+    assert match(nfa, "w00042w04999").substr() == "w00042w04999"
+
+
+def test_thompson_classes():
+    nfa = thompson("[a-z0-9]+")
+    assert nfa is not None
+    # one transition instead of a 36 way union
+    assert len(nfa.states_) == 2
+    assert match(nfa, "--ab12--").substr() == "ab12"
+    
+    nfa = thompson("[^\n]")
+    assert nfa is not None
+    assert CharClass([(ord("\n"), ord("\n"))]).negated() in nfa.transitions_[0]
+    
+    nfa = thompson("[x]\\.", utf8=True)
+    assert nfa is not None
+    assert match(nfa, b"ax.").substr() == b"x."
+    assert match(nfa, b"axa") is None
+    
+    nfa = thompson(".", utf8=True)
+    assert nfa is not None
+    assert CharClass([(0, 9), (11, 255)]) in nfa.transitions_[0]
+    with pytest.raises(MalformedRegexError):
+        thompson("[é]", utf8=True)
+    for malformed in ["[a-", "[z-a]", "[a-\\d]", "\\q"]:
+        with pytest.raises(ValueError):
+            thompson(malformed)
+
+
+def test_thompson_repeat():
+    single = thompson("(ab|c)")
+    nfa = thompson("(ab|c){100}")
+    assert single is not None and nfa is not None
+    # copies of the fragment, without copying the copies
+    assert len(nfa.states_) <= 100 * len(single.states_) + 2
+    assert len(nfa.group_clones_[0]) == 99
+    assert match(nfa, "ab" * 60 + "c" * 40 + "ab").substr() == "ab" * 60 + "c" * 40
+    assert match(nfa, "ab" * 99) is None
+    
+    nfa = thompson("((a)b{1,2}){2,}")
+    assert nfa is not None
+    # the inner group is copied along with the copies of the outer one
+    assert len(nfa.group_clones_[1]) == len(nfa.group_clones_[0]) == 1
+    
+    with pytest.raises(RegexTooLargeError):
+        thompson("(a{1000}){1000}")
+    with pytest.raises(RegexTooLargeError):
+        thompson("a{10}", state_limit=10)
+    with pytest.raises(ValueError):
+        thompson("a{3,2}")